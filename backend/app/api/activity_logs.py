@@ -1,26 +1,49 @@
 """
 Activity Logs API Endpoints
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 from app.core.database import get_db
 from app.schemas import ActivityLogCreate, ActivityLogResponse
 from app.models import ActivityLog
+from app.utils.pagination import paginate_keyset
+from app.utils.export import export_response, stream_rows
+from app.utils.activity_logger import get_activity_log_writer
+from app.services.analytics_rollup import to_utc_naive
+from app.services.partition_service import PartitionService
+from app.services.activity_log_stats import ActivityLogStats
 
 router = APIRouter(prefix="/api/logs", tags=["activity-logs"])
 
 
+def _log_filters(
+    action_type: Optional[str],
+    resource_type: Optional[str],
+    status: Optional[str],
+    days: int
+) -> list:
+    """Filter criteria shared by listing and export"""
+    criteria = [ActivityLog.created_at >= datetime.utcnow() - timedelta(days=days)]
+    if action_type:
+        criteria.append(ActivityLog.action_type == action_type)
+    if resource_type:
+        criteria.append(ActivityLog.resource_type == resource_type)
+    if status:
+        criteria.append(ActivityLog.status == status)
+    return criteria
+
+
 @router.post("/", response_model=ActivityLogResponse)
 def create_log(
     log: ActivityLogCreate,
     db: Session = Depends(get_db)
 ):
     """Create a new activity log entry"""
-    db_log = ActivityLog(**log.dict())
+    db_log = ActivityLog(**log.dict(exclude={"metadata"}), metadata_=log.metadata or {})
     db.add(db_log)
     db.commit()
     db.refresh(db_log)
@@ -29,38 +52,53 @@ def create_log(
 
 @router.get("/", response_model=List[ActivityLogResponse])
 def get_logs(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     action_type: Optional[str] = None,
     resource_type: Optional[str] = None,
     status: Optional[str] = None,
     days: int = Query(default=7, ge=1, le=365),
     db: Session = Depends(get_db)
 ):
-    """Get activity logs with filters"""
-    query = db.query(ActivityLog)
-
-    # Apply filters
-    if action_type:
-        query = query.filter(ActivityLog.action_type == action_type)
-
-    if resource_type:
-        query = query.filter(ActivityLog.resource_type == resource_type)
-
-    if status:
-        query = query.filter(ActivityLog.status == status)
+    """
+    Get activity logs with filters, newest first
+
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one.
+    """
+    query = db.query(ActivityLog).filter(
+        *_log_filters(action_type, resource_type, status, days)
+    )
+
+    # Newest first, paginated by cursor (or offset for older clients)
+    logs, next_cursor = paginate_keyset(
+        query, ActivityLog.created_at, ActivityLog.id,
+        limit=limit, cursor=cursor, skip=skip
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    # Date filter
-    start_date = datetime.utcnow() - timedelta(days=days)
-    query = query.filter(ActivityLog.created_at >= start_date)
+    return logs
 
-    # Order by newest first
-    query = query.order_by(desc(ActivityLog.created_at))
 
-    # Pagination
-    logs = query.offset(skip).limit(limit).all()
+@router.get("/export")
+def export_logs(
+    format: str = "ndjson",
+    action_type: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    status: Optional[str] = None,
+    days: int = Query(default=7, ge=1, le=365),
+):
+    """Stream activity logs as NDJSON or CSV, oldest first, with the filters of get_logs"""
+    table = ActivityLog.__table__
+    statement = select(table).where(
+        *_log_filters(action_type, resource_type, status, days)
+    ).order_by(table.c.created_at, table.c.id)
 
-    return logs
+    return export_response(
+        stream_rows(statement), format, [column.name for column in table.columns], "activity_logs"
+    )
 
 
 @router.get("/stats")
@@ -68,34 +106,51 @@ def get_log_stats(
     days: int = Query(default=7, ge=1, le=365),
     db: Session = Depends(get_db)
 ):
-    """Get activity log statistics"""
-    start_date = datetime.utcnow() - timedelta(days=days)
-
-    total_logs = db.query(ActivityLog).filter(
-        ActivityLog.created_at >= start_date
-    ).count()
-
-    # Count by action type
-    action_counts = db.query(
-        ActivityLog.action_type,
-        db.func.count(ActivityLog.id)
-    ).filter(
-        ActivityLog.created_at >= start_date
-    ).group_by(ActivityLog.action_type).all()
-
-    # Count by status
-    status_counts = db.query(
-        ActivityLog.status,
-        db.func.count(ActivityLog.id)
-    ).filter(
-        ActivityLog.created_at >= start_date
-    ).group_by(ActivityLog.status).all()
-
-    return {
-        "total_logs": total_logs,
-        "by_action": [{"action": action, "count": count} for action, count in action_counts],
-        "by_status": [{"status": status, "count": count} for status, count in status_counts],
-    }
+    """Get activity log statistics, counted in whole UTC days"""
+    return ActivityLogStats.get_stats(db, days=days)
+
+
+@router.get("/stats/check")
+def check_log_stats(
+    days: int = Query(default=7, ge=1, le=365),
+    repair: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Compare the stats counters with the raw logs, optionally repairing them"""
+    return ActivityLogStats.check(db, days=days, repair=repair)
+
+
+@router.get("/buffer")
+def get_log_buffer_stats():
+    """Get queued, written and dropped counts of the activity log buffer"""
+    return get_activity_log_writer().get_stats()
+
+
+@router.get("/archive")
+def get_archived_logs(
+    start: datetime,
+    end: datetime,
+    action_type: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(default=1000, ge=1, le=10000),
+):
+    """Get activity logs archived by the retention policy, oldest first"""
+    start, end = to_utc_naive(start), to_utc_naive(end)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    return list(PartitionService.query_archive(
+        "activity_logs", start, end,
+        filters={"action_type": action_type, "resource_type": resource_type, "status": status},
+        limit=limit
+    ))
+
+
+@router.get("/archive/files")
+def list_log_archives():
+    """List the archive files of activity logs, one or more per month"""
+    return PartitionService.list_archives("activity_logs")
 
 
 @router.delete("/{log_id}")
@@ -1,13 +1,18 @@
 """
 Analytics API Endpoints
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 from app.core.database import get_db
 from app.schemas import AnalyticsSummary, TimeSeriesData, TopicData
-from app.services.analytics_service import AnalyticsService
+from app.services.analytics_service import AnalyticsService, get_analytics_writer
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_rollup import to_utc_naive
+from app.services.partition_service import PartitionService
+from app.utils.fast_json import fast_response
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
@@ -15,7 +20,7 @@ router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 @router.get("/summary", response_model=AnalyticsSummary)
 def get_analytics_summary(db: Session = Depends(get_db)):
     """Get overall analytics summary"""
-    return AnalyticsService.get_summary(db)
+    return fast_response(AnalyticsService.get_summary(db))
 
 
 @router.get("/time-series", response_model=List[TimeSeriesData])
@@ -24,7 +29,7 @@ def get_time_series(
     db: Session = Depends(get_db)
 ):
     """Get time series data for conversations"""
-    return AnalyticsService.get_time_series(db, days=days)
+    return fast_response(AnalyticsService.get_time_series(db, days=days))
 
 
 @router.get("/top-topics", response_model=List[TopicData])
@@ -33,13 +38,13 @@ def get_top_topics(
     db: Session = Depends(get_db)
 ):
     """Get top discussion topics"""
-    return AnalyticsService.get_top_topics(db, limit=limit)
+    return fast_response(AnalyticsService.get_top_topics(db, limit=limit))
 
 
 @router.get("/document-usage")
 def get_document_usage(db: Session = Depends(get_db)):
     """Get document usage statistics"""
-    return AnalyticsService.get_document_usage(db)
+    return fast_response(AnalyticsService.get_document_usage(db))
 
 
 @router.get("/response-times")
@@ -47,17 +52,18 @@ def get_response_times(
     days: int = Query(default=7, ge=1, le=90),
     db: Session = Depends(get_db)
 ):
-    """Get response times over time"""
-    return AnalyticsService.get_response_times(db, days=days)
+    """Get daily average, min, max and p50/p90/p99 response times"""
+    return fast_response(AnalyticsService.get_response_times(db, days=days))
 
 
 @router.get("/model-performance")
 def get_model_performance(
     days: int = Query(default=30, ge=1, le=90),
+    by_model: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Get performance metrics for each LLM model"""
-    return AnalyticsService.get_model_performance(db, days=days)
+    """Get usage and response time percentiles for each LLM provider (or model)"""
+    return fast_response(AnalyticsService.get_model_performance(db, days=days, by_model=by_model))
 
 
 @router.get("/user-engagement")
@@ -66,7 +72,7 @@ def get_user_engagement(
     db: Session = Depends(get_db)
 ):
     """Get user engagement metrics"""
-    return AnalyticsService.get_user_engagement(db, days=days)
+    return fast_response(AnalyticsService.get_user_engagement(db, days=days))
 
 
 @router.get("/peak-hours")
@@ -75,7 +81,7 @@ def get_peak_hours(
     db: Session = Depends(get_db)
 ):
     """Get peak usage hours"""
-    return AnalyticsService.get_peak_hours(db, days=days)
+    return fast_response(AnalyticsService.get_peak_hours(db, days=days))
 
 
 @router.get("/conversation-metrics")
@@ -84,4 +90,39 @@ def get_conversation_metrics(
     db: Session = Depends(get_db)
 ):
     """Get conversation length and quality metrics"""
-    return AnalyticsService.get_conversation_metrics(db, days=days)
+    return fast_response(AnalyticsService.get_conversation_metrics(db, days=days))
+
+
+@router.get("/buffer")
+def get_event_buffer_stats():
+    """Get queued, written and dropped counts of the analytics event buffer"""
+    return get_analytics_writer().get_stats()
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """Get hit, miss and coalescing counts of the analytics result cache"""
+    return analytics_cache.get_stats()
+
+
+@router.get("/events/archive")
+def get_archived_events(
+    start: datetime,
+    end: datetime,
+    event_type: Optional[str] = None,
+    limit: int = Query(default=1000, ge=1, le=10000),
+):
+    """Get analytics events archived by the retention policy, oldest first"""
+    start, end = to_utc_naive(start), to_utc_naive(end)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    return list(PartitionService.query_archive(
+        "analytics_events", start, end, filters={"event_type": event_type}, limit=limit
+    ))
+
+
+@router.get("/events/archive/files")
+def list_event_archives():
+    """List the archive files of analytics events, one or more per month"""
+    return PartitionService.list_archives("analytics_events")
@@ -1,14 +1,20 @@
 """
 Chat API Endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session, defer, raiseload, selectinload
+from typing import Any, Dict, Iterator, List, Optional
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
 import time
 import json
 
-from app.core.database import get_db
+from app.core.database import get_db, get_round_trips, SessionLocal, AsyncSessionLocal
+from app.api.deps import conditional_get
+from app.models.resource_version import CONVERSATIONS
 from app.schemas import (
     ChatRequest,
     ConversationResponse,
@@ -17,209 +23,355 @@ from app.schemas import (
     MessageResponse,
     MessageFeedbackCreate,
     MessageFeedbackResponse,
+    MessagePageResponse,
 )
 from app.models import Conversation, Message, MessageFeedback
 from app.services.rag_service import RAGService
+from app.services.rate_governor import RateLimitTimeout
+from app.services.llm_provider import LLMProvider
 from app.services.analytics_service import AnalyticsService
+from app.services.conversation_summarizer import ConversationSummarizer
+from app.services.chat_pipeline import StageGraph
+from app.services.conversation_search import ConversationSearch
+from app.services.tag_resolver import tag_resolver
+from app.services.history_cache import history_cache, get_recent_history, get_recent_history_async
 from app.utils.categorizer import MessageCategorizer
 from app.utils.activity_logger import log_activity
+from app.utils.pagination import paginate_keyset
+from app.utils.export import export_response, stream_rows
+from app.utils.fast_json import dump_orm, fast_response
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 
+def _retry_after(e: RateLimitTimeout) -> int:
+    """Whole seconds until the rate governor expects capacity again"""
+    return int(e.retry_after + 0.5)
+
+
+def _rate_limited(e: RateLimitTimeout) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(_retry_after(e))}
+    )
+
+
 @router.post("/", response_model=MessageResponse)
 def send_message(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Send a chat message and get RAG response"""
 
     start_time = time.time()
+    rag_service = RAGService()
 
-    # Get or create conversation
-    conversation = None
-    if request.conversation_id:
-        conversation = db.query(Conversation).filter(
-            Conversation.id == request.conversation_id
-        ).first()
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-    else:
-        # Create new conversation
-        conversation = Conversation(
-            title=request.message[:50] + "..." if len(request.message) > 50 else request.message
-        )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-
-    # Get conversation history
-    history_messages = db.query(Message).filter(
-        Message.conversation_id == conversation.id
-    ).order_by(Message.timestamp).all()
-
-    conversation_history = [
-        {"role": msg.role, "content": msg.content}
-        for msg in history_messages
-    ]
-
-    # Categorize user message
-    categorization = MessageCategorizer.categorize(request.message)
+    def resolve_tags():
+        return tag_resolver.resolve(db, request.tag_ids) if request.tag_ids else None
+
+    def load_conversation():
+        """Get the conversation, its summary and unsummarized history (new ones are not saved yet)"""
+        if request.conversation_id:
+            conversation = db.query(Conversation).filter(
+                Conversation.id == request.conversation_id
+            ).first()
+            if not conversation:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            history_messages = get_recent_history(db, conversation)
+        else:
+            conversation = Conversation(
+                title=request.message[:50] + "..." if len(request.message) > 50 else request.message
+            )
+            history_messages = []
 
-    # Save user message with category
-    user_message = Message(
-        conversation_id=conversation.id,
-        role="user",
-        content=request.message,
-        metadata={"category": categorization}
-    )
-    db.add(user_message)
-    db.commit()
+        conversation_history = [
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in history_messages
+        ]
+        return conversation, conversation_history, conversation.summary
 
-    # Get RAG response
-    rag_service = RAGService()
-    try:
-        answer, sources = rag_service.chat(
+    def generate(loaded, relevant_docs):
+        # Only plain values from here on: this runs on a pool thread
+        _, conversation_history, conversation_summary = loaded
+        return rag_service.generate(
             query=request.message,
+            relevant_docs=relevant_docs,
             conversation_history=conversation_history,
             llm_provider=request.llm_provider,
             model=request.model,
-            document_ids=request.document_ids,
+            conversation_summary=conversation_summary,
         )
+
+    # DB reads are inline stages on this thread (the session is not thread
+    # safe). Retrieval and categorization start on the pool as soon as the
+    # tags are resolved, so they overlap with the conversation read.
+    pipeline = StageGraph()
+    pipeline.add("tags", resolve_tags, inline=True)
+    pipeline.add("conversation", load_conversation, inline=True)
+    pipeline.add("retrieve", lambda tagged_document_ids: rag_service.retrieve(
+        request.message,
+        request.document_ids,
+        tag_ids=request.tag_ids,
+        tagged_document_ids=tagged_document_ids,
+    ), depends_on=["tags"])
+    pipeline.add("categorize", lambda: MessageCategorizer.categorize(request.message))
+    pipeline.add("generate", generate, depends_on=["conversation", "retrieve"])
+
+    try:
+        results = pipeline.run()
+    except HTTPException:
+        raise
+    except RateLimitTimeout as e:
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RAG service error: {str(e)}")
 
-    # Save assistant message
+    conversation, conversation_history, _ = results["conversation"]
+    answer, sources = results["generate"]
+
+    # Every write of the turn goes out in one transaction once the answer
+    # exists: a failed generation or save leaves no partial turn behind.
+    # Timestamps are set here so the response needs no read-back.
+    now = datetime.utcnow()
+    user_message = Message(
+        conversation=conversation,
+        role="user",
+        content=request.message,
+        metadata_={"category": results["categorize"]},
+        timestamp=now,
+    )
     assistant_message = Message(
-        conversation_id=conversation.id,
+        conversation=conversation,
         role="assistant",
         content=answer,
         sources=sources,
+        metadata_={},
+        timestamp=now,
     )
-    db.add(assistant_message)
+    is_new_conversation = conversation.id is None
+    db.add_all([conversation, user_message, assistant_message])
+    conversation.updated_at = now
 
-    # Update conversation timestamp
-    conversation.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(assistant_message)
+    try:
+        db.flush()
+        conversation_id = conversation.id
+        conversation_title = conversation.title
+        turn_messages = [
+            {"id": user_message.id, "role": "user", "content": request.message},
+            {"id": assistant_message.id, "role": "assistant", "content": answer},
+        ]
+        response = MessageResponse(
+            id=assistant_message.id,
+            conversation_id=conversation_id,
+            role="assistant",
+            content=answer,
+            sources=sources,
+            metadata_={},
+            timestamp=now,
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to save chat turn: {str(e)}")
+
+    if is_new_conversation:
+        history_cache.put(conversation_id, turn_messages)
+    else:
+        history_cache.append(conversation_id, turn_messages)
+
+    # Compact older turns once raw history outgrows the budget
+    conversation_history.append({"role": "user", "content": request.message})
+    conversation_history.append({"role": "assistant", "content": answer})
+    if ConversationSummarizer.needs_update(conversation_history):
+        ConversationSummarizer.schedule(conversation_id, request.llm_provider, request.model)
 
-    # Log analytics
+    # Analytics and activity logging run after the response is sent
     response_time = time.time() - start_time
-    AnalyticsService.log_event(
-        db,
-        event_type="chat_message",
-        metadata={
-            "conversation_id": conversation.id,
-            "message_length": len(request.message),
-            "sources_count": len(sources),
-            "llm_provider": request.llm_provider or "openai",
-        },
-        value=response_time
+    background_tasks.add_task(
+        _log_chat_turn,
+        conversation_id=conversation_id,
+        conversation_title=conversation_title,
+        message_length=len(request.message),
+        sources_count=len(sources),
+        llm_provider=request.llm_provider or "openai",
+        model=rag_service.last_model,
+        prompt_tokens=rag_service.last_token_counts,
+        stage_timings=pipeline.timings,
+        db_round_trips=get_round_trips(db),
+        response_time=response_time,
     )
 
-    # Log activity
-    log_activity(
-        db=db,
-        action_type="chat",
-        resource_type="conversation",
-        resource_id=conversation.id,
-        description=f"Chat message sent in conversation '{conversation.title}'",
-        status="success",
-        metadata={
-            "message_length": len(request.message),
-            "response_time": response_time,
-            "sources_count": len(sources)
-        }
-    )
+    return response
+
 
-    return assistant_message
+def _log_chat_turn(
+    conversation_id: int,
+    conversation_title: str,
+    message_length: int,
+    sources_count: int,
+    llm_provider: str,
+    model: Optional[str],
+    prompt_tokens: dict,
+    stage_timings: dict,
+    db_round_trips: dict,
+    response_time: float,
+):
+    """Write analytics and activity records for a chat turn on a separate session"""
+    db = SessionLocal()
+    try:
+        AnalyticsService.log_event(
+            db,
+            event_type="chat_message",
+            metadata={
+                "conversation_id": conversation_id,
+                "message_length": message_length,
+                "sources_count": sources_count,
+                "llm_provider": llm_provider,
+                "model": model,
+                "prompt_tokens": prompt_tokens,
+                "stage_timings": stage_timings,
+                "db_round_trips": db_round_trips,
+            },
+            value=response_time,
+            commit=False
+        )
+
+        log_activity(
+            db=db,
+            action_type="chat",
+            resource_type="conversation",
+            resource_id=conversation_id,
+            description=f"Chat message sent in conversation '{conversation_title}'",
+            status="success",
+            metadata={
+                "message_length": message_length,
+                "response_time": response_time,
+                "sources_count": sources_count
+            },
+            commit=False
+        )
+        db.commit()
+    finally:
+        db.close()
 
 
-@router.get("/conversations", response_model=List[ConversationListResponse])
+@router.get(
+    "/conversations",
+    response_model=List[ConversationListResponse],
+    dependencies=[Depends(conditional_get(CONVERSATIONS))]
+)
 def list_conversations(
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """List all conversations"""
-    conversations = db.query(Conversation).order_by(
-        Conversation.updated_at.desc()
-    ).offset(skip).limit(limit).all()
-
-    # Add message count
-    result = []
-    for conv in conversations:
-        message_count = db.query(Message).filter(
-            Message.conversation_id == conv.id
-        ).count()
-
-        result.append(
-            ConversationListResponse(
-                id=conv.id,
-                title=conv.title,
-                user_id=conv.user_id,
-                created_at=conv.created_at,
-                updated_at=conv.updated_at,
-                message_count=message_count
-            )
-        )
+    """
+    List all conversations, most recently updated first
+
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one.
+    """
+    # Message counts and previews are denormalized onto the conversation row
+    conversations, next_cursor = paginate_keyset(
+        db.query(Conversation), Conversation.updated_at, Conversation.id,
+        limit=limit, cursor=cursor, skip=skip
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return fast_response(conversations, ConversationListResponse, response)
 
-    return result
 
+CONVERSATION_EXPORT_FIELDS = ["conversation_id", "title", "user_id", "created_at", "updated_at"]
+MESSAGE_EXPORT_FIELDS = ["message_id", "role", "content", "sources", "metadata", "timestamp"]
 
-@router.get("/conversations/search", response_model=List[ConversationListResponse])
+
+def _group_conversations(rows: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Fold consecutive message rows of one conversation into a nested object"""
+    for _, group in groupby(rows, key=itemgetter("conversation_id")):
+        messages = []
+        for row in group:
+            if row["message_id"] is not None:
+                messages.append({
+                    "id": row["message_id"],
+                    **{field: row[field] for field in MESSAGE_EXPORT_FIELDS[1:]}
+                })
+        conversation = {field: row[field] for field in CONVERSATION_EXPORT_FIELDS}
+        conversation["id"] = conversation.pop("conversation_id")
+        conversation["messages"] = messages
+        yield conversation
+
+
+@router.get("/conversations/export")
+def export_conversations(
+    format: str = "ndjson",
+    user_id: Optional[str] = None,
+    days: Optional[int] = Query(default=None, ge=1),
+):
+    """
+    Stream conversations with their messages as NDJSON or CSV
+
+    NDJSON has one conversation per line with its messages nested; CSV has
+    one row per message. `days` limits the export to conversations updated
+    in that many days.
+    """
+    statement = select(
+        Conversation.id.label("conversation_id"),
+        Conversation.title,
+        Conversation.user_id,
+        Conversation.created_at,
+        Conversation.updated_at,
+        Message.id.label("message_id"),
+        Message.role,
+        Message.content,
+        Message.sources,
+        Message.metadata_.label("metadata"),
+        Message.timestamp,
+    ).outerjoin(
+        Message, Message.conversation_id == Conversation.id
+    ).order_by(Conversation.id, Message.timestamp, Message.id)
+
+    if user_id:
+        statement = statement.where(Conversation.user_id == user_id)
+    if days:
+        statement = statement.where(Conversation.updated_at >= datetime.utcnow() - timedelta(days=days))
+
+    rows = stream_rows(statement)
+    if format == "ndjson":
+        rows = _group_conversations(rows)
+    return export_response(
+        rows, format, CONVERSATION_EXPORT_FIELDS + MESSAGE_EXPORT_FIELDS, "conversations"
+    )
+
+
+@router.get(
+    "/conversations/search",
+    response_model=List[ConversationListResponse],
+    dependencies=[Depends(conditional_get(CONVERSATIONS))]
+)
 def search_conversations(
+    response: Response,
     q: str = Query(..., min_length=1),
     skip: int = 0,
-    limit: int = 50,
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Search conversations by title or message content"""
-    from sqlalchemy import or_
-
-    # Search in conversation titles
-    conversation_ids_from_title = db.query(Conversation.id).filter(
-        Conversation.title.ilike(f'%{q}%')
-    ).all()
-
-    # Search in message content
-    conversation_ids_from_messages = db.query(Message.conversation_id).filter(
-        Message.content.ilike(f'%{q}%')
-    ).distinct().all()
-
-    # Combine both searches
-    conversation_ids = set([c[0] for c in conversation_ids_from_title] +
-                          [c[0] for c in conversation_ids_from_messages])
-
-    if not conversation_ids:
-        return []
-
-    # Get conversations
-    conversations = db.query(Conversation).filter(
-        Conversation.id.in_(conversation_ids)
-    ).order_by(
-        Conversation.updated_at.desc()
-    ).offset(skip).limit(limit).all()
-
-    # Add message count
-    result = []
-    for conv in conversations:
-        message_count = db.query(Message).filter(
-            Message.conversation_id == conv.id
-        ).count()
-
-        result.append(
-            ConversationListResponse(
-                id=conv.id,
-                title=conv.title,
-                user_id=conv.user_id,
-                created_at=conv.created_at,
-                updated_at=conv.updated_at,
-                message_count=message_count
-            )
-        )
+    """
+    Search conversations by title or message content, best match first
+
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one.
+    """
+    conversations, next_cursor = ConversationSearch.search(
+        db, q, limit=limit, cursor=cursor, skip=skip
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    return result
+    return fast_response(conversations, ConversationListResponse, response)
 
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationResponse)
@@ -227,15 +379,86 @@ def get_conversation(
     conversation_id: int,
     db: Session = Depends(get_db)
 ):
-    """Get a specific conversation with all messages"""
-    conversation = db.query(Conversation).filter(
+    """
+    Get a specific conversation with all messages
+
+    Use GET /conversations/{id}/messages to page through long conversations.
+    """
+    conversation = db.query(Conversation).options(
+        selectinload(Conversation.messages).raiseload("*")
+    ).filter(
         Conversation.id == conversation_id
     ).first()
 
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    return conversation
+    return fast_response(conversation, ConversationResponse)
+
+
+@router.get(
+    "/conversations/{conversation_id}/messages",
+    response_model=List[MessagePageResponse],
+    response_model_exclude_unset=True
+)
+def list_messages(
+    conversation_id: int,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    newest_first: bool = False,
+    include_sources: bool = True,
+    include_metadata: bool = True,
+    include_feedback: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a page of a conversation's messages, oldest first by default
+
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one.
+    Excluded fields are not loaded from the database and are omitted from
+    the response. A page costs one query, plus one for feedback when it is
+    included.
+    """
+    options = [raiseload("*")]
+    if not include_sources:
+        options.append(defer(Message.sources, raiseload=True))
+    if not include_metadata:
+        options.append(defer(Message.metadata_, raiseload=True))
+    if include_feedback:
+        options.append(selectinload(Message.feedback))
+
+    messages, next_cursor = paginate_keyset(
+        db.query(Message).options(*options).filter(Message.conversation_id == conversation_id),
+        Message.timestamp, Message.id,
+        limit=limit, cursor=cursor, ascending=not newest_first
+    )
+
+    if not messages and not cursor:
+        exists = db.query(Conversation.id).filter(Conversation.id == conversation_id).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    page = []
+    for message in messages:
+        item = {
+            "id": message.id,
+            "conversation_id": message.conversation_id,
+            "role": message.role,
+            "content": message.content,
+            "timestamp": message.timestamp,
+        }
+        if include_sources:
+            item["sources"] = message.sources or []
+        if include_metadata:
+            item["metadata"] = message.metadata_ or {}
+        if include_feedback:
+            item["feedback"] = dump_orm(message.feedback, MessageFeedbackResponse)
+        page.append(item)
+    return fast_response(page, response=response)
 
 
 @router.delete("/conversations/{conversation_id}", status_code=204)
@@ -244,7 +467,11 @@ def delete_conversation(
     db: Session = Depends(get_db)
 ):
     """Delete a conversation"""
-    conversation = db.query(Conversation).filter(
+    # The delete cascades to messages and detaches their feedback; load
+    # both up front instead of once per message
+    conversation = db.query(Conversation).options(
+        selectinload(Conversation.messages).selectinload(Message.feedback)
+    ).filter(
         Conversation.id == conversation_id
     ).first()
 
@@ -253,6 +480,7 @@ def delete_conversation(
 
     db.delete(conversation)
     db.commit()
+    history_cache.invalidate(conversation_id)
 
     return None
 
@@ -297,6 +525,12 @@ def get_llm_providers():
     return rag_service.get_available_providers()
 
 
+@router.get("/providers/limits")
+def get_llm_rate_limits():
+    """Get rate governor queue depth and wait times per provider and model"""
+    return LLMProvider.get_rate_limit_stats()
+
+
 @router.post("/compare")
 def compare_models(
     request: ChatRequest,
@@ -305,19 +539,26 @@ def compare_models(
     """
     Compare responses from multiple LLM providers
     Returns responses from OpenAI, Anthropic, and Google Gemini
+
+    Providers queued past the rate governor's timeout report retry_after;
+    if every provider did, the whole request is answered with 429.
     """
 
     # Get conversation history if conversation_id provided
     conversation_history = []
+    conversation_summary = None
     if request.conversation_id:
-        history_messages = db.query(Message).filter(
-            Message.conversation_id == request.conversation_id
-        ).order_by(Message.timestamp).all()
+        conversation = db.query(Conversation).filter(
+            Conversation.id == request.conversation_id
+        ).first()
+        if conversation:
+            conversation_summary = conversation.summary
+            history_messages = get_recent_history(db, conversation)
 
-        conversation_history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in history_messages
-        ]
+            conversation_history = [
+                {"role": msg["role"], "content": msg["content"]}
+                for msg in history_messages
+            ]
 
     rag_service = RAGService()
 
@@ -330,6 +571,7 @@ def compare_models(
     }
 
     results = {}
+    rate_limited = []
 
     for provider in providers:
         try:
@@ -339,6 +581,7 @@ def compare_models(
                 conversation_history=conversation_history,
                 llm_provider=provider,
                 model=models[provider],
+                conversation_summary=conversation_summary,
             )
             response_time = time.time() - start_time
 
@@ -348,7 +591,19 @@ def compare_models(
                 "model": models[provider],
                 "response_time": round(response_time, 2),
                 "success": True,
-                "error": None
+                "error": None,
+                "retry_after": None
+            }
+        except RateLimitTimeout as e:
+            rate_limited.append(e)
+            results[provider] = {
+                "answer": None,
+                "sources": [],
+                "model": models[provider],
+                "response_time": 0,
+                "success": False,
+                "error": str(e),
+                "retry_after": _retry_after(e)
             }
         except Exception as e:
             results[provider] = {
@@ -357,9 +612,13 @@ def compare_models(
                 "model": models[provider],
                 "response_time": 0,
                 "success": False,
-                "error": str(e)
+                "error": str(e),
+                "retry_after": None
             }
 
+    if len(rate_limited) == len(providers):
+        raise _rate_limited(min(rate_limited, key=lambda e: e.retry_after))
+
     return {
         "query": request.message,
         "results": results
@@ -384,6 +643,7 @@ async def websocket_chat(websocket: WebSocket):
             llm_provider = message_data.get("llm_provider", "openai")
             model = message_data.get("model")
             document_ids = message_data.get("document_ids")
+            tag_ids = message_data.get("tag_ids")
 
             if not message:
                 await websocket.send_json({
@@ -392,10 +652,8 @@ async def websocket_chat(websocket: WebSocket):
                 })
                 continue
 
-            # Get database session
-            db = next(get_db())
-
-            try:
+            # Get database session (queries must not block the event loop)
+            async with AsyncSessionLocal() as db:
                 # Send typing indicator
                 await websocket.send_json({
                     "type": "typing",
@@ -405,17 +663,18 @@ async def websocket_chat(websocket: WebSocket):
                 # Get or create conversation
                 conversation = None
                 if conversation_id:
-                    conversation = db.query(Conversation).filter(
-                        Conversation.id == conversation_id
-                    ).first()
+                    result = await db.execute(
+                        select(Conversation).where(Conversation.id == conversation_id)
+                    )
+                    conversation = result.scalars().first()
 
                 if not conversation:
                     conversation = Conversation(
                         title=message[:50] + "..." if len(message) > 50 else message
                     )
                     db.add(conversation)
-                    db.commit()
-                    db.refresh(conversation)
+                    await db.commit()
+                    await db.refresh(conversation)
 
                     # Send conversation ID to client
                     await websocket.send_json({
@@ -423,27 +682,27 @@ async def websocket_chat(websocket: WebSocket):
                         "conversation_id": conversation.id
                     })
 
-                # Get conversation history
-                history_messages = db.query(Message).filter(
-                    Message.conversation_id == conversation.id
-                ).order_by(Message.timestamp).all()
+                # Get conversation history not yet folded into the summary
+                history_messages = await get_recent_history_async(db, conversation)
 
                 conversation_history = [
-                    {"role": msg.role, "content": msg.content}
+                    {"role": msg["role"], "content": msg["content"]}
                     for msg in history_messages
                 ]
 
-                # Categorize and save user message
+                # Categorize the user message (saved together with the reply)
                 categorization = MessageCategorizer.categorize(message)
 
+                tagged_document_ids = (
+                    await tag_resolver.resolve_async(db, tag_ids) if tag_ids else None
+                )
+
                 user_message = Message(
                     conversation_id=conversation.id,
                     role="user",
                     content=message,
-                    metadata={"category": categorization}
+                    metadata_={"category": categorization}
                 )
-                db.add(user_message)
-                db.commit()
 
                 # Send user message confirmation
                 await websocket.send_json({
@@ -462,12 +721,16 @@ async def websocket_chat(websocket: WebSocket):
 
                 try:
                     # For now, get the full response (streaming requires LLM provider changes)
-                    answer, sources = rag_service.chat(
+                    answer, sources = await run_in_threadpool(
+                        rag_service.chat,
                         query=message,
                         conversation_history=conversation_history,
                         llm_provider=llm_provider,
                         model=model,
                         document_ids=document_ids,
+                        conversation_summary=conversation.summary,
+                        tag_ids=tag_ids,
+                        tagged_document_ids=tagged_document_ids,
                     )
 
                     # Simulate streaming by sending chunks
@@ -481,50 +744,71 @@ async def websocket_chat(websocket: WebSocket):
                         # Small delay to simulate streaming
                         await websocket.receive_text()  # Non-blocking
 
-                    # Save assistant message
+                    # Save both messages and the analytics event in one transaction
+                    conversation_id = conversation.id
                     assistant_message = Message(
-                        conversation_id=conversation.id,
+                        conversation_id=conversation_id,
                         role="assistant",
                         content=answer,
                         sources=sources,
                     )
-                    db.add(assistant_message)
-
-                    # Update conversation timestamp
+                    db.add_all([user_message, assistant_message])
                     conversation.updated_at = datetime.utcnow()
-                    db.commit()
 
-                    # Send completion with sources
                     response_time = time.time() - start_time
-                    await websocket.send_json({
-                        "type": "complete",
-                        "sources": sources,
-                        "response_time": round(response_time, 2)
-                    })
-
-                    # Log analytics
                     AnalyticsService.log_event(
                         db,
                         event_type="chat_message",
                         metadata={
-                            "conversation_id": conversation.id,
+                            "conversation_id": conversation_id,
                             "message_length": len(message),
                             "sources_count": len(sources),
                             "websocket": True,
                             "llm_provider": llm_provider or "openai",
+                            "model": rag_service.last_model,
+                            "prompt_tokens": rag_service.last_token_counts,
                         },
-                        value=response_time
+                        value=response_time,
+                        commit=False
                     )
 
+                    await db.flush()
+                    turn_messages = [
+                        {"id": user_message.id, "role": "user", "content": message},
+                        {"id": assistant_message.id, "role": "assistant", "content": answer},
+                    ]
+                    await db.commit()
+
+                    history_cache.append(conversation_id, turn_messages)
+
+                    # Compact older turns once raw history outgrows the budget
+                    conversation_history.append({"role": "user", "content": message})
+                    conversation_history.append({"role": "assistant", "content": answer})
+                    if ConversationSummarizer.needs_update(conversation_history):
+                        ConversationSummarizer.schedule(conversation_id, llm_provider, model)
+
+                    # Send completion with sources
+                    await websocket.send_json({
+                        "type": "complete",
+                        "sources": sources,
+                        "response_time": round(response_time, 2)
+                    })
+
+                except RateLimitTimeout as e:
+                    await db.rollback()
+                    await websocket.send_json({
+                        "type": "error",
+                        "status": 429,
+                        "error": str(e),
+                        "retry_after": _retry_after(e)
+                    })
                 except Exception as e:
+                    await db.rollback()
                     await websocket.send_json({
                         "type": "error",
                         "error": f"RAG service error: {str(e)}"
                     })
 
-            finally:
-                db.close()
-
     except WebSocketDisconnect:
         print("Client disconnected")
     except Exception as e:
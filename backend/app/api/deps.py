@@ -1,11 +1,15 @@
 """
 API Dependencies
 """
-from fastapi import Depends, HTTPException, status
+from typing import Callable
+import hashlib
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import decode_access_token
+from app.models.resource_version import get_versions
 from app.models.user import User
 
 security = HTTPBearer()
@@ -66,3 +70,48 @@ def get_current_user_optional(
         return get_current_user(credentials, db)
     except HTTPException:
         return None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    opaque = etag[2:]
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def conditional_get(*resources: str) -> Callable:
+    """
+    Dependency answering a matching If-None-Match with 304 Not Modified
+
+    The ETag is built from the change counters of resources (see
+    ResourceVersion) and the request URL, so checking it is one primary key
+    lookup and an unchanged resource is answered before the endpoint runs.
+    A write committed between the check and the endpoint's query only makes
+    the next request fetch the full payload again.
+
+    Args:
+        resources: Resources the endpoint's response is read from
+
+    Returns:
+        Dependency for the route's dependencies list
+    """
+    def check(request: Request, response: Response, db: Session = Depends(get_db)):
+        versions = get_versions(db, resources)
+        stamp = "|".join([
+            settings.APP_VERSION,
+            request.url.path,
+            request.url.query,
+            *(f"{name}:{version}" for name, version in versions.items()),
+        ])
+        etag = f'W/"{hashlib.blake2b(stamp.encode(), digest_size=8).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return check
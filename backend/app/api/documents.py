@@ -1,20 +1,26 @@
 """
 Documents API Endpoints
 """
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import os
 import shutil
 from pathlib import Path
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
+from app.api.deps import conditional_get
 from app.schemas import DocumentResponse, DocumentUpdate
 from app.models import Document, DocumentStatus
 from app.services.document_processor import DocumentProcessor
 from app.services.vector_store import get_vector_store
 from app.utils.activity_logger import log_activity
+from app.services.tag_resolver import tag_resolver
+from app.utils.pagination import paginate_keyset
+from app.utils.fast_json import fast_response
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
@@ -22,9 +28,9 @@ router = APIRouter(prefix="/api/documents", tags=["documents"])
 @router.post("/upload", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Upload and process a document"""
+    """Upload and process a document (blocking work runs in the threadpool)"""
 
     # Validate file
     file_size = 0
@@ -46,8 +52,11 @@ async def upload_document(
     file_path = os.path.join(upload_dir, safe_filename)
 
     # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    def save_file():
+        with open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+
+    await run_in_threadpool(save_file)
 
     # Create database record
     db_document = Document(
@@ -58,24 +67,26 @@ async def upload_document(
         status=DocumentStatus.PENDING
     )
     db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
+    await db.commit()
+    await db.refresh(db_document)
+    document_id = db_document.id
 
     # Process document asynchronously (in background)
     try:
         # Update status to processing
         db_document.status = DocumentStatus.PROCESSING
-        db.commit()
+        await db.commit()
 
         # Extract text
-        text_content = DocumentProcessor.extract_text(file_path, file_ext)
+        text_content = await run_in_threadpool(DocumentProcessor.extract_text, file_path, file_ext)
 
         # Add to vector store
         vector_store = get_vector_store()
-        chunks_count = vector_store.add_document(
+        chunks_count = await run_in_threadpool(
+            vector_store.add_document,
             content=text_content,
             metadata={
-                "document_id": db_document.id,
+                "document_id": document_id,
                 "filename": file.filename,
                 "file_type": file_ext,
             }
@@ -85,50 +96,68 @@ async def upload_document(
         db_document.status = DocumentStatus.COMPLETED
         db_document.chunks_count = chunks_count
         db_document.processed_date = datetime.utcnow()
-        db.commit()
-        db.refresh(db_document)
 
         # Log successful upload
         log_activity(
             db=db,
             action_type="upload",
             resource_type="document",
-            resource_id=db_document.id,
+            resource_id=document_id,
             description=f"Document '{file.filename}' uploaded and processed successfully",
             status="success",
-            metadata={"file_size": file_size, "chunks": chunks_count}
+            metadata={"file_size": file_size, "chunks": chunks_count},
+            commit=False
         )
+        await db.commit()
+        await db.refresh(db_document)
 
     except Exception as e:
+        await db.rollback()
         db_document.status = DocumentStatus.FAILED
         db_document.error_message = str(e)
-        db.commit()
 
         # Log failed upload
         log_activity(
             db=db,
             action_type="upload",
             resource_type="document",
-            resource_id=db_document.id,
+            resource_id=document_id,
             description=f"Failed to process document '{file.filename}'",
             status="failed",
-            metadata={"error": str(e)}
+            metadata={"error": str(e)},
+            commit=False
         )
+        await db.commit()
 
         raise HTTPException(status_code=500, detail=f"Failed to process document: {str(e)}")
 
     return db_document
 
 
-@router.get("/", response_model=List[DocumentResponse])
+@router.get(
+    "/",
+    response_model=List[DocumentResponse],
+    dependencies=[Depends(conditional_get("documents"))]
+)
 def list_documents(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """List all documents"""
-    documents = db.query(Document).order_by(Document.upload_date.desc()).offset(skip).limit(limit).all()
-    return documents
+    """
+    List all documents, newest first
+
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one.
+    """
+    documents, next_cursor = paginate_keyset(
+        db.query(Document), Document.upload_date, Document.id,
+        limit=limit, cursor=cursor, skip=skip
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return fast_response(documents, DocumentResponse, response)
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
@@ -140,7 +169,7 @@ def get_document(
     document = db.query(Document).filter(Document.id == document_id).first()
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
-    return document
+    return fast_response(document, DocumentResponse)
 
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -165,6 +194,8 @@ def delete_document(
     filename = document.filename
     db.delete(document)
     db.commit()
+    # document_tags rows went with the document
+    tag_resolver.invalidate()
 
     # Log deletion
     log_activity(
@@ -179,7 +210,7 @@ def delete_document(
     return None
 
 
-@router.get("/stats/overview")
+@router.get("/stats/overview", dependencies=[Depends(conditional_get("documents"))])
 def get_document_stats(db: Session = Depends(get_db)):
     """Get document statistics"""
     total_docs = db.query(Document).count()
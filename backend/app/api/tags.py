@@ -2,12 +2,16 @@
 Tags API Endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
 from pydantic import BaseModel
 
 from app.core.database import get_db
-from app.models import Tag, Document
+from app.api.deps import conditional_get
+from app.models import Tag, Document, document_tags
+from app.services.tag_resolver import tag_resolver
+from app.services.vector_store import get_vector_store
 
 
 class TagCreate(BaseModel):
@@ -28,24 +32,23 @@ class TagResponse(BaseModel):
 router = APIRouter(prefix="/api/tags", tags=["tags"])
 
 
-@router.get("/", response_model=List[TagResponse])
+@router.get(
+    "/",
+    response_model=List[TagResponse],
+    dependencies=[Depends(conditional_get("tags"))]
+)
 def list_tags(db: Session = Depends(get_db)):
     """List all tags with document counts"""
-    tags = db.query(Tag).all()
+    rows = db.query(
+        Tag.id, Tag.name, Tag.color, func.count(document_tags.c.document_id)
+    ).outerjoin(
+        document_tags, document_tags.c.tag_id == Tag.id
+    ).group_by(Tag.id, Tag.name, Tag.color).order_by(Tag.id).all()
 
-    result = []
-    for tag in tags:
-        doc_count = len(tag.documents)
-        result.append(
-            TagResponse(
-                id=tag.id,
-                name=tag.name,
-                color=tag.color,
-                document_count=doc_count
-            )
-        )
-
-    return result
+    return [
+        TagResponse(id=tag_id, name=name, color=color, document_count=doc_count)
+        for tag_id, name, color, doc_count in rows
+    ]
 
 
 @router.post("/", response_model=TagResponse)
@@ -78,6 +81,9 @@ def delete_tag(tag_id: int, db: Session = Depends(get_db)):
 
     db.delete(tag)
     db.commit()
+
+    tag_resolver.invalidate(tag_id)
+    get_vector_store().clear_tag(tag_id)
     return None
 
 
@@ -95,6 +101,8 @@ def add_tag_to_document(document_id: int, tag_id: int, db: Session = Depends(get
     if tag not in document.tags:
         document.tags.append(tag)
         db.commit()
+        tag_resolver.invalidate(tag_id)
+        get_vector_store().set_document_tag(document_id, tag_id, True)
 
     return {"message": "Tag added to document"}
 
@@ -113,5 +121,7 @@ def remove_tag_from_document(document_id: int, tag_id: int, db: Session = Depend
     if tag in document.tags:
         document.tags.remove(tag)
         db.commit()
+        tag_resolver.invalidate(tag_id)
+        get_vector_store().set_document_tag(document_id, tag_id, False)
 
     return None
@@ -1,19 +1,93 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from .config import settings
 
+
+def _async_url(url: str) -> str:
+    """Async driver URL for a sync DATABASE_URL"""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+def _pool_options(url: str) -> Dict[str, Any]:
+    """Pool sizing from settings (SQLite keeps SQLAlchemy's default pool)"""
+    if url.startswith("sqlite"):
+        if url.split("://", 1)[1] in ("", "/:memory:"):
+            # One shared connection, so every thread sees the same in-memory database
+            return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **_pool_options(settings.DATABASE_URL)
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or _async_url(settings.DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    echo=settings.DEBUG,
+    **_pool_options(ASYNC_DATABASE_URL)
+)
+
+# Objects stay usable after commit; lazy loads are not available on async sessions
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
+@event.listens_for(SessionLocal, "after_begin")
+def _track_round_trips(session, transaction, connection):
+    """Attribute statements on this connection to the session until it is checked in"""
+    connection.info["round_trips"] = session.info.setdefault(
+        "round_trips", {"statements": 0, "commits": 0}
+    )
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _count_commit(session):
+    session.info.setdefault("round_trips", {"statements": 0, "commits": 0})["commits"] += 1
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = conn.info.get("round_trips")
+    if counter is not None:
+        counter["statements"] += 1
+
+
+@event.listens_for(engine, "checkin")
+def _untrack_round_trips(dbapi_connection, connection_record):
+    connection_record.info.pop("round_trips", None)
+
+
+def get_round_trips(db) -> Dict[str, int]:
+    """Statements executed and commits made by a session so far"""
+    return dict(db.info.get("round_trips", {"statements": 0, "commits": 0}))
+
+
 def get_db():
     """Database session dependency"""
     db = SessionLocal()
@@ -21,3 +95,32 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async database session dependency"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _pool_stats(pool_engine: Engine) -> Dict[str, Any]:
+    pool = pool_engine.pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "utilization": round(pool.checkedout() / capacity, 3) if capacity else None,
+        })
+    return stats
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Connection pool utilization of the sync and async engines"""
+    return {
+        "sync": _pool_stats(engine),
+        "async": _pool_stats(async_engine.sync_engine),
+    }
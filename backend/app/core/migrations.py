@@ -0,0 +1,215 @@
+"""
+Lightweight Schema Migrations
+Applied at startup after create_all, so existing databases pick up
+columns and indexes added to the models since they were created. Both run
+under one lock, so several worker processes can start at once.
+"""
+from typing import Callable, List, Optional, Tuple
+from contextlib import contextmanager
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Connection, Engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_advisory_lock, so only one process migrates at a time
+MIGRATION_LOCK_ID = 4306
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    """Add a column if create_all did not already create it"""
+    if not _has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_index(conn: Connection, name: str, table: str, columns: str):
+    """Create an index if it does not exist yet"""
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def _conversation_summary(conn: Connection):
+    """Rolling conversation summary columns"""
+    _add_column(conn, "conversations", "summary", "TEXT")
+    _add_column(conn, "conversations", "summary_message_id", "INTEGER")
+
+
+def _conversation_counters(conn: Connection):
+    """Denormalized message counters on conversations, backfilled from messages"""
+    _add_column(conn, "conversations", "message_count", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "conversations", "last_message_at", "TIMESTAMP WITH TIME ZONE")
+    _add_column(conn, "conversations", "last_message_preview", "VARCHAR(200)")
+    _create_index(conn, "ix_conversations_updated_at_id", "conversations", "updated_at, id")
+
+    conn.execute(text("""
+        UPDATE conversations SET
+            message_count = (
+                SELECT COUNT(*) FROM messages m WHERE m.conversation_id = conversations.id
+            ),
+            last_message_at = (
+                SELECT MAX(m.timestamp) FROM messages m WHERE m.conversation_id = conversations.id
+            ),
+            last_message_preview = (
+                SELECT SUBSTR(m.content, 1, 200) FROM messages m
+                WHERE m.conversation_id = conversations.id
+                ORDER BY m.timestamp DESC, m.id DESC
+                LIMIT 1
+            )
+    """))
+
+
+def _full_text_search(conn: Connection):
+    """tsvector columns with GIN indexes, kept current by triggers (PostgreSQL only)"""
+    if conn.dialect.name != "postgresql":
+        return
+
+    for table, source in (("messages", "content"), ("conversations", "title")):
+        _add_column(conn, table, "search_vector", "TSVECTOR")
+        conn.execute(text(
+            f"UPDATE {table} SET search_vector = to_tsvector('english', coalesce({source}, '')) "
+            f"WHERE search_vector IS NULL"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector "
+            f"ON {table} USING GIN (search_vector)"
+        ))
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table}"))
+        conn.execute(text(
+            f"CREATE TRIGGER {table}_search_vector_update "
+            f"BEFORE INSERT OR UPDATE OF {source} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION "
+            f"tsvector_update_trigger(search_vector, 'pg_catalog.english', {source})"
+        ))
+
+
+def _keyset_indexes(conn: Connection):
+    """Composite (sort key, id) indexes for cursor pagination"""
+    _create_index(conn, "ix_documents_upload_date_id", "documents", "upload_date, id")
+    _create_index(conn, "ix_activity_logs_created_at_id", "activity_logs", "created_at, id")
+
+
+def _message_history_index(conn: Connection):
+    """Index for reading the newest messages of a conversation"""
+    _create_index(
+        conn, "ix_messages_conversation_id_timestamp", "messages", "conversation_id, timestamp"
+    )
+
+
+def _rollup_sketches(conn: Connection):
+    """Per-model rollups with latency sketches; rollups are derived, so rebuild them"""
+    from app.models import AnalyticsRollup
+
+    AnalyticsRollup.__table__.drop(conn, checkfirst=True)
+    AnalyticsRollup.__table__.create(conn)
+    conn.execute(text("DELETE FROM rollup_watermarks"))
+
+
+def _query_plan_indexes(conn: Connection):
+    """Indexes for the hot queries checked by app.tools.plan_check"""
+    _create_index(conn, "ix_analytics_events_type_timestamp", "analytics_events", "event_type, timestamp")
+    _create_index(conn, "ix_messages_timestamp", "messages", "timestamp")
+    _create_index(conn, "ix_conversations_created_at", "conversations", "created_at")
+    for column in ("action_type", "resource_type", "status"):
+        short = column.split("_")[0]
+        _create_index(
+            conn, f"ix_activity_logs_{short}_created_at", "activity_logs", f"{column}, created_at, id"
+        )
+
+    if conn.dialect.name == "postgresql":
+        _analytics_topic_index(conn)
+
+
+def _analytics_topic_index(conn: Connection):
+    """get_top_topics groups chat events by a JSON key few of them carry"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_analytics_events_topic "
+        "ON analytics_events ((metadata ->> 'topic')) "
+        "WHERE event_type = 'chat_message' AND (metadata -> 'topic') IS NOT NULL"
+    ))
+
+
+def _time_partitioning(conn: Connection):
+    """Monthly range partitions for analytics_events and activity_logs (PostgreSQL only)"""
+    if conn.dialect.name != "postgresql":
+        return
+    from app.services.partition_service import PARTITIONED_TABLES, PartitionService
+
+    for table in PARTITIONED_TABLES:
+        PartitionService.convert_to_partitioned(conn, table)
+    _analytics_topic_index(conn)
+
+
+def _activity_log_counters(conn: Connection):
+    """Backfill the per-day activity log counters from existing logs"""
+    from app.services.activity_log_stats import ActivityLogStats
+
+    ActivityLogStats.rebuild(conn)
+
+
+# Ordered list of (name, migration); names are recorded once applied
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_conversation_summary", _conversation_summary),
+    ("0002_conversation_counters", _conversation_counters),
+    ("0003_full_text_search", _full_text_search),
+    ("0004_keyset_indexes", _keyset_indexes),
+    ("0005_message_history_index", _message_history_index),
+    ("0006_rollup_sketches", _rollup_sketches),
+    ("0007_query_plan_indexes", _query_plan_indexes),
+    ("0008_time_partitioning", _time_partitioning),
+    ("0009_activity_log_counters", _activity_log_counters),
+]
+
+
+def run_migrations(engine: Engine, metadata: Optional[MetaData] = None):
+    """
+    Apply pending migrations in order
+
+    Every worker process runs this at startup. On PostgreSQL the whole run
+    holds an advisory lock, so concurrent processes apply each migration
+    once: the others wait, then find it recorded and skip it.
+
+    Args:
+        engine: Engine to migrate
+        metadata: Tables to create (create_all) first, under the same lock
+    """
+    with _migration_lock(engine):
+        if metadata is not None:
+            metadata.create_all(bind=engine)
+
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "name VARCHAR(100) PRIMARY KEY, "
+                "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+            ))
+            applied = {row[0] for row in conn.execute(text("SELECT name FROM schema_migrations"))}
+
+        for name, migration in MIGRATIONS:
+            if name in applied:
+                continue
+            with engine.begin() as conn:
+                migration(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (name) VALUES (:name)"),
+                    {"name": name}
+                )
+            logger.info(f"Applied migration {name}")
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    """Session-level pg_advisory_lock held on its own connection (no-op elsewhere)"""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            conn.commit()
@@ -3,13 +3,19 @@ FastAPI Main Application
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, Base, get_pool_stats
+from app.core.migrations import run_migrations
 from app.api import documents, chat, analytics, auth, tags, activity_logs
+from app.services.analytics_service import get_analytics_writer
+from app.services.analytics_rollup import get_rollup_compactor
+from app.services.partition_service import get_partition_maintainer
+from app.utils.activity_logger import get_activity_log_writer
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create database tables and apply migrations (one process at a time)
+run_migrations(engine, Base.metadata)
 
 # Create FastAPI app
 app = FastAPI(
@@ -26,8 +32,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Compress large JSON payloads for clients that accept gzip
+if settings.GZIP_ENABLED:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.GZIP_MINIMUM_SIZE,
+        compresslevel=settings.GZIP_COMPRESSION_LEVEL,
+    )
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(documents.router)
@@ -37,6 +52,24 @@ app.include_router(tags.router)
 app.include_router(activity_logs.router)
 
 
+@app.on_event("startup")
+def start_background_jobs():
+    """Start the analytics rollup compactor and partition maintenance"""
+    if settings.ROLLUP_ENABLED:
+        get_rollup_compactor().start()
+    if settings.PARTITION_MAINTENANCE_ENABLED:
+        get_partition_maintainer().start()
+
+
+@app.on_event("shutdown")
+def flush_buffers():
+    """Stop background jobs and write buffered analytics events and logs before the process exits"""
+    get_rollup_compactor().stop()
+    get_partition_maintainer().stop()
+    get_analytics_writer().close()
+    get_activity_log_writer().close()
+
+
 @app.get("/")
 def root():
     """Root endpoint"""
@@ -53,6 +86,12 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/db")
+def database_pool_health():
+    """Connection pool utilization of the sync and async engines"""
+    return get_pool_stats()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,9 +1,10 @@
 from .document import Document, DocumentStatus
 from .conversation import Conversation, Message, MessageFeedback
-from .analytics import AnalyticsEvent
+from .analytics import AnalyticsEvent, AnalyticsRollup, RollupWatermark
 from .user import User
 from .tag import Tag, document_tags
-from .activity_log import ActivityLog
+from .activity_log import ActivityLog, ActivityLogCounter
+from .resource_version import ResourceVersion
 
 __all__ = [
     "Document",
@@ -12,8 +13,12 @@ __all__ = [
     "Message",
     "MessageFeedback",
     "AnalyticsEvent",
+    "AnalyticsRollup",
+    "RollupWatermark",
     "User",
     "Tag",
     "document_tags",
     "ActivityLog",
+    "ActivityLogCounter",
+    "ResourceVersion",
 ]
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from typing import Dict, Optional, Tuple
+from datetime import date, datetime, timezone
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, JSON, Index, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 
 class ActivityLog(Base):
     __tablename__ = "activity_logs"
+    # Range partitioned by month on PostgreSQL, see PartitionService
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -20,7 +25,7 @@ class ActivityLog(Base):
     description = Column(Text, nullable=False)
 
     # Additional metadata
-    metadata = Column(JSON, default={})  # Store extra info like IP, browser, etc.
+    metadata_ = Column("metadata", JSON, default={})  # Store extra info like IP, browser, etc.
 
     # Status
     status = Column(String(20), default="success")  # success, failed, pending
@@ -28,5 +33,69 @@ class ActivityLog(Base):
     # Timestamp
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
+    __table_args__ = (
+        Index("ix_activity_logs_created_at_id", "created_at", "id"),
+        Index("ix_activity_logs_action_created_at", "action_type", "created_at", "id"),
+        Index("ix_activity_logs_resource_created_at", "resource_type", "created_at", "id"),
+        Index("ix_activity_logs_status_created_at", "status", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<ActivityLog {self.id}: {self.action_type} on {self.resource_type}>"
+
+
+class ActivityLogCounter(Base):
+    """Number of activity logs per UTC day, action type and status"""
+    __tablename__ = "activity_log_counters"
+
+    day = Column(Date, primary_key=True)
+    action_type = Column(String(50), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ActivityLogCounter {self.day} {self.action_type} {self.status}: {self.count}>"
+
+
+# (day, action_type, status)
+CounterKey = Tuple[date, str, str]
+
+
+def log_day(created_at: Optional[datetime] = None) -> date:
+    """UTC day an activity log is counted under"""
+    if created_at is None:
+        return datetime.utcnow().date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def increment_log_counters(connection: Connection, deltas: Dict[CounterKey, int]):
+    """Add deltas to the counters with one upsert, creating missing rows"""
+    if not deltas:
+        return
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    counters = ActivityLogCounter.__table__
+    statement = dialect.insert(counters)
+    statement = statement.on_conflict_do_update(
+        index_elements=[counters.c.day, counters.c.action_type, counters.c.status],
+        set_={"count": counters.c.count + statement.excluded["count"]},
+    )
+    # Sorted, so concurrent transactions lock counter rows in the same order
+    connection.execute(statement, [
+        {"day": day, "action_type": action_type, "status": status, "count": delta}
+        for (day, action_type, status), delta in sorted(deltas.items())
+    ])
+
+
+@event.listens_for(ActivityLog, "after_insert")
+def _count_inserted_log(mapper, connection, target):
+    """Count the log in the same transaction as the insert"""
+    key = (log_day(target.created_at), target.action_type, target.status or "success")
+    increment_log_counters(connection, {key: 1})
+
+
+@event.listens_for(ActivityLog, "after_delete")
+def _uncount_deleted_log(mapper, connection, target):
+    key = (log_day(target.created_at), target.action_type, target.status or "success")
+    increment_log_counters(connection, {key: -1})
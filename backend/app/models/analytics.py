@@ -1,22 +1,68 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Float
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Float, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 
 class AnalyticsEvent(Base):
     __tablename__ = "analytics_events"
+    # Range partitioned by month on PostgreSQL, see PartitionService
 
     id = Column(Integer, primary_key=True, index=True)
 
     event_type = Column(String(100), nullable=False, index=True)
     # Event types: chat_message, document_upload, search_query, etc.
 
-    metadata = Column(JSON, default={})
+    metadata_ = Column("metadata", JSON, default={})
     # Can include: query, response_time, documents_used, user_id, etc.
 
     value = Column(Float, nullable=True)  # Numeric value if applicable
 
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
+    __table_args__ = (
+        Index("ix_analytics_events_type_timestamp", "event_type", "timestamp"),
+    )
+
     def __repr__(self):
         return f"<AnalyticsEvent {self.event_type}>"
+
+
+class AnalyticsRollup(Base):
+    """Pre-aggregated counts and value stats per time bucket"""
+    __tablename__ = "analytics_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    granularity = Column(String(10), nullable=False)  # hour, day
+    bucket_start = Column(DateTime(timezone=True), nullable=False)  # UTC
+
+    metric = Column(String(100), nullable=False)
+    # Event types of analytics_events, plus "message" and "conversation"
+    provider = Column(String(50), nullable=False, default="")
+    model = Column(String(100), nullable=False, default="")
+    category = Column(String(50), nullable=False, default="")
+
+    count = Column(Integer, nullable=False, default=0)
+    value_count = Column(Integer, nullable=False, default=0)  # rows with a value
+    value_sum = Column(Float, nullable=False, default=0.0)
+    value_min = Column(Float, nullable=True)
+    value_max = Column(Float, nullable=True)
+    value_sketch = Column(JSON, nullable=True)  # LatencySketch.to_dict() of the values
+
+    __table_args__ = (
+        UniqueConstraint(
+            "granularity", "metric", "bucket_start", "provider", "model", "category",
+            name="uq_analytics_rollups_bucket"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<AnalyticsRollup {self.granularity} {self.metric} {self.bucket_start}>"
+
+
+class RollupWatermark(Base):
+    """Raw rows older than processed_until are covered by the rollups"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    processed_until = Column(DateTime(timezone=True), nullable=False)
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Float, Index, event, select, update
+from sqlalchemy.orm import Session, relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 
+PREVIEW_LENGTH = 200
+
+
 class Conversation(Base):
     __tablename__ = "conversations"
 
@@ -14,9 +17,23 @@ class Conversation(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
+    # Rolling summary of older turns, sent to the LLM in place of raw history
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)  # Last message folded into the summary
+
+    # Denormalized counters, maintained by the Message insert/delete listeners below
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    last_message_preview = Column(String(PREVIEW_LENGTH), nullable=True)
+
     # Relationships
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_conversations_updated_at_id", "updated_at", "id"),
+        Index("ix_conversations_created_at", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Conversation {self.id}: {self.title}>"
 
@@ -32,10 +49,15 @@ class Message(Base):
 
     # RAG-specific fields
     sources = Column(JSON, default=[])  # List of source documents used
-    metadata = Column(JSON, default={})  # Additional metadata
+    metadata_ = Column("metadata", JSON, default={})  # Additional metadata
 
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_messages_conversation_id_timestamp", "conversation_id", "timestamp"),
+        Index("ix_messages_timestamp", "timestamp"),
+    )
+
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
     feedback = relationship("MessageFeedback", back_populates="message", uselist=False)
@@ -60,3 +82,56 @@ class MessageFeedback(Base):
 
     def __repr__(self):
         return f"<MessageFeedback {self.id}: {self.rating} stars>"
+
+
+@event.listens_for(Message, "after_insert")
+def _increment_conversation_counters(mapper, connection, target):
+    """Update the conversation's counters in the same transaction as the insert"""
+    conversations = Conversation.__table__
+    connection.execute(
+        update(conversations)
+        .where(conversations.c.id == target.conversation_id)
+        .values(
+            message_count=conversations.c.message_count + 1,
+            # Same server default the message row gets when no timestamp is set
+            last_message_at=target.timestamp if target.timestamp is not None else func.now(),
+            last_message_preview=(target.content or "")[:PREVIEW_LENGTH],
+        )
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _recompute_conversation_counters(session, flush_context):
+    """
+    Recompute the counters of conversations that lost messages in this flush
+
+    One UPDATE covers every affected conversation, however many messages
+    were deleted. Conversations deleted in the same flush are skipped.
+    """
+    deleted_conversations = {obj.id for obj in session.deleted if isinstance(obj, Conversation)}
+    affected = {
+        obj.conversation_id for obj in session.deleted if isinstance(obj, Message)
+    } - deleted_conversations
+    if not affected:
+        return
+
+    conversations = Conversation.__table__
+    messages = Message.__table__
+    remaining = messages.c.conversation_id == conversations.c.id
+    latest = (
+        select(messages.c.timestamp, messages.c.content)
+        .where(remaining)
+        .order_by(messages.c.timestamp.desc(), messages.c.id.desc())
+        .limit(1)
+    )
+    session.connection().execute(
+        update(conversations)
+        .where(conversations.c.id.in_(sorted(affected)))
+        .values(
+            message_count=select(func.count()).where(remaining).scalar_subquery(),
+            last_message_at=latest.with_only_columns(messages.c.timestamp).scalar_subquery(),
+            last_message_preview=func.substr(
+                latest.with_only_columns(messages.c.content).scalar_subquery(), 1, PREVIEW_LENGTH
+            ),
+        )
+    )
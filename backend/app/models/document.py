@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -28,7 +28,7 @@ class Document(Base):
     )
 
     chunks_count = Column(Integer, default=0)
-    metadata = Column(JSON, default={})
+    metadata_ = Column("metadata", JSON, default={})
 
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
     processed_date = Column(DateTime(timezone=True), nullable=True)
@@ -39,5 +39,9 @@ class Document(Base):
     from app.models.tag import document_tags
     tags = relationship("Tag", secondary=document_tags, back_populates="documents")
 
+    __table_args__ = (
+        Index("ix_documents_upload_date_id", "upload_date", "id"),
+    )
+
     def __repr__(self):
         return f"<Document {self.filename}>"
@@ -0,0 +1,100 @@
+from typing import Any, Dict, Iterable, Optional, Set
+from sqlalchemy import Column, Integer, String, event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from app.core.database import Base
+from .document import Document
+from .tag import Tag
+from .conversation import Conversation, Message
+
+
+class ResourceVersion(Base):
+    """Change counter of an API resource, the stamp its ETags are built from"""
+    __tablename__ = "resource_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ResourceVersion {self.name}: {self.version}>"
+
+
+# Resources whose responses change when rows of a model are written
+VERSIONED_MODELS = {
+    Document: ("documents", "tags"),  # tag document counts drop when a document is deleted
+    Tag: ("tags",),
+}
+
+# Conversations are versioned per user, so concurrent chat turns of
+# different users don't all update one version row. Readers of every
+# user's conversations ask for CONVERSATIONS, the sum of those versions.
+CONVERSATIONS = "conversations:*"
+
+
+def conversation_resource(user_id: Optional[str]) -> str:
+    """Version row of one user's conversations"""
+    return f"conversations:{user_id or 'anonymous'}"
+
+
+def _conversation_resources(session: Session, obj: Any) -> Set[str]:
+    """Version rows a written Conversation or Message changes"""
+    if isinstance(obj, Message):
+        # Message counters and previews live on the conversation row
+        obj = obj.conversation or session.get(Conversation, obj.conversation_id)
+        if obj is None:
+            return set()
+    return {conversation_resource(obj.user_id)}
+
+
+def bump_versions(connection: Connection, names: Iterable[str]):
+    """Increment the versions of resources with one upsert, creating missing rows"""
+    names = sorted(set(names))
+    if not names:
+        return
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    versions = ResourceVersion.__table__
+    statement = dialect.insert(versions)
+    statement = statement.on_conflict_do_update(
+        index_elements=[versions.c.name],
+        set_={"version": versions.c.version + 1},
+    )
+    # Sorted, so concurrent transactions lock version rows in the same order
+    connection.execute(statement, [{"name": name, "version": 1} for name in names])
+
+
+def get_versions(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Current versions of resources, 0 for ones never written
+
+    A name ending in "*" gets the sum of the versions of every resource
+    with that prefix, which grows whenever any of them is bumped.
+    """
+    names = list(names)
+    versions = ResourceVersion.__table__
+    exact = [name for name in names if not name.endswith("*")]
+    found = dict(db.execute(
+        select(versions.c.name, versions.c.version).where(versions.c.name.in_(exact))
+    ).all()) if exact else {}
+    for name in names:
+        if name.endswith("*"):
+            found[name] = db.execute(
+                select(func.coalesce(func.sum(versions.c.version), 0))
+                .where(versions.c.name.startswith(name[:-1], autoescape=True))
+            ).scalar()
+    return {name: found.get(name, 0) for name in names}
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_resources(session, flush_context):
+    """Bump the resources a flush wrote to, in the same transaction"""
+    names = set()
+    written = list(session.new) + list(session.deleted) + [
+        obj for obj in session.dirty if session.is_modified(obj)
+    ]
+    for obj in written:
+        if isinstance(obj, (Conversation, Message)):
+            names.update(_conversation_resources(session, obj))
+        else:
+            names.update(VERSIONED_MODELS.get(type(obj), ()))
+    bump_versions(session.connection(), names)
@@ -10,6 +10,7 @@ from .conversation import (
     MessageResponse,
     MessageFeedbackCreate,
     MessageFeedbackResponse,
+    MessagePageResponse,
     ConversationBase,
     ConversationCreate,
     ConversationResponse,
@@ -39,6 +40,7 @@ __all__ = [
     "MessageResponse",
     "MessageFeedbackCreate",
     "MessageFeedbackResponse",
+    "MessagePageResponse",
     "ConversationBase",
     "ConversationCreate",
     "ConversationResponse",
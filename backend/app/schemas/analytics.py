@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field
 from datetime import datetime
 from typing import Optional, Dict, Any
 
@@ -12,7 +12,7 @@ class AnalyticsEventCreate(BaseModel):
 class AnalyticsEventResponse(BaseModel):
     id: int
     event_type: str
-    metadata: Dict[str, Any]
+    metadata: Dict[str, Any] = Field(validation_alias=AliasChoices("metadata_", "metadata"))
     value: Optional[float]
     timestamp: datetime
 
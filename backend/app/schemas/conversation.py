@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
@@ -18,7 +18,7 @@ class MessageResponse(MessageBase):
     id: int
     conversation_id: int
     sources: List[Dict[str, Any]]
-    metadata: Dict[str, Any]
+    metadata: Dict[str, Any] = Field(validation_alias=AliasChoices("metadata_", "metadata"))
     timestamp: datetime
 
     class Config:
@@ -42,6 +42,16 @@ class MessageFeedbackResponse(BaseModel):
         from_attributes = True
 
 
+class MessagePageResponse(MessageBase):
+    """Message in a page of GET /conversations/{id}/messages; excluded fields are omitted"""
+    id: int
+    conversation_id: int
+    timestamp: datetime
+    sources: Optional[List[Dict[str, Any]]] = None
+    metadata: Optional[Dict[str, Any]] = None
+    feedback: Optional[MessageFeedbackResponse] = None
+
+
 class ConversationBase(BaseModel):
     title: Optional[str] = "New Conversation"
 
@@ -67,6 +77,8 @@ class ConversationListResponse(ConversationBase):
     created_at: datetime
     updated_at: datetime
     message_count: int = 0
+    last_message_at: Optional[datetime] = None
+    last_message_preview: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -78,3 +90,4 @@ class ChatRequest(BaseModel):
     llm_provider: Optional[str] = None  # openai, anthropic, google
     model: Optional[str] = None
     document_ids: Optional[List[int]] = None  # Filter search to specific documents
+    tag_ids: Optional[List[int]] = None  # Filter search to documents with any of these tags
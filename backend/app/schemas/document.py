@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field
 from datetime import datetime
 from typing import Optional, Dict, Any
 from app.models.document import DocumentStatus
@@ -18,7 +18,7 @@ class DocumentResponse(DocumentBase):
     file_size: int
     status: DocumentStatus
     chunks_count: int
-    metadata: Dict[str, Any]
+    metadata: Dict[str, Any] = Field(validation_alias=AliasChoices("metadata_", "metadata"))
     upload_date: datetime
     processed_date: Optional[datetime]
     error_message: Optional[str]
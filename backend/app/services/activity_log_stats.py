@@ -0,0 +1,155 @@
+"""
+Activity Log Stats Service
+Log statistics served from per-day counters instead of the raw table
+"""
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import ActivityLog, ActivityLogCounter
+from app.models.activity_log import CounterKey, increment_log_counters
+
+
+def _start_day(days: int) -> date:
+    return (datetime.utcnow() - timedelta(days=days)).date()
+
+
+def _raw_counts(dialect_name: str, since: Optional[date] = None):
+    """Statement counting raw logs per (day, action_type, status)"""
+    created_at = ActivityLog.created_at
+    if dialect_name == "postgresql":
+        created_at = func.timezone("UTC", created_at)
+    day = func.date(created_at)
+    status = func.coalesce(ActivityLog.status, "success")
+
+    statement = select(
+        day.label("day"), ActivityLog.action_type, status.label("status"), func.count().label("count")
+    ).group_by(day, ActivityLog.action_type, status)
+    if since is not None:
+        statement = statement.where(ActivityLog.created_at >= datetime.combine(since, time()))
+    return statement
+
+
+def _as_date(value) -> date:
+    # SQLite returns date() as text
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+class ActivityLogStats:
+    """
+    Statistics from activity_log_counters
+
+    The counters are kept current by the ActivityLog insert/delete
+    listeners, so a stats window costs at most one row per day, action
+    type and status, however many logs it covers. Windows are counted in
+    whole UTC days.
+    """
+
+    @staticmethod
+    def get_stats(db: Session, days: int = 7) -> Dict[str, Any]:
+        """
+        Total, per-action and per-status log counts
+
+        Args:
+            db: Database session
+            days: Window length; counts start at the UTC day `days` days ago
+
+        Returns:
+            Dict with total_logs, by_action and by_status
+        """
+        rows = db.execute(
+            select(
+                ActivityLogCounter.action_type,
+                ActivityLogCounter.status,
+                func.sum(ActivityLogCounter.count)
+            ).where(
+                ActivityLogCounter.day >= _start_day(days)
+            ).group_by(ActivityLogCounter.action_type, ActivityLogCounter.status)
+        ).all()
+
+        by_action: Dict[str, int] = {}
+        by_status: Dict[str, int] = {}
+        for action_type, status, count in rows:
+            by_action[action_type] = by_action.get(action_type, 0) + count
+            by_status[status] = by_status.get(status, 0) + count
+
+        return {
+            "total_logs": sum(by_action.values()),
+            "by_action": [
+                {"action": action, "count": count}
+                for action, count in sorted(by_action.items(), key=lambda item: -item[1])
+                if count
+            ],
+            "by_status": [
+                {"status": status, "count": count}
+                for status, count in sorted(by_status.items(), key=lambda item: -item[1])
+                if count
+            ],
+        }
+
+    @staticmethod
+    def check(db: Session, days: int = 7, repair: bool = False) -> Dict[str, Any]:
+        """
+        Compare the counters with a count of the raw activity_logs rows
+
+        Days whose logs were archived by the retention policy only exist
+        in the counters and show up as mismatches.
+
+        Args:
+            db: Database session
+            days: Window length, as in get_stats
+            repair: Overwrite mismatching counters with the raw counts
+
+        Returns:
+            Dict with consistent, checked (number of keys) and mismatches
+        """
+        since = _start_day(days)
+        raw = db.execute(_raw_counts(db.get_bind().dialect.name, since))
+        actual: Dict[CounterKey, int] = {
+            (_as_date(day), action_type, status): count
+            for day, action_type, status, count in raw
+        }
+        counted: Dict[CounterKey, int] = {
+            (row.day, row.action_type, row.status): row.count
+            for row in db.execute(
+                select(ActivityLogCounter).where(ActivityLogCounter.day >= since)
+            ).scalars()
+        }
+
+        mismatches: List[Dict[str, Any]] = []
+        for key in sorted(set(actual) | set(counted)):
+            if actual.get(key, 0) != counted.get(key, 0):
+                day, action_type, status = key
+                mismatches.append({
+                    "day": day.isoformat(),
+                    "action_type": action_type,
+                    "status": status,
+                    "counter": counted.get(key, 0),
+                    "actual": actual.get(key, 0),
+                })
+
+        if repair and mismatches:
+            increment_log_counters(db.connection(), {
+                (date.fromisoformat(m["day"]), m["action_type"], m["status"]): m["actual"] - m["counter"]
+                for m in mismatches
+            })
+            db.commit()
+
+        return {
+            "consistent": not mismatches,
+            "checked": len(set(actual) | set(counted)),
+            "mismatches": mismatches,
+            "repaired": repair and bool(mismatches),
+        }
+
+    @staticmethod
+    def rebuild(conn: Connection):
+        """Recount every counter from the raw table (backfill after bulk loads)"""
+        counters = ActivityLogCounter.__table__
+        conn.execute(delete(counters))
+        conn.execute(insert(counters).from_select(
+            ["day", "action_type", "status", "count"], _raw_counts(conn.dialect.name)
+        ))
@@ -0,0 +1,163 @@
+"""
+Analytics Cache
+TTL cache for AnalyticsService results with request coalescing and
+stale-while-revalidate refresh
+"""
+from typing import Any, Callable, Dict, Hashable, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+import functools
+import threading
+import time
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("value", "computed_at")
+
+    def __init__(self, value: Any, computed_at: float):
+        self.value = value
+        self.computed_at = computed_at
+
+
+class AnalyticsCache:
+    """
+    In-process result cache keyed by method and parameters
+
+    A fresh entry (younger than its TTL) is returned as is. An entry past
+    its TTL but within the stale window is still returned immediately,
+    while one background refresh recomputes it on its own session. With no
+    usable entry, the first caller computes it and concurrent callers for
+    the same key wait for that result instead of running the queries again.
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, stale_ttl: float):
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="analytics-refresh")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(
+        self,
+        key: Hashable,
+        compute: Callable[[Session], Any],
+        db: Session,
+        ttl: float
+    ) -> Any:
+        """Cached value of key, computing it with compute(db) when needed"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.computed_at
+                if age < ttl:
+                    self.hits += 1
+                    return entry.value
+                if age < ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = Future()
+                        self._executor.submit(self._refresh, key, compute)
+                    return entry.value
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute(db)
+        except BaseException as e:
+            self._settle(key, error=e)
+            raise
+        self._settle(key, value=value)
+        return value
+
+    def _refresh(self, key: Hashable, compute: Callable[[Session], Any]):
+        db = SessionLocal()
+        try:
+            value = compute(db)
+        except Exception as e:
+            logger.error(f"Error refreshing analytics cache entry {key}: {str(e)}")
+            self._settle(key, error=e, keep_stale=True)
+        else:
+            self._settle(key, value=value)
+        finally:
+            db.close()
+
+    def _settle(
+        self,
+        key: Hashable,
+        value: Any = None,
+        error: Optional[BaseException] = None,
+        keep_stale: bool = False
+    ):
+        with self._lock:
+            future = self._inflight.pop(key, None)
+            if error is None:
+                self._entries[key] = _Entry(value, time.monotonic())
+            elif not keep_stale:
+                self._entries.pop(key, None)
+        if future is not None:
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+analytics_cache = AnalyticsCache(stale_ttl=settings.ANALYTICS_CACHE_STALE_TTL)
+
+
+def cached_query(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Cache an AnalyticsService method taking the session as first argument
+
+    The TTL is ANALYTICS_CACHE_TTLS[method name], falling back to
+    ANALYTICS_CACHE_TTL.
+    """
+    @functools.wraps(fn)
+    def wrapper(db: Session, *args, **kwargs):
+        if not settings.ANALYTICS_CACHE_ENABLED:
+            return fn(db, *args, **kwargs)
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        ttl = settings.ANALYTICS_CACHE_TTLS.get(fn.__name__, settings.ANALYTICS_CACHE_TTL)
+        return analytics_cache.get(
+            key,
+            lambda session: fn(session, *args, **kwargs),
+            db,
+            ttl
+        )
+    return wrapper
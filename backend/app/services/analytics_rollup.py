@@ -0,0 +1,444 @@
+"""
+Analytics Rollup Service
+Hourly and daily aggregates behind the analytics dashboard
+"""
+from typing import Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import threading
+import logging
+
+from sqlalchemy import and_, delete, insert, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import AnalyticsEvent, AnalyticsRollup, Conversation, Message, RollupWatermark
+from app.utils.latency_sketch import LatencySketch
+
+logger = logging.getLogger(__name__)
+
+HOUR = "hour"
+DAY = "day"
+
+# Metrics rolled up from the messages and conversations tables; any other
+# metric is an analytics_events event type
+MESSAGE_METRIC = "message"
+CONVERSATION_METRIC = "conversation"
+
+WATERMARK_NAME = "analytics"
+
+# Arbitrary key for pg_try_advisory_xact_lock, so only one process compacts at a time
+COMPACT_LOCK_ID = 4305
+
+# (bucket_start, metric, provider, model, category)
+RollupKey = Tuple[datetime, str, str, str, str]
+
+# Raw row: (timestamp, metric, provider, model, category, value)
+RawRow = Tuple[datetime, str, str, str, str, Optional[float]]
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Timestamps come back aware from PostgreSQL and naive (UTC) from SQLite"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def floor_time(value: datetime, granularity: str) -> datetime:
+    """Start of the hour or day containing value"""
+    value = to_utc_naive(value).replace(minute=0, second=0, microsecond=0)
+    if granularity == DAY:
+        value = value.replace(hour=0)
+    return value
+
+
+class RollupBucket:
+    """Mergeable count, value statistics and latency sketch of one bucket"""
+
+    __slots__ = ("count", "value_count", "value_sum", "value_min", "value_max", "sketch")
+
+    def __init__(self):
+        self.count = 0
+        self.value_count = 0
+        self.value_sum = 0.0
+        self.value_min: Optional[float] = None
+        self.value_max: Optional[float] = None
+        self.sketch: Optional[LatencySketch] = None
+
+    def add(self, value: Optional[float]):
+        self.count += 1
+        if value is None:
+            return
+        self.value_count += 1
+        self.value_sum += value
+        self.value_min = value if self.value_min is None else min(self.value_min, value)
+        self.value_max = value if self.value_max is None else max(self.value_max, value)
+        if self.sketch is None:
+            self.sketch = LatencySketch()
+        self.sketch.add(value)
+
+    def merge(self, other: "RollupBucket"):
+        self.count += other.count
+        self.value_count += other.value_count
+        self.value_sum += other.value_sum
+        for attr, pick in (("value_min", min), ("value_max", max)):
+            theirs = getattr(other, attr)
+            if theirs is not None:
+                ours = getattr(self, attr)
+                setattr(self, attr, theirs if ours is None else pick(ours, theirs))
+        if other.sketch is not None:
+            if self.sketch is None:
+                self.sketch = LatencySketch()
+            self.sketch.merge(other.sketch)
+
+    @property
+    def value_avg(self) -> Optional[float]:
+        return self.value_sum / self.value_count if self.value_count else None
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Estimated p-th percentile of the values (within 1% relative error)"""
+        return self.sketch.quantile(p / 100) if self.sketch is not None else None
+
+    @classmethod
+    def from_row(cls, row: AnalyticsRollup) -> "RollupBucket":
+        bucket = cls()
+        bucket.count = row.count
+        bucket.value_count = row.value_count
+        bucket.value_sum = row.value_sum
+        bucket.value_min = row.value_min
+        bucket.value_max = row.value_max
+        if row.value_sketch:
+            bucket.sketch = LatencySketch.from_dict(row.value_sketch)
+        return bucket
+
+
+def group_buckets(
+    buckets: Dict[Tuple, RollupBucket],
+    key_fn: Callable[[Tuple], Hashable]
+) -> Dict[Hashable, RollupBucket]:
+    """Merge buckets sharing key_fn(key)"""
+    grouped: Dict[Hashable, RollupBucket] = {}
+    for key, bucket in buckets.items():
+        grouped.setdefault(key_fn(key), RollupBucket()).merge(bucket)
+    return grouped
+
+
+class AnalyticsRollupService:
+    """
+    Incrementally maintained analytics rollups
+
+    The compactor folds every complete hour since the watermark into hourly
+    rollups, re-derives the daily rollups of the days it touched, and moves
+    the watermark forward in the same transaction. Each run also rebuilds
+    the ROLLUP_LOOKBACK_HOURS before the watermark, so rows that land late
+    (buffered events, long transactions) are counted by the next run.
+    Readers combine the rollups with raw rows newer than the watermark, so
+    only the current partial bucket is aggregated on request.
+
+    Rollups count rows as they were written; deleting a conversation later
+    does not remove it from past buckets.
+    """
+
+    @staticmethod
+    def _raw_rows(
+        db: Session,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        metric: Optional[str] = None
+    ) -> Iterator[RawRow]:
+        """(timestamp, metric, provider, model, category, value) of raw rows in [start, end)"""
+        def window(query, column):
+            if start is not None:
+                query = query.where(column >= start)
+            if end is not None:
+                query = query.where(column < end)
+            return query
+
+        if metric is None or metric not in (MESSAGE_METRIC, CONVERSATION_METRIC):
+            events = window(select(
+                AnalyticsEvent.timestamp,
+                AnalyticsEvent.event_type,
+                AnalyticsEvent.metadata_["llm_provider"].as_string(),
+                AnalyticsEvent.metadata_["model"].as_string(),
+                AnalyticsEvent.value
+            ), AnalyticsEvent.timestamp)
+            if metric is not None:
+                events = events.where(AnalyticsEvent.event_type == metric)
+            for timestamp, event_type, provider, model, value in db.execute(events).yield_per(5000):
+                yield timestamp, event_type, (provider or "")[:50], (model or "")[:100], "", value
+
+        if metric in (None, MESSAGE_METRIC):
+            messages = window(select(
+                Message.timestamp,
+                Message.metadata_[("category", "category")].as_string()
+            ), Message.timestamp)
+            for timestamp, category in db.execute(messages).yield_per(5000):
+                yield timestamp, MESSAGE_METRIC, "", "", (category or "")[:50], None
+
+        if metric in (None, CONVERSATION_METRIC):
+            conversations = window(select(Conversation.created_at), Conversation.created_at)
+            for (timestamp,) in db.execute(conversations).yield_per(5000):
+                yield timestamp, CONVERSATION_METRIC, "", "", "", None
+
+    @staticmethod
+    def _aggregate(
+        rows: Iterable[RawRow],
+        granularity: str
+    ) -> Dict[RollupKey, RollupBucket]:
+        buckets: Dict[RollupKey, RollupBucket] = {}
+        for timestamp, metric, provider, model, category, value in rows:
+            if timestamp is None:
+                continue
+            key = (floor_time(timestamp, granularity), metric, provider, model, category)
+            buckets.setdefault(key, RollupBucket()).add(value)
+        return buckets
+
+    @staticmethod
+    def _insert(db: Session, granularity: str, buckets: Dict[RollupKey, RollupBucket]):
+        rows = [
+            {
+                "granularity": granularity,
+                "bucket_start": bucket_start,
+                "metric": metric,
+                "provider": provider,
+                "model": model,
+                "category": category,
+                "count": bucket.count,
+                "value_count": bucket.value_count,
+                "value_sum": bucket.value_sum,
+                "value_min": bucket.value_min,
+                "value_max": bucket.value_max,
+                "value_sketch": bucket.sketch.to_dict() if bucket.sketch is not None else None,
+            }
+            for (bucket_start, metric, provider, model, category), bucket in buckets.items()
+        ]
+        for i in range(0, len(rows), 1000):
+            db.execute(insert(AnalyticsRollup), rows[i:i + 1000])
+
+    @staticmethod
+    def get_watermark(db: Session) -> Optional[datetime]:
+        """Raw rows before this time are covered by the rollups (None before the first run)"""
+        watermark = db.get(RollupWatermark, WATERMARK_NAME)
+        return to_utc_naive(watermark.processed_until) if watermark else None
+
+    @staticmethod
+    def compact(db: Session, now: Optional[datetime] = None) -> int:
+        """
+        Roll complete hours since the watermark into the rollup tables
+
+        An hour is complete ROLLUP_GRACE_SECONDS after it ends, which leaves
+        time for buffered analytics events and long chat transactions that
+        carry earlier timestamps to land. Hours within ROLLUP_LOOKBACK_HOURS
+        of the watermark are rebuilt as well, for rows later than that. On
+        PostgreSQL a transaction-scoped advisory lock keeps concurrent
+        compactors (one per worker process) from rebuilding the same hours.
+
+        Returns:
+            Number of hourly buckets written
+        """
+        if db.bind.dialect.name == "postgresql":
+            locked = db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": COMPACT_LOCK_ID}
+            ).scalar()
+            if not locked:
+                db.rollback()
+                return 0
+
+        now = now or datetime.utcnow()
+        cutoff = floor_time(now - timedelta(seconds=settings.ROLLUP_GRACE_SECONDS), HOUR)
+        watermark = AnalyticsRollupService.get_watermark(db)
+        if watermark is not None and watermark >= cutoff:
+            db.rollback()
+            return 0
+        start = watermark - timedelta(hours=settings.ROLLUP_LOOKBACK_HOURS) if watermark is not None else None
+
+        hourly = AnalyticsRollupService._aggregate(
+            AnalyticsRollupService._raw_rows(db, start, cutoff), HOUR
+        )
+
+        clear = delete(AnalyticsRollup).where(
+            AnalyticsRollup.granularity == HOUR,
+            AnalyticsRollup.bucket_start < cutoff
+        )
+        if start is not None:
+            clear = clear.where(AnalyticsRollup.bucket_start >= start)
+        db.execute(clear)
+        AnalyticsRollupService._insert(db, HOUR, hourly)
+
+        # Re-derive the daily rows of every day that gained hours
+        if start is not None:
+            first_day = floor_time(start, DAY)
+        elif hourly:
+            first_day = floor_time(min(key[0] for key in hourly), DAY)
+        else:
+            first_day = None
+
+        if first_day is not None:
+            daily: Dict[RollupKey, RollupBucket] = {}
+            for row in db.execute(select(AnalyticsRollup).where(
+                AnalyticsRollup.granularity == HOUR,
+                AnalyticsRollup.bucket_start >= first_day
+            )).scalars():
+                key = (
+                    floor_time(row.bucket_start, DAY), row.metric, row.provider, row.model, row.category
+                )
+                daily.setdefault(key, RollupBucket()).merge(RollupBucket.from_row(row))
+
+            db.execute(delete(AnalyticsRollup).where(
+                AnalyticsRollup.granularity == DAY,
+                AnalyticsRollup.bucket_start >= first_day
+            ))
+            AnalyticsRollupService._insert(db, DAY, daily)
+
+        watermark = db.get(RollupWatermark, WATERMARK_NAME)
+        if watermark:
+            watermark.processed_until = cutoff
+        else:
+            db.add(RollupWatermark(name=WATERMARK_NAME, processed_until=cutoff))
+        db.commit()
+
+        logger.info(f"Compacted {len(hourly)} hourly analytics buckets up to {cutoff.isoformat()}")
+        return len(hourly)
+
+    @staticmethod
+    def query(
+        db: Session,
+        metric: str,
+        since: datetime,
+        granularity: str = DAY
+    ) -> Dict[Tuple[datetime, str, str, str], RollupBucket]:
+        """
+        Buckets of one metric from `since` (floored to the granularity) to now
+
+        Args:
+            db: Database session
+            metric: Event type, "message" or "conversation"
+            since: Start of the period (naive UTC)
+            granularity: "hour" or "day"
+
+        Returns:
+            Buckets keyed by (bucket_start, provider, model, category)
+        """
+        start = floor_time(since, granularity)
+        watermark = AnalyticsRollupService.get_watermark(db)
+
+        buckets: Dict[Tuple[datetime, str, str, str], RollupBucket] = {}
+        for row in db.execute(select(AnalyticsRollup).where(
+            AnalyticsRollup.granularity == granularity,
+            AnalyticsRollup.metric == metric,
+            AnalyticsRollup.bucket_start >= start
+        )).scalars():
+            key = (to_utc_naive(row.bucket_start), row.provider, row.model, row.category)
+            buckets.setdefault(key, RollupBucket()).merge(RollupBucket.from_row(row))
+
+        # Rows the compactor has not reached yet
+        raw_start = max(start, watermark) if watermark is not None else start
+        recent = AnalyticsRollupService._aggregate(
+            AnalyticsRollupService._raw_rows(db, raw_start, None, metric), granularity
+        )
+        for (bucket_start, _, provider, model, category), bucket in recent.items():
+            buckets.setdefault((bucket_start, provider, model, category), RollupBucket()).merge(bucket)
+        return buckets
+
+
+    @staticmethod
+    def query_period(
+        db: Session,
+        metric: str,
+        since: datetime
+    ) -> Dict[Tuple[datetime, str, str, str], RollupBucket]:
+        """
+        Buckets of one metric from `since` (floored to the hour) to now, at
+        the coarsest granularity that covers the period exactly
+
+        Whole days come from the daily rollups, the hours before the first
+        whole day from the hourly rollups, and rows past the watermark from
+        the raw tables. Bucket starts mix days and hours, so use this for
+        totals over a period and query() when a fixed granularity matters.
+
+        Args:
+            db: Database session
+            metric: Event type, "message" or "conversation"
+            since: Start of the period (naive UTC)
+
+        Returns:
+            Buckets keyed by (bucket_start, provider, model, category)
+        """
+        start = floor_time(since, HOUR)
+        first_day = floor_time(start, DAY)
+        if first_day < start:
+            first_day += timedelta(days=1)
+        watermark = AnalyticsRollupService.get_watermark(db)
+
+        buckets: Dict[Tuple[datetime, str, str, str], RollupBucket] = {}
+        if watermark is not None:
+            # Daily rows only hold hours before the watermark, like hourly ones
+            edge_end = min(first_day, watermark)
+            for row in db.execute(select(AnalyticsRollup).where(
+                AnalyticsRollup.metric == metric,
+                or_(
+                    and_(
+                        AnalyticsRollup.granularity == HOUR,
+                        AnalyticsRollup.bucket_start >= start,
+                        AnalyticsRollup.bucket_start < edge_end
+                    ),
+                    and_(
+                        AnalyticsRollup.granularity == DAY,
+                        AnalyticsRollup.bucket_start >= first_day
+                    ),
+                )
+            )).scalars():
+                key = (to_utc_naive(row.bucket_start), row.provider, row.model, row.category)
+                buckets.setdefault(key, RollupBucket()).merge(RollupBucket.from_row(row))
+
+        raw_start = max(start, watermark) if watermark is not None else start
+        recent = AnalyticsRollupService._aggregate(
+            AnalyticsRollupService._raw_rows(db, raw_start, None, metric), HOUR
+        )
+        for (bucket_start, _, provider, model, category), bucket in recent.items():
+            buckets.setdefault((bucket_start, provider, model, category), RollupBucket()).merge(bucket)
+        return buckets
+
+
+class RollupCompactor:
+    """Background thread running AnalyticsRollupService.compact periodically"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="rollup-compactor", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                AnalyticsRollupService.compact(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error compacting analytics rollups: {str(e)}")
+            finally:
+                db.close()
+            self._stop.wait(self.interval)
+
+
+_rollup_compactor = None
+
+
+def get_rollup_compactor() -> RollupCompactor:
+    """Get or create rollup compactor singleton"""
+    global _rollup_compactor
+    if _rollup_compactor is None:
+        _rollup_compactor = RollupCompactor(interval=settings.ROLLUP_COMPACT_INTERVAL)
+    return _rollup_compactor
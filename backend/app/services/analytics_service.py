@@ -2,16 +2,28 @@
 Analytics Service
 """
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
+from app.core.config import settings
 from app.models import Conversation, Message, Document, AnalyticsEvent, MessageFeedback
+from app.services.batch_writer import BatchWriter, insert_rows
+from app.services.analytics_cache import cached_query
+from app.services.analytics_rollup import (
+    AnalyticsRollupService,
+    group_buckets,
+    CONVERSATION_METRIC,
+    MESSAGE_METRIC,
+    DAY,
+    HOUR,
+)
 
 
 class AnalyticsService:
     """Service for analytics and statistics"""
 
     @staticmethod
+    @cached_query
     def get_summary(db: Session) -> Dict[str, Any]:
         """Get overall analytics summary"""
 
@@ -45,6 +57,7 @@ class AnalyticsService:
         }
 
     @staticmethod
+    @cached_query
     def get_time_series(
         db: Session,
         days: int = 7
@@ -52,35 +65,30 @@ class AnalyticsService:
         """Get time series data for conversations"""
         start_date = datetime.utcnow() - timedelta(days=days)
 
-        results = db.query(
-            func.date(Conversation.created_at).label('date'),
-            func.count(Conversation.id).label('count')
-        ).filter(
-            Conversation.created_at >= start_date
-        ).group_by(
-            func.date(Conversation.created_at)
-        ).order_by('date').all()
+        buckets = AnalyticsRollupService.query(db, CONVERSATION_METRIC, start_date, DAY)
+        per_day = group_buckets(buckets, lambda key: key[0].date())
 
         return [
             {
-                "date": str(result.date),
-                "count": result.count
+                "date": str(date),
+                "count": bucket.count
             }
-            for result in results
+            for date, bucket in sorted(per_day.items())
         ]
 
     @staticmethod
+    @cached_query
     def get_top_topics(
         db: Session,
         limit: int = 10
     ) -> List[Dict[str, Any]]:
         """Get top topics from analytics events"""
         results = db.query(
-            AnalyticsEvent.metadata['topic'].astext.label('topic'),
+            AnalyticsEvent.metadata_['topic'].as_string().label('topic'),
             func.count(AnalyticsEvent.id).label('count')
         ).filter(
             AnalyticsEvent.event_type == "chat_message",
-            AnalyticsEvent.metadata['topic'] != None
+            AnalyticsEvent.metadata_['topic'] != None
         ).group_by(
             'topic'
         ).order_by(
@@ -96,6 +104,7 @@ class AnalyticsService:
         ]
 
     @staticmethod
+    @cached_query
     def get_document_usage(db: Session) -> List[Dict[str, Any]]:
         """Get document usage statistics"""
         results = db.query(
@@ -122,91 +131,111 @@ class AnalyticsService:
         db: Session,
         event_type: str,
         metadata: Dict[str, Any] = None,
-        value: float = None
+        value: float = None,
+        commit: bool = True
     ):
-        """Log an analytics event"""
+        """
+        Log an analytics event
+
+        With ANALYTICS_BUFFER_ENABLED the event is queued for a bulk insert
+        by the background writer and `db` is not used. Otherwise it is added
+        to `db`, and commit=False leaves it to the caller's transaction.
+        """
+        if settings.ANALYTICS_BUFFER_ENABLED:
+            get_analytics_writer().submit({
+                "event_type": event_type,
+                "metadata": metadata or {},
+                "value": value,
+                "timestamp": datetime.now(timezone.utc),
+            })
+            return
+
         event = AnalyticsEvent(
             event_type=event_type,
-            metadata=metadata or {},
+            metadata_=metadata or {},
             value=value
         )
         db.add(event)
-        db.commit()
+        if commit:
+            db.commit()
 
     @staticmethod
+    @cached_query
     def get_response_times(db: Session, days: int = 7) -> List[Dict[str, Any]]:
         """Get response times over time"""
         start_date = datetime.utcnow() - timedelta(days=days)
 
-        results = db.query(
-            func.date(AnalyticsEvent.timestamp).label('date'),
-            func.avg(AnalyticsEvent.value).label('avg_time'),
-            func.min(AnalyticsEvent.value).label('min_time'),
-            func.max(AnalyticsEvent.value).label('max_time')
-        ).filter(
-            AnalyticsEvent.event_type == "chat_message",
-            AnalyticsEvent.timestamp >= start_date,
-            AnalyticsEvent.value != None
-        ).group_by(
-            func.date(AnalyticsEvent.timestamp)
-        ).order_by('date').all()
+        buckets = AnalyticsRollupService.query(db, "chat_message", start_date, DAY)
+        per_day = group_buckets(buckets, lambda key: key[0].date())
 
         return [
             {
-                "date": str(result.date),
-                "avg_response_time": round(float(result.avg_time), 2),
-                "min_response_time": round(float(result.min_time), 2),
-                "max_response_time": round(float(result.max_time), 2)
+                "date": str(date),
+                "avg_response_time": round(bucket.value_avg, 2),
+                "min_response_time": round(bucket.value_min, 2),
+                "max_response_time": round(bucket.value_max, 2),
+                **AnalyticsService._percentiles(bucket)
             }
-            for result in results
+            for date, bucket in sorted(per_day.items())
+            if bucket.value_count
         ]
 
     @staticmethod
-    def get_model_performance(db: Session, days: int = 30) -> List[Dict[str, Any]]:
-        """Get performance metrics for each LLM model"""
-        start_date = datetime.utcnow() - timedelta(days=days)
+    def _percentiles(bucket) -> Dict[str, Any]:
+        """p50/p90/p99 response times of a rollup bucket, merged from its sketches"""
+        return {
+            f"p{p}_response_time": round(value, 2) if value is not None else None
+            for p, value in ((p, bucket.percentile(p)) for p in (50, 90, 99))
+        }
 
-        # Get usage count and average response time per model
-        results = db.query(
-            AnalyticsEvent.metadata['llm_provider'].astext.label('provider'),
-            func.count(AnalyticsEvent.id).label('usage_count'),
-            func.avg(AnalyticsEvent.value).label('avg_response_time')
-        ).filter(
-            AnalyticsEvent.event_type == "chat_message",
-            AnalyticsEvent.timestamp >= start_date,
-            AnalyticsEvent.metadata['llm_provider'] != None
-        ).group_by('provider').all()
+    @staticmethod
+    @cached_query
+    def get_model_performance(
+        db: Session,
+        days: int = 30,
+        by_model: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Get performance metrics for each LLM provider (or provider and model)"""
+        start_date = datetime.utcnow() - timedelta(days=days)
 
-        return [
-            {
-                "provider": result.provider or "unknown",
-                "usage_count": result.usage_count,
-                "avg_response_time": round(float(result.avg_response_time), 2) if result.avg_response_time else 0
+        # Get usage count and response time distribution per provider/model
+        buckets = AnalyticsRollupService.query_period(db, "chat_message", start_date)
+        if by_model:
+            groups = group_buckets(buckets, lambda key: (key[1], key[2]))
+        else:
+            groups = group_buckets(buckets, lambda key: (key[1], None))
+
+        results = []
+        for (provider, model), bucket in groups.items():
+            if not provider:
+                continue
+            result = {
+                "provider": provider,
+                "usage_count": bucket.count,
+                "avg_response_time": round(bucket.value_avg, 2) if bucket.value_avg else 0,
+                **AnalyticsService._percentiles(bucket)
             }
-            for result in results
-        ]
+            if by_model:
+                result["model"] = model or "unknown"
+            results.append(result)
+        return results
 
     @staticmethod
+    @cached_query
     def get_user_engagement(db: Session, days: int = 30) -> Dict[str, Any]:
         """Get user engagement metrics"""
         start_date = datetime.utcnow() - timedelta(days=days)
 
         # Total conversations in period
-        conversations_in_period = db.query(Conversation).filter(
-            Conversation.created_at >= start_date
-        ).count()
+        conversation_buckets = AnalyticsRollupService.query_period(db, CONVERSATION_METRIC, start_date)
+        conversations_in_period = sum(bucket.count for bucket in conversation_buckets.values())
 
         # Total messages in period
-        messages_in_period = db.query(Message).filter(
-            Message.timestamp >= start_date
-        ).count()
+        message_buckets = AnalyticsRollupService.query_period(db, MESSAGE_METRIC, start_date)
+        messages_in_period = sum(bucket.count for bucket in message_buckets.values())
 
         # Active days (days with at least one message)
-        active_days = db.query(
-            func.count(func.distinct(func.date(Message.timestamp)))
-        ).filter(
-            Message.timestamp >= start_date
-        ).scalar()
+        active_days = len({key[0].date() for key, bucket in message_buckets.items() if bucket.count})
 
         # Average conversations per day
         avg_conversations_per_day = conversations_in_period / days if days > 0 else 0
@@ -221,36 +250,37 @@ class AnalyticsService:
         }
 
     @staticmethod
+    @cached_query
     def get_peak_hours(db: Session, days: int = 7) -> List[Dict[str, Any]]:
         """Get peak usage hours"""
         start_date = datetime.utcnow() - timedelta(days=days)
 
-        results = db.query(
-            func.extract('hour', Message.timestamp).label('hour'),
-            func.count(Message.id).label('count')
-        ).filter(
-            Message.timestamp >= start_date
-        ).group_by('hour').order_by('hour').all()
+        buckets = AnalyticsRollupService.query(db, MESSAGE_METRIC, start_date, HOUR)
+        per_hour = group_buckets(buckets, lambda key: key[0].hour)
 
         return [
             {
-                "hour": int(result.hour),
-                "message_count": result.count
+                "hour": hour,
+                "message_count": bucket.count
             }
-            for result in results
+            for hour, bucket in sorted(per_hour.items())
         ]
 
     @staticmethod
+    @cached_query
     def get_conversation_metrics(db: Session, days: int = 30) -> Dict[str, Any]:
         """Get conversation length and quality metrics"""
         start_date = datetime.utcnow() - timedelta(days=days)
 
-        # Get conversations in period with message counts
-        conversations = db.query(Conversation).filter(
-            Conversation.created_at >= start_date
-        ).all()
+        # Message counts are denormalized onto conversations
+        message_counts = [
+            row.message_count
+            for row in db.query(Conversation.message_count).filter(
+                Conversation.created_at >= start_date
+            ).order_by(Conversation.message_count).all()
+        ]
 
-        if not conversations:
+        if not message_counts:
             return {
                 "avg_conversation_length": 0,
                 "median_conversation_length": 0,
@@ -259,19 +289,28 @@ class AnalyticsService:
                 "total_conversations": 0
             }
 
-        message_counts = []
-        for conv in conversations:
-            count = db.query(Message).filter(
-                Message.conversation_id == conv.id
-            ).count()
-            message_counts.append(count)
-
-        message_counts.sort()
-
         return {
             "avg_conversation_length": round(sum(message_counts) / len(message_counts), 2),
             "median_conversation_length": message_counts[len(message_counts) // 2],
-            "shortest_conversation": min(message_counts),
-            "longest_conversation": max(message_counts),
-            "total_conversations": len(conversations)
+            "shortest_conversation": message_counts[0],
+            "longest_conversation": message_counts[-1],
+            "total_conversations": len(message_counts)
         }
+
+
+_analytics_writer = None
+
+
+def get_analytics_writer() -> BatchWriter:
+    """Get or create the buffered analytics event writer"""
+    global _analytics_writer
+    if _analytics_writer is None:
+        _analytics_writer = BatchWriter(
+            name="analytics",
+            write_fn=insert_rows(AnalyticsEvent.__table__),
+            max_queue_size=settings.ANALYTICS_BUFFER_MAX_SIZE,
+            batch_size=settings.ANALYTICS_BUFFER_BATCH_SIZE,
+            flush_interval=settings.ANALYTICS_BUFFER_FLUSH_INTERVAL,
+            put_timeout=settings.ANALYTICS_BUFFER_PUT_TIMEOUT,
+        )
+    return _analytics_writer
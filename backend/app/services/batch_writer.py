@@ -0,0 +1,158 @@
+"""
+Batch Writer
+Buffers rows in memory and inserts them in bulk from a background thread
+"""
+from typing import Any, Callable, Dict, List, Optional
+import atexit
+import queue
+import threading
+import time
+import logging
+
+from sqlalchemy import Table, insert
+
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """
+    Bounded in-process write buffer
+
+    Rows are queued by submit() and written by a single worker thread as
+    one batched INSERT per batch, once batch_size rows are waiting or
+    flush_interval seconds after the first row of a batch arrived. When the
+    queue is full, submit() waits up to put_timeout for space (backpressure)
+    and then drops the row, counting it in `dropped`. Rows still queued at
+    close() are written before it returns; close() also runs at interpreter
+    exit, for processes that never send the application shutdown event.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        write_fn: Callable[[List[Dict[str, Any]]], None],
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        put_timeout: float = 0.05
+    ):
+        self.name = name
+        self.write_fn = write_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue_size)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Counters are updated from producer threads and the writer thread
+        self._stats_lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """
+        Queue a row for writing
+
+        Returns:
+            False if the row was dropped (buffer stayed full or writer closed)
+        """
+        if self._stopping.is_set():
+            self._drop()
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            dropped = self._drop()
+            if dropped % 1000 == 1:
+                logger.warning(f"{self.name} buffer full, {dropped} rows dropped so far")
+            return False
+
+    def _drop(self) -> int:
+        with self._stats_lock:
+            self.dropped += 1
+            return self.dropped
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None and not self._stopping.is_set():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"{self.name}-writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _collect(self) -> List[Dict[str, Any]]:
+        """Wait for a first row, then gather more until the batch is full or due"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if self._stopping.is_set() or remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            self.write_fn(batch)
+            with self._stats_lock:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception as e:
+            with self._stats_lock:
+                self.failed += len(batch)
+            logger.error(f"{self.name} writer failed to insert {len(batch)} rows: {str(e)}")
+
+    def close(self, timeout: float = 10.0):
+        """Stop accepting rows and write whatever is still queued"""
+        self._stopping.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+            }
+
+
+def insert_rows(table: Table) -> Callable[[List[Dict[str, Any]]], None]:
+    """write_fn inserting a batch into table with one executemany on its own session"""
+    def write(rows: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            # executemany form: one cached statement, batched by the dialect
+            db.execute(insert(table), rows)
+            db.commit()
+        finally:
+            db.close()
+    return write
@@ -0,0 +1,166 @@
+"""
+Chat Pipeline
+Runs the independent stages of a chat turn concurrently
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+import threading
+import time
+
+from app.core.config import settings
+
+
+class StageGraph:
+    """
+    Small dependency graph of named stages
+
+    Each stage is a callable receiving the results of the stages it depends
+    on as positional arguments. A stage is submitted to the shared worker
+    pool as soon as all of its dependencies have finished, so independent
+    stages overlap and no worker ever blocks waiting on another stage.
+    Start offsets and durations are recorded per stage in `timings`.
+
+    Inline stages run on the thread calling run(), in registration order,
+    while the pool works on the others. Anything touching the request's DB
+    session must be an inline stage: a Session is not thread-safe, so pool
+    stages may only work on plain values.
+    """
+
+    _executor = ThreadPoolExecutor(
+        max_workers=settings.CHAT_PIPELINE_WORKERS,
+        thread_name_prefix="chat-stage"
+    )
+
+    def __init__(self):
+        self._stages: Dict[str, Callable[..., Any]] = {}
+        self._depends_on: Dict[str, List[str]] = {}
+        self._inline: List[str] = []
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._running = 0
+        self._started_at = 0.0
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        depends_on: Sequence[str] = (),
+        inline: bool = False
+    ) -> "StageGraph":
+        """Register a stage (its dependencies must be registered first)"""
+        if inline and depends_on:
+            raise ValueError(f"Inline stage '{name}' cannot depend on other stages")
+        for dependency in depends_on:
+            if dependency not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self._stages[name] = fn
+        self._depends_on[name] = list(depends_on)
+        self._futures[name] = Future()
+        if inline:
+            self._inline.append(name)
+        return self
+
+    def run(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Execute every stage and wait for all of them
+
+        Returns:
+            Results keyed by stage name
+
+        Raises:
+            The exception of the first failed stage in registration order.
+            Stages depending on a failed stage are not run, and stages
+            already running are allowed to finish before this returns.
+        """
+        self._started_at = time.perf_counter()
+        with self._lock:
+            roots = [
+                name for name in self._stages
+                if not self._depends_on[name] and name not in self._inline
+            ]
+            for name in roots + self._inline:
+                self._futures[name].set_running_or_notify_cancel()
+            self._running += len(roots) + len(self._inline)
+        for name in roots:
+            self._executor.submit(self._execute, name)
+        for name in self._inline:
+            self._execute(name)
+
+        results = {}
+        try:
+            for name, future in self._futures.items():
+                results[name] = future.result(timeout=timeout)
+        finally:
+            # A failed stage must not leave siblings running past the request
+            with self._idle:
+                while self._running:
+                    self._idle.wait()
+
+        self.timings["total"] = {
+            "start_ms": 0.0,
+            "duration_ms": round((time.perf_counter() - self._started_at) * 1000, 2),
+        }
+        return results
+
+    def _execute(self, name: str):
+        """Run a claimed stage, then release whatever it unblocks"""
+        started = time.perf_counter()
+        try:
+            args = [self._futures[dependency].result() for dependency in self._depends_on[name]]
+            result = self._stages[name](*args)
+        except BaseException as e:
+            self._record(name, started)
+            self._settle(name, error=e)
+            with self._lock:
+                self._fail_dependents(name, e)
+        else:
+            self._record(name, started)
+            self._settle(name, result=result)
+            self._schedule_dependents(name)
+        finally:
+            with self._idle:
+                self._running -= 1
+                self._idle.notify_all()
+
+    def _settle(self, name: str, result: Any = None, error: Optional[BaseException] = None):
+        future = self._futures[name]
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            # Already failed because a sibling dependency failed
+            pass
+
+    def _record(self, name: str, started: float):
+        self.timings[name] = {
+            "start_ms": round((started - self._started_at) * 1000, 2),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _schedule_dependents(self, finished: str):
+        ready = []
+        with self._lock:
+            for name, dependencies in self._depends_on.items():
+                future = self._futures[name]
+                if finished not in dependencies or future.running() or future.done():
+                    continue
+                if all(self._futures[d].done() for d in dependencies):
+                    future.set_running_or_notify_cancel()
+                    ready.append(name)
+            self._running += len(ready)
+        for name in ready:
+            self._executor.submit(self._execute, name)
+
+    def _fail_dependents(self, failed: str, error: BaseException):
+        """Fail every stage downstream of a failed one (caller holds the lock)"""
+        for name, dependencies in self._depends_on.items():
+            future = self._futures[name]
+            if failed in dependencies and not future.done():
+                if not future.running():
+                    future.set_running_or_notify_cancel()
+                future.set_exception(error)
+                self._fail_dependents(name, error)
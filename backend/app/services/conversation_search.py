@@ -0,0 +1,255 @@
+"""
+Conversation Search Service
+Ranked full-text search over conversation titles and messages
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+import math
+import re
+import threading
+
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session, object_session
+
+from app.models import Conversation, Message
+from app.utils.pagination import encode_cursor, decode_cursor
+
+# Title matches count more than a single message match
+TITLE_WEIGHT = 2.0
+
+
+class ConversationSearch:
+    """
+    Full-text conversation search
+
+    PostgreSQL uses the search_vector tsvector columns (GIN indexed and kept
+    current by triggers, see migration 0003). Other databases, such as the
+    SQLite files used in tests, fall back to an in-process inverted index.
+    """
+
+    @staticmethod
+    def search(
+        db: Session,
+        q: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        skip: int = 0
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        """
+        Search conversations, best match first
+
+        Args:
+            db: Database session
+            q: Search text
+            limit: Page size
+            cursor: Cursor returned with the previous page
+            skip: Offset (only used without a cursor)
+
+        Returns:
+            (conversations, cursor for the next page or None)
+        """
+        after = decode_cursor(cursor, 2) if cursor else None
+
+        if db.bind.dialect.name == "postgresql":
+            ranked = ConversationSearch._search_postgres(db, q, limit, after, skip)
+        else:
+            ranked = _fallback_index.search(db, q, limit, after, skip)
+
+        if not ranked:
+            return [], None
+
+        ids = [conversation_id for conversation_id, _ in ranked]
+        by_id = {
+            conv.id: conv
+            for conv in db.query(Conversation).filter(Conversation.id.in_(ids)).all()
+        }
+        conversations = [by_id[i] for i in ids if i in by_id]
+
+        next_cursor = None
+        if len(ranked) == limit:
+            last_id, last_rank = ranked[-1]
+            next_cursor = encode_cursor([last_rank, last_id])
+        return conversations, next_cursor
+
+    @staticmethod
+    def _search_postgres(
+        db: Session,
+        q: str,
+        limit: int,
+        after: Optional[list],
+        skip: int
+    ) -> List[Tuple[int, float]]:
+        """Rank conversations by their best-matching message or title"""
+        having = ""
+        params = {"q": q, "limit": limit, "title_weight": TITLE_WEIGHT}
+        if after:
+            having = (
+                "HAVING MAX(rank) < :after_rank "
+                "OR (MAX(rank) = :after_rank AND conversation_id < :after_id)"
+            )
+            params.update(after_rank=float(after[0]), after_id=int(after[1]))
+
+        rows = db.execute(text(f"""
+            WITH query AS (SELECT websearch_to_tsquery('english', :q) AS tsq)
+            SELECT conversation_id, MAX(rank) AS rank FROM (
+                SELECT m.conversation_id, ts_rank(m.search_vector, query.tsq)::float8 AS rank
+                FROM messages m, query
+                WHERE m.search_vector @@ query.tsq
+                UNION ALL
+                SELECT c.id, ts_rank(c.search_vector, query.tsq)::float8 * :title_weight
+                FROM conversations c, query
+                WHERE c.search_vector @@ query.tsq
+            ) hits
+            GROUP BY conversation_id
+            {having}
+            ORDER BY rank DESC, conversation_id DESC
+            LIMIT :limit OFFSET :offset
+        """), {**params, "offset": 0 if after else skip}).all()
+
+        return [(row.conversation_id, row.rank) for row in rows]
+
+
+def tokenize(value: str) -> List[str]:
+    """Lowercased word tokens"""
+    return re.findall(r"\w+", (value or "").lower())
+
+
+class InMemorySearchIndex:
+    """
+    Inverted index used when the database has no full-text support
+
+    Built lazily from the database on first search, then kept current by
+    the insert/delete listeners below. Their changes are queued on the
+    session and applied when it commits, so rolled back rows never show up.
+    """
+
+    def __init__(self):
+        # token -> conversation_id -> weighted term frequency
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def _load(self, db: Session):
+        with self._lock:
+            if self._loaded:
+                return
+            for conversation_id, title in db.execute(select(Conversation.id, Conversation.title)):
+                self._add(conversation_id, title, TITLE_WEIGHT)
+            for conversation_id, content in db.execute(
+                select(Message.conversation_id, Message.content)
+            ).yield_per(1000):
+                self._add(conversation_id, content, 1.0)
+            self._loaded = True
+
+    def clear(self):
+        """Drop the index; the next search loads it from the database again"""
+        with self._lock:
+            self._postings.clear()
+            self._loaded = False
+
+    def _add(self, conversation_id: int, value: str, weight: float):
+        with self._lock:
+            for token in tokenize(value):
+                self._postings[token][conversation_id] += weight
+
+    def add(self, conversation_id: int, value: str, weight: float = 1.0):
+        """Index new text (ignored until the index has been loaded)"""
+        if self._loaded:
+            self._add(conversation_id, value, weight)
+
+    def remove(self, conversation_id: int, value: Optional[str] = None, weight: float = 1.0):
+        """Remove text, or the whole conversation if value is None"""
+        if not self._loaded:
+            return
+        with self._lock:
+            if value is None:
+                for postings in self._postings.values():
+                    postings.pop(conversation_id, None)
+                return
+            for token in tokenize(value):
+                postings = self._postings.get(token)
+                if postings and conversation_id in postings:
+                    postings[conversation_id] -= weight
+                    if postings[conversation_id] <= 0:
+                        del postings[conversation_id]
+
+    def search(
+        self,
+        db: Session,
+        q: str,
+        limit: int,
+        after: Optional[list],
+        skip: int
+    ) -> List[Tuple[int, float]]:
+        """Conversations containing every query token, scored by tf-idf"""
+        self._load(db)
+        tokens = set(tokenize(q))
+        if not tokens:
+            return []
+
+        with self._lock:
+            total = len({cid for postings in self._postings.values() for cid in postings}) or 1
+            scores: Optional[Dict[int, float]] = None
+            for token in tokens:
+                postings = self._postings.get(token)
+                if not postings:
+                    return []
+                idf = math.log(1 + total / len(postings))
+                token_scores = {cid: (1 + math.log(tf)) * idf for cid, tf in postings.items() if tf > 0}
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {cid: s + token_scores[cid] for cid, s in scores.items() if cid in token_scores}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        if after:
+            after_rank, after_id = float(after[0]), int(after[1])
+            ranked = [
+                (cid, rank) for cid, rank in ranked
+                if rank < after_rank or (rank == after_rank and cid < after_id)
+            ]
+        else:
+            ranked = ranked[skip:]
+        return ranked[:limit]
+
+
+_fallback_index = InMemorySearchIndex()
+
+# session.info key of the index changes waiting for the transaction to commit
+PENDING_CHANGES = "search_index_changes"
+
+
+def _queue(connection, target, change: Callable[..., None], *args):
+    if connection.dialect.name != "postgresql":
+        object_session(target).info.setdefault(PENDING_CHANGES, []).append((change, args))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_index_changes(session):
+    for change, args in session.info.pop(PENDING_CHANGES, []):
+        change(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_index_changes(session):
+    session.info.pop(PENDING_CHANGES, None)
+
+
+@event.listens_for(Message, "after_insert")
+def _index_message(mapper, connection, target):
+    _queue(connection, target, _fallback_index.add, target.conversation_id, target.content)
+
+
+@event.listens_for(Message, "after_delete")
+def _unindex_message(mapper, connection, target):
+    _queue(connection, target, _fallback_index.remove, target.conversation_id, target.content)
+
+
+@event.listens_for(Conversation, "after_insert")
+def _index_conversation(mapper, connection, target):
+    _queue(connection, target, _fallback_index.add, target.id, target.title, TITLE_WEIGHT)
+
+
+@event.listens_for(Conversation, "after_delete")
+def _unindex_conversation(mapper, connection, target):
+    _queue(connection, target, _fallback_index.remove, target.id)
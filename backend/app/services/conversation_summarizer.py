@@ -0,0 +1,171 @@
+"""
+Conversation Summarizer
+Keeps prompt size bounded by folding older turns into a rolling summary
+"""
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import logging
+
+from langchain.schema import HumanMessage
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import Conversation, Message
+from app.services.llm_provider import LLMProvider
+from app.utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationSummarizer:
+    """Rolling summary of conversation history"""
+
+    SUMMARY_PROMPT = """You maintain a running summary of a customer support conversation for TechStore.
+
+Update the existing summary with the new messages below. Keep every fact the assistant may need later: the customer's products, order details, problems, and any answers or commitments already given. Drop greetings and repetition. Write at most {max_words} words.
+
+Existing summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarizer")
+    _in_progress = set()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def select_recent(
+        history: List[Dict[str, str]],
+        budget: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Pick the newest messages that fit in the history token budget
+
+        Args:
+            history: Unsummarized messages, oldest first
+            budget: Token budget (defaults to HISTORY_TOKEN_BUDGET)
+
+        Returns:
+            Suffix of history to send raw
+        """
+        budget = budget if budget is not None else settings.HISTORY_TOKEN_BUDGET
+        used = 0
+        start = len(history)
+        for i in range(len(history) - 1, -1, -1):
+            used += count_tokens(history[i]["content"]) + 4
+            if used > budget:
+                break
+            start = i
+        return history[start:]
+
+    @staticmethod
+    def needs_update(history: List[Dict[str, str]]) -> bool:
+        """True when unsummarized history no longer fits in the budget or fetch window"""
+        if len(history) >= settings.HISTORY_FETCH_LIMIT:
+            return True
+        return len(ConversationSummarizer.select_recent(history)) < len(history)
+
+    @classmethod
+    def schedule(
+        cls,
+        conversation_id: int,
+        llm_provider: Optional[str] = None,
+        model: Optional[str] = None
+    ):
+        """Update the summary in the background (at most one run per conversation)"""
+        with cls._lock:
+            if conversation_id in cls._in_progress:
+                return
+            cls._in_progress.add(conversation_id)
+
+        cls._executor.submit(cls._run, conversation_id, llm_provider, model)
+
+    @classmethod
+    def _run(cls, conversation_id: int, llm_provider: Optional[str], model: Optional[str]):
+        db = SessionLocal()
+        try:
+            cls.update_summary(db, conversation_id, llm_provider, model)
+        except Exception as e:
+            logger.error(f"Error summarizing conversation {conversation_id}: {str(e)}")
+        finally:
+            db.close()
+            with cls._lock:
+                cls._in_progress.discard(conversation_id)
+
+    @staticmethod
+    def _unsummarized_messages(db: Session, conversation: Conversation) -> List[Message]:
+        """Messages after the last folded one, filtered and ordered by (timestamp, id)"""
+        query = db.query(Message).filter(Message.conversation_id == conversation.id)
+        if conversation.summary_message_id:
+            folded = db.query(Message.timestamp, Message.id).filter(
+                Message.id == conversation.summary_message_id
+            ).first()
+            if folded:
+                query = query.filter(
+                    tuple_(Message.timestamp, Message.id) > tuple_(folded.timestamp, folded.id)
+                )
+        return query.order_by(Message.timestamp, Message.id).all()
+
+    @staticmethod
+    def update_summary(
+        db,
+        conversation_id: int,
+        llm_provider: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> bool:
+        """
+        Fold the oldest unsummarized turns into the conversation summary
+
+        Only half of the history budget is kept raw afterwards, so the
+        summary is refreshed every few turns rather than on every turn.
+
+        Returns:
+            True if the summary was updated
+        """
+        conversation = db.query(Conversation).filter(
+            Conversation.id == conversation_id
+        ).first()
+        if not conversation:
+            return False
+
+        messages = ConversationSummarizer._unsummarized_messages(db, conversation)
+        history = [{"role": msg.role, "content": msg.content} for msg in messages]
+        keep = min(
+            len(ConversationSummarizer.select_recent(
+                history, budget=settings.HISTORY_TOKEN_BUDGET // 2
+            )),
+            settings.HISTORY_FETCH_LIMIT // 2
+        )
+        to_fold = messages[:len(messages) - keep]
+        if not to_fold:
+            return False
+
+        transcript = "\n".join(
+            f"{msg.role.capitalize()}: {msg.content}" for msg in to_fold
+        )
+        prompt = ConversationSummarizer.SUMMARY_PROMPT.format(
+            max_words=int(settings.SUMMARY_MAX_TOKENS * 0.75),
+            summary=conversation.summary or "(none yet)",
+            messages=transcript
+        )
+
+        llm = LLMProvider.get_llm(
+            provider=settings.SUMMARY_LLM_PROVIDER or llm_provider,
+            model=settings.SUMMARY_MODEL or (None if settings.SUMMARY_LLM_PROVIDER else model),
+            temperature=0.2
+        )
+        response = llm.invoke([HumanMessage(content=prompt)])
+
+        conversation.summary = response.content.strip()
+        conversation.summary_message_id = to_fold[-1].id
+        db.commit()
+
+        logger.info(
+            f"Folded {len(to_fold)} messages into summary of conversation {conversation_id}"
+        )
+        return True
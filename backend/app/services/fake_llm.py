@@ -0,0 +1,123 @@
+"""
+Fake LLM Provider
+Deterministic local chat model for load testing and offline benchmarks
+"""
+from typing import Any, Iterator, AsyncIterator, List, Optional
+import asyncio
+import random
+import re
+import time
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeLLMError(Exception):
+    """Simulated provider failure"""
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers from templates with realistic timing
+
+    The same prompt and seed always produce the same answer, latency and
+    success/failure outcome, so load tests are reproducible.
+    """
+
+    model: str = "fake-echo"
+    time_to_first_token: float = 0.3  # seconds
+    tokens_per_second: float = 40.0
+    error_rate: float = 0.0  # 0.0 - 1.0
+    seed: int = 42
+    answer_templates: List[str] = [
+        "Thanks for your question about \"{question}\". Based on the knowledge base, {model} would answer this here.",
+    ]
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _rng(self, messages: List[BaseMessage]) -> random.Random:
+        """Random generator seeded by the seed and the prompt"""
+        prompt = "\n".join(str(msg.content) for msg in messages)
+        return random.Random(f"{self.seed}:{prompt}")
+
+    @staticmethod
+    def _question(messages: List[BaseMessage]) -> str:
+        """Pull the user's question out of the RAG prompt"""
+        content = str(messages[-1].content) if messages else ""
+        match = re.search(r"Question:\s*(.*?)\s*Answer:\s*$", content, re.DOTALL)
+        question = match.group(1) if match else content
+        return question.strip()[:200]
+
+    def _answer(self, messages: List[BaseMessage], rng: random.Random) -> List[str]:
+        """Pick a template, fill it in and split it into streaming tokens"""
+        if rng.random() < self.error_rate:
+            raise FakeLLMError("Simulated provider error")
+
+        template = rng.choice(self.answer_templates)
+        answer = template.replace("{question}", self._question(messages)).replace("{model}", self.model)
+        return re.findall(r"\S+\s*", answer) or [answer]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._answer(messages, self._rng(messages))
+        time.sleep(self.time_to_first_token + len(tokens) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._answer(messages, self._rng(messages))
+        await asyncio.sleep(self.time_to_first_token + len(tokens) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tokens = self._answer(messages, self._rng(messages))
+        time.sleep(self.time_to_first_token)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._answer(messages, self._rng(messages))
+        await asyncio.sleep(self.time_to_first_token)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
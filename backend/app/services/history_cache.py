@@ -0,0 +1,142 @@
+"""
+Conversation History Cache
+Bounded history reads with an in-process LRU of recent turns
+"""
+from typing import Dict, List, Optional
+from collections import OrderedDict, deque
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Conversation, Message
+
+
+class HistoryCache:
+    """
+    LRU cache of the most recent messages per conversation
+
+    Each entry holds up to HISTORY_FETCH_LIMIT of the newest messages as
+    {"id", "role", "content"} dicts. Entries are appended to as messages are
+    written, so an active conversation is served without a DB read. The
+    cache is per process; a conversation written through another worker is
+    picked up again once its entry is evicted or invalidated.
+    """
+
+    def __init__(self, max_conversations: int, max_messages: int):
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self._entries: "OrderedDict[int, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conversation_id: int, after_id: int = 0) -> Optional[List[Dict]]:
+        """Cached messages following after_id, oldest first (None on a miss)"""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+            return messages_after(list(entry), after_id)
+
+    def put(self, conversation_id: int, messages: List[Dict]):
+        """Store the newest messages loaded from the database"""
+        if self.max_conversations <= 0:
+            return
+        with self._lock:
+            self._entries[conversation_id] = deque(messages, maxlen=self.max_messages)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_conversations:
+                self._entries.popitem(last=False)
+
+    def append(self, conversation_id: int, messages: List[Dict]):
+        """Add committed messages to a cached conversation"""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None:
+                entry.extend(messages)
+
+    def invalidate(self, conversation_id: int):
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+    def clear(self):
+        """Forget every conversation"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "conversations": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+history_cache = HistoryCache(
+    max_conversations=settings.HISTORY_CACHE_SIZE,
+    max_messages=settings.HISTORY_FETCH_LIMIT,
+)
+
+
+def messages_after(messages: List[Dict], after_id: int) -> List[Dict]:
+    """
+    Messages following after_id in (timestamp, id) order
+
+    All of them if after_id is not among them, since a tail of the newest
+    messages only misses ones older than itself.
+    """
+    for i, msg in enumerate(messages):
+        if msg["id"] == after_id:
+            return messages[i + 1:]
+    return messages
+
+
+def message_to_dict(message: Message) -> Dict:
+    return {"id": message.id, "role": message.role, "content": message.content}
+
+
+def _tail_query(conversation_id: int):
+    """Newest HISTORY_FETCH_LIMIT messages, read via the (conversation_id, timestamp) index"""
+    return select(Message.id, Message.role, Message.content).where(
+        Message.conversation_id == conversation_id
+    ).order_by(
+        Message.timestamp.desc(), Message.id.desc()
+    ).limit(settings.HISTORY_FETCH_LIMIT)
+
+
+def _cache_tail(conversation: Conversation, tail) -> List[Dict]:
+    messages = [
+        {"id": row.id, "role": row.role, "content": row.content}
+        for row in reversed(tail)
+    ]
+    history_cache.put(conversation.id, messages)
+    return messages_after(messages, conversation.summary_message_id or 0)
+
+
+def get_recent_history(db: Session, conversation: Conversation) -> List[Dict]:
+    """
+    Newest unsummarized messages of a conversation, oldest first
+
+    At most HISTORY_FETCH_LIMIT messages are returned. On a cache miss only
+    that tail is read from the database.
+    """
+    cached = history_cache.get(conversation.id, conversation.summary_message_id or 0)
+    if cached is not None:
+        return cached
+    return _cache_tail(conversation, db.execute(_tail_query(conversation.id)).all())
+
+
+async def get_recent_history_async(db: AsyncSession, conversation: Conversation) -> List[Dict]:
+    """get_recent_history on an async session"""
+    cached = history_cache.get(conversation.id, conversation.summary_message_id or 0)
+    if cached is not None:
+        return cached
+    result = await db.execute(_tail_query(conversation.id))
+    return _cache_tail(conversation, result.all())
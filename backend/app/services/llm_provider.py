@@ -1,12 +1,14 @@
 """
 Multi-LLM Provider Service
-Supports OpenAI, Anthropic Claude, and Google Gemini
+Supports OpenAI, Anthropic Claude, and Google Gemini (plus a local fake for load testing)
 """
 from typing import Optional, List, Dict, Any
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
 from app.core.config import settings
+from app.services.rate_governor import GovernedLLM, get_rate_governor
+from app.services.fake_llm import FakeChatModel
 import openai
 from datetime import datetime, timedelta
 import logging
@@ -42,6 +44,9 @@ class LLMProvider:
             "gemini-1.5-flash",
             "gemini-pro",
             "gemini-pro-vision"
+        ],
+        "fake": [
+            "fake-echo"
         ]
     }
 
@@ -56,25 +61,31 @@ class LLMProvider:
         Get LLM instance based on provider
 
         Args:
-            provider: 'openai', 'anthropic', or 'google'
+            provider: 'openai', 'anthropic', 'google', or 'fake' (if FAKE_LLM_ENABLED)
             model: Model name (if None, uses default)
             temperature: Temperature for generation
             **kwargs: Additional provider-specific parameters
 
         Returns:
-            LangChain LLM instance
+            LangChain LLM instance wrapped by the rate governor
         """
         provider = provider or settings.DEFAULT_LLM_PROVIDER
 
         if provider == "openai":
-            return LLMProvider._get_openai(model, temperature, **kwargs)
+            llm = LLMProvider._get_openai(model, temperature, **kwargs)
         elif provider == "anthropic":
-            return LLMProvider._get_anthropic(model, temperature, **kwargs)
+            llm = LLMProvider._get_anthropic(model, temperature, **kwargs)
         elif provider == "google":
-            return LLMProvider._get_google(model, temperature, **kwargs)
+            llm = LLMProvider._get_google(model, temperature, **kwargs)
+        elif provider == "fake" and settings.FAKE_LLM_ENABLED:
+            llm = LLMProvider._get_fake(model, temperature, **kwargs)
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}")
 
+        # Resolve the default model so per-model limits apply to it too
+        model = model or getattr(llm, "model_name", None) or getattr(llm, "model", None)
+        return GovernedLLM(llm, provider, model, get_rate_governor())
+
     @staticmethod
     def _get_openai(model: Optional[str], temperature: float, **kwargs):
         """Get OpenAI LLM"""
@@ -108,6 +119,20 @@ class LLMProvider:
             **kwargs
         )
 
+    @staticmethod
+    def _get_fake(model: Optional[str], temperature: float, **kwargs):
+        """Get deterministic local fake LLM"""
+        model = model or "fake-echo"
+        return FakeChatModel(
+            model=model,
+            time_to_first_token=settings.FAKE_LLM_TIME_TO_FIRST_TOKEN,
+            tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+            error_rate=settings.FAKE_LLM_ERROR_RATE,
+            seed=settings.FAKE_LLM_SEED,
+            answer_templates=settings.FAKE_LLM_ANSWER_TEMPLATES,
+            **kwargs
+        )
+
     @staticmethod
     def _get_openai_models() -> List[str]:
         """
@@ -212,8 +237,19 @@ class LLMProvider:
                 "models": LLMProvider._get_google_models()
             })
 
+        if settings.FAKE_LLM_ENABLED:
+            available.append({
+                "provider": "fake",
+                "models": LLMProvider.FALLBACK_MODELS["fake"]
+            })
+
         return available
 
+    @staticmethod
+    def get_rate_limit_stats() -> List[Dict[str, Any]]:
+        """Get queue depth and wait time statistics from the rate governor"""
+        return get_rate_governor().get_stats()
+
     @staticmethod
     def clear_cache():
         """Clear the model cache (useful for testing or forcing refresh)"""
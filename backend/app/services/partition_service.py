@@ -0,0 +1,421 @@
+"""
+Partition Service
+Monthly partitions, retention and archival of the append-only
+analytics_events and activity_logs tables
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from contextlib import ExitStack
+from datetime import date, datetime, timezone
+import glob
+import gzip
+import heapq
+import json
+import os
+import threading
+import logging
+
+from sqlalchemy import MetaData, Table, delete, func, select, text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models import ActivityLog, AnalyticsEvent, RollupWatermark
+from app.services.analytics_rollup import WATERMARK_NAME, to_utc_naive
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> (model, partition key column)
+PARTITIONED_TABLES: Dict[str, Tuple[Any, str]] = {
+    "analytics_events": (AnalyticsEvent, "timestamp"),
+    "activity_logs": (ActivityLog, "created_at"),
+}
+
+# Arbitrary key for pg_try_advisory_lock, so only one process maintains partitions
+MAINTENANCE_LOCK_ID = 4304
+
+
+def archive_files(directory: str, month: Optional[datetime] = None) -> List[str]:
+    """Archive files, by month and then in the order they were written"""
+    pattern = f"{month:%Y-%m}*.jsonl.gz" if month is not None else "*.jsonl.gz"
+
+    def order(path: str) -> Tuple[str, int]:
+        # "2024-01.jsonl.gz" first, then "2024-01.1.jsonl.gz", "2024-01.2.jsonl.gz", ...
+        parts = os.path.basename(path).split(".")
+        return parts[0], int(parts[1]) if len(parts) > 3 else 0
+
+    return sorted(glob.glob(os.path.join(directory, pattern)), key=order)
+
+
+def month_start(value: datetime) -> datetime:
+    """First instant (naive UTC) of the month containing value"""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """First of the month `months` after the month of value"""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _retention_months(table: str) -> int:
+    return {
+        "analytics_events": settings.ANALYTICS_EVENTS_RETENTION_MONTHS,
+        "activity_logs": settings.ACTIVITY_LOGS_RETENTION_MONTHS,
+    }[table]
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc)
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return to_utc_naive(value).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+class PartitionService:
+    """
+    Keeps analytics_events and activity_logs split by month
+
+    On PostgreSQL both tables are range partitioned on their timestamp
+    (migration 0008); upcoming months get their partition ahead of time
+    and a default partition catches anything outside them. Months older
+    than the retention period are detached, written to gzipped JSONL files
+    under ARCHIVE_DIRECTORY and dropped. Other databases have no
+    partitioning, so the same months are archived and deleted row-wise.
+    """
+
+    @staticmethod
+    def convert_to_partitioned(conn: Connection, table: str):
+        """Rebuild a plain table as a partitioned one (PostgreSQL only)"""
+        model, column = PARTITIONED_TABLES[table]
+        legacy = f"{table}_unpartitioned"
+
+        conn.execute(text(f'UPDATE {table} SET "{column}" = now() WHERE "{column}" IS NULL'))
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+        conn.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey"))
+        # The partition key has to be part of the primary key
+        conn.execute(text(
+            f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS, PRIMARY KEY (id, "{column}")) '
+            f'PARTITION BY RANGE ("{column}")'
+        ))
+        conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+        oldest = conn.execute(text(f'SELECT MIN("{column}") FROM {legacy}')).scalar()
+        PartitionService.ensure_partitions(
+            conn, table, since=to_utc_naive(oldest) if oldest else None
+        )
+
+        conn.execute(text(f"INSERT INTO {table} SELECT * FROM {legacy}"))
+        conn.execute(text(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id"))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+
+        # Indexes on the parent are created on every partition
+        for index in model.__table__.indexes:
+            index.create(conn, checkfirst=True)
+
+    @staticmethod
+    def _partitions(conn: Connection, table: str) -> Dict[str, bool]:
+        """Monthly partition tables of `table`, mapped to whether they are attached"""
+        attached = {
+            row[0] for row in conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table"
+            ), {"table": table})
+        }
+        # Detached partitions left behind by an interrupted archive run
+        existing = conn.execute(text(
+            "SELECT tablename FROM pg_tables "
+            "WHERE schemaname = current_schema() AND tablename LIKE :pattern"
+        ), {"pattern": f"{table}\\_p______"}).scalars()
+        return {name: name in attached for name in existing}
+
+    @staticmethod
+    def ensure_partitions(
+        conn: Connection,
+        table: str,
+        since: Optional[datetime] = None,
+        now: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Create the monthly partitions of `table` up to PARTITION_MONTHS_AHEAD
+
+        Rows that already landed in the default partition for a new month
+        are moved into it.
+
+        Returns:
+            Names of the created partitions
+        """
+        _, column = PARTITIONED_TABLES[table]
+        current = month_start(now or datetime.utcnow())
+        month = month_start(since) if since and since < current else current
+        last = add_months(current, settings.PARTITION_MONTHS_AHEAD)
+
+        existing = PartitionService._partitions(conn, table)
+        created = []
+        while month <= last:
+            name = partition_name(table, month)
+            if name not in existing:
+                start, end = _utc(month), _utc(add_months(month, 1))
+                conn.execute(text(
+                    f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                ))
+                conn.execute(text(
+                    f'WITH moved AS ('
+                    f'DELETE FROM {table}_default WHERE "{column}" >= :start AND "{column}" < :end '
+                    f'RETURNING *) INSERT INTO {name} SELECT * FROM moved'
+                ), {"start": start, "end": end})
+                conn.execute(text(
+                    f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+                created.append(name)
+            month = add_months(month, 1)
+
+        if created:
+            logger.info(f"Created partitions {', '.join(created)}")
+        return created
+
+    @staticmethod
+    def _archive_cutoff(conn: Connection, table: str, now: datetime) -> Optional[datetime]:
+        """Months before this are past retention (None keeps everything)"""
+        months = _retention_months(table)
+        if months <= 0:
+            return None
+        cutoff = add_months(month_start(now), -months)
+
+        if table == "analytics_events":
+            # Raw events are the only source for rollups not yet compacted
+            watermark = conn.execute(
+                select(RollupWatermark.processed_until).where(RollupWatermark.name == WATERMARK_NAME)
+            ).scalar()
+            if watermark is None:
+                return None
+            cutoff = min(cutoff, month_start(to_utc_naive(watermark)))
+        return cutoff
+
+    @staticmethod
+    def _write_archive(
+        conn: Connection,
+        source: Table,
+        table: str,
+        month: datetime,
+        where=None
+    ) -> Tuple[str, int]:
+        """Stream the rows of one month into a gzipped JSONL file"""
+        _, column = PARTITIONED_TABLES[table]
+        directory = os.path.join(settings.ARCHIVE_DIRECTORY, table)
+        os.makedirs(directory, exist_ok=True)
+
+        # A month archived again (late rows) gets another file
+        path = os.path.join(directory, f"{month:%Y-%m}.jsonl.gz")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(directory, f"{month:%Y-%m}.{suffix}.jsonl.gz")
+            suffix += 1
+
+        query = select(source).order_by(source.c[column], source.c.id)
+        if where is not None:
+            query = query.where(where)
+
+        count = 0
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as archive:
+            for row in conn.execute(query.execution_options(yield_per=1000)).mappings():
+                archive.write(json.dumps(dict(row), default=_json_default) + "\n")
+                count += 1
+        if count:
+            os.replace(tmp_path, path)
+        else:
+            os.remove(tmp_path)
+        return path, count
+
+    @staticmethod
+    def _apply_retention_postgres(conn: Connection, table: str, cutoff: datetime) -> int:
+        model, _ = PARTITIONED_TABLES[table]
+        archived = 0
+        for name, attached in sorted(PartitionService._partitions(conn, table).items()):
+            month = datetime.strptime(name[-6:], "%Y%m")
+            if add_months(month, 1) > cutoff:
+                continue
+
+            if attached:
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                conn.commit()
+            partition = model.__table__.to_metadata(MetaData(), name=name)
+            path, count = PartitionService._write_archive(conn, partition, table, month)
+            conn.execute(text(f"DROP TABLE {name}"))
+            conn.commit()
+            archived += count
+            logger.info(f"Archived {count} rows of {name} to {path}")
+        return archived
+
+    @staticmethod
+    def _apply_retention_rows(conn: Connection, table: str, cutoff: datetime) -> int:
+        model, column = PARTITIONED_TABLES[table]
+        source = model.__table__
+        oldest = conn.execute(select(func.min(source.c[column]))).scalar()
+        if oldest is None:
+            return 0
+
+        archived = 0
+        month = month_start(to_utc_naive(oldest))
+        while month < cutoff:
+            in_month = (source.c[column] >= month) & (source.c[column] < add_months(month, 1))
+            path, count = PartitionService._write_archive(conn, source, table, month, where=in_month)
+            conn.execute(delete(source).where(in_month))
+            conn.commit()
+            if count:
+                archived += count
+                logger.info(f"Archived {count} rows of {table} for {month:%Y-%m} to {path}")
+            month = add_months(month, 1)
+        return archived
+
+    @staticmethod
+    def maintain(now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Create upcoming partitions and archive months past retention
+
+        Returns:
+            Number of archived rows per table
+        """
+        now = now or datetime.utcnow()
+        archived = {}
+        with engine.connect() as conn:
+            postgres = conn.dialect.name == "postgresql"
+            if postgres:
+                if not conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": MAINTENANCE_LOCK_ID}).scalar():
+                    return archived
+                conn.commit()
+            try:
+                for table in PARTITIONED_TABLES:
+                    if postgres:
+                        PartitionService.ensure_partitions(conn, table, now=now)
+                        conn.commit()
+
+                    cutoff = PartitionService._archive_cutoff(conn, table, now)
+                    if cutoff is None:
+                        continue
+                    if postgres:
+                        archived[table] = PartitionService._apply_retention_postgres(conn, table, cutoff)
+                    else:
+                        archived[table] = PartitionService._apply_retention_rows(conn, table, cutoff)
+            finally:
+                if postgres:
+                    conn.rollback()
+                    conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MAINTENANCE_LOCK_ID})
+                    conn.commit()
+        return archived
+
+    @staticmethod
+    def list_archives(table: str) -> List[Dict[str, Any]]:
+        """Archive files of a table, oldest month first"""
+        directory = os.path.join(settings.ARCHIVE_DIRECTORY, table)
+        return [
+            {
+                "month": os.path.basename(path)[:7],
+                "file": os.path.basename(path),
+                "size_bytes": os.path.getsize(path),
+            }
+            for path in archive_files(directory)
+        ]
+
+    @staticmethod
+    def query_archive(
+        table: str,
+        start: datetime,
+        end: datetime,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Read archived rows with start <= timestamp < end, oldest first
+
+        Only the files of the months overlapping the range are opened. Each
+        file is written in (timestamp, id) order, so the files of a month
+        that was archived more than once are merged in that order.
+
+        Args:
+            table: "analytics_events" or "activity_logs"
+            start: Start of the range (naive UTC)
+            end: End of the range (naive UTC)
+            filters: Column values rows must equal, e.g. {"action_type": "upload"}
+            limit: Maximum number of rows
+        """
+        _, column = PARTITIONED_TABLES[table]
+        filters = {key: value for key, value in (filters or {}).items() if value is not None}
+        directory = os.path.join(settings.ARCHIVE_DIRECTORY, table)
+
+        def matching(archive) -> Iterator[Tuple[datetime, int, Dict[str, Any]]]:
+            for line in archive:
+                row = json.loads(line)
+                timestamp = datetime.fromisoformat(row[column])
+                if timestamp < start or timestamp >= end:
+                    continue
+                if any(row.get(key) != value for key, value in filters.items()):
+                    continue
+                yield timestamp, row["id"], row
+
+        returned = 0
+        month = month_start(start)
+        while month < end and returned < limit:
+            with ExitStack() as files:
+                archives = [
+                    matching(files.enter_context(gzip.open(path, "rt", encoding="utf-8")))
+                    for path in archive_files(directory, month)
+                ]
+                for _, _, row in heapq.merge(*archives, key=lambda item: item[:2]):
+                    yield row
+                    returned += 1
+                    if returned >= limit:
+                        return
+            month = add_months(month, 1)
+
+
+class PartitionMaintainer:
+    """Background thread running PartitionService.maintain periodically"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="partition-maintainer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                PartitionService.maintain()
+            except Exception as e:
+                logger.error(f"Error maintaining partitions: {str(e)}")
+            self._stop.wait(self.interval)
+
+
+_partition_maintainer = None
+
+
+def get_partition_maintainer() -> PartitionMaintainer:
+    """Get or create partition maintainer singleton"""
+    global _partition_maintainer
+    if _partition_maintainer is None:
+        _partition_maintainer = PartitionMaintainer(interval=settings.PARTITION_MAINTENANCE_INTERVAL)
+    return _partition_maintainer
@@ -0,0 +1,181 @@
+"""
+Prompt Builder
+Assembles RAG prompts within a per-model token budget
+"""
+from typing import List, Dict, Any, Optional
+from langchain.schema import HumanMessage, AIMessage
+from app.core.config import settings
+from app.services.conversation_summarizer import ConversationSummarizer
+from app.utils.token_counter import count_tokens, truncate_to_tokens
+
+# Per-message role/formatting overhead
+MESSAGE_OVERHEAD = 4
+
+
+class BuiltPrompt:
+    """Messages ready for the LLM plus the token accounting behind them"""
+
+    def __init__(
+        self,
+        messages: List[Any],
+        documents: List[Dict[str, Any]],
+        token_counts: Dict[str, int]
+    ):
+        self.messages = messages
+        self.documents = documents  # Retrieved chunks that made it into the prompt
+        self.token_counts = token_counts
+
+
+class PromptBuilder:
+    """Token-budgeted prompt assembly"""
+
+    # Context window sizes (tokens); matched by longest prefix
+    MODEL_CONTEXT_WINDOWS = {
+        "gpt-4o": 128000,
+        "gpt-4-turbo": 128000,
+        "gpt-4-32k": 32768,
+        "gpt-4": 8192,
+        "gpt-3.5-turbo": 16385,
+        "claude-3": 200000,
+        "gemini-1.5": 1048576,
+        "gemini-pro-vision": 12288,
+        "gemini-pro": 30720,
+    }
+    DEFAULT_CONTEXT_WINDOW = 8192
+
+    @classmethod
+    def get_context_window(cls, model: Optional[str]) -> int:
+        """Context window for a model name"""
+        if not model:
+            return cls.DEFAULT_CONTEXT_WINDOW
+        matches = [prefix for prefix in cls.MODEL_CONTEXT_WINDOWS if model.startswith(prefix)]
+        if not matches:
+            return cls.DEFAULT_CONTEXT_WINDOW
+        return cls.MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+    @classmethod
+    def get_input_budget(cls, model: Optional[str]) -> int:
+        """Tokens available for the prompt after reserving room for the answer"""
+        window = cls.get_context_window(model)
+        return min(window - settings.PROMPT_OUTPUT_RESERVE, settings.PROMPT_MAX_INPUT_TOKENS)
+
+    @classmethod
+    def build(
+        cls,
+        template: str,
+        query: str,
+        documents: List[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        conversation_summary: Optional[str] = None,
+        model: Optional[str] = None,
+        format_context=None,
+    ) -> BuiltPrompt:
+        """
+        Build the message list for a RAG turn
+
+        The system prompt and question are always sent. The remaining budget
+        is split between retrieved context and history (PROMPT_CONTEXT_SHARE),
+        with any share one side leaves unused going to the other. Within each
+        section the lowest-value pieces are dropped first: the worst-scoring
+        chunks and the oldest history messages.
+
+        Args:
+            template: Prompt template with {context} and {question} placeholders
+            query: User's question
+            documents: Retrieved chunks (with "content" and "score")
+            conversation_history: Unsummarized messages, oldest first
+            conversation_summary: Rolling summary of older turns
+            model: Model name used to look up the context window
+            format_context: Callable turning kept documents into the context string
+
+        Returns:
+            BuiltPrompt
+        """
+        conversation_history = conversation_history or []
+        budget = cls.get_input_budget(model)
+
+        system_tokens = count_tokens(template.format(context="", question=""))
+        question_tokens = count_tokens(query)
+        available = max(budget - system_tokens - question_tokens - MESSAGE_OVERHEAD, 0)
+
+        context_share = int(available * settings.PROMPT_CONTEXT_SHARE)
+        history_share = available - context_share
+
+        # Measure what each section would like to use
+        doc_tokens = [count_tokens(doc["content"]) + 8 for doc in documents]
+        summary_tokens = count_tokens(conversation_summary) + 8 if conversation_summary else 0
+        history_tokens = [count_tokens(msg["content"]) + MESSAGE_OVERHEAD for msg in conversation_history]
+
+        wanted_context = sum(doc_tokens)
+        wanted_history = min(summary_tokens + sum(history_tokens), settings.HISTORY_TOKEN_BUDGET)
+
+        # Hand unused share from one section to the other
+        if wanted_context < context_share:
+            history_share += context_share - wanted_context
+            context_share = wanted_context
+        elif wanted_history < history_share:
+            context_share += history_share - wanted_history
+            history_share = wanted_history
+
+        # Context: keep the best-scoring chunks (lower distance is better)
+        ranked = sorted(range(len(documents)), key=lambda i: documents[i].get("score", 0.0))
+        kept_indexes = set()
+        context_used = 0
+        for i in ranked:
+            if context_used + doc_tokens[i] <= context_share:
+                kept_indexes.add(i)
+                context_used += doc_tokens[i]
+        kept_documents = [doc for i, doc in enumerate(documents) if i in kept_indexes]
+
+        # History: the summary goes first, then the newest messages that fit
+        history_budget = min(history_share, settings.HISTORY_TOKEN_BUDGET)
+        summary_text = None
+        if conversation_summary:
+            if summary_tokens <= history_budget:
+                summary_text = conversation_summary
+            else:
+                summary_text = truncate_to_tokens(conversation_summary, max(history_budget - 8, 0))
+            summary_tokens = count_tokens(summary_text) + 8 if summary_text else 0
+        recent = ConversationSummarizer.select_recent(
+            conversation_history, budget=max(history_budget - summary_tokens, 0)
+        )
+        recent_tokens = sum(history_tokens[len(history_tokens) - len(recent):])
+
+        # Assemble
+        messages = []
+        for msg in recent:
+            if msg["role"] == "user":
+                messages.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                messages.append(AIMessage(content=msg["content"]))
+
+        context = format_context(kept_documents) if format_context else "\n".join(
+            doc["content"] for doc in kept_documents
+        )
+        prompt = template.format(context=context, question=query)
+
+        # Older turns are represented by their summary
+        if summary_text:
+            prompt = f"Summary of the earlier conversation:\n{summary_text}\n\n{prompt}"
+
+        messages.append(HumanMessage(content=prompt))
+
+        token_counts = {
+            "system": system_tokens,
+            "question": question_tokens,
+            "summary": summary_tokens,
+            "history": recent_tokens,
+            "context": count_tokens(context),
+            "history_messages": len(recent),
+            "history_messages_dropped": len(conversation_history) - len(recent),
+            "context_chunks": len(kept_documents),
+            "context_chunks_dropped": len(documents) - len(kept_documents),
+            "budget": budget,
+            "context_window": cls.get_context_window(model),
+        }
+        token_counts["total"] = (
+            system_tokens + question_tokens + summary_tokens
+            + recent_tokens + token_counts["context"]
+        )
+
+        return BuiltPrompt(messages, kept_documents, token_counts)
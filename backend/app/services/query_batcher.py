@@ -0,0 +1,154 @@
+"""
+Query Micro-Batcher
+Coalesces concurrent retrieval queries into one embedding pass and one
+multi-query similarity search
+"""
+from typing import Any, Callable, Dict, List, Optional
+import json
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingQuery:
+    """A caller waiting for its search results"""
+
+    def __init__(self, query: str, k: int, filter: Optional[Dict[str, Any]]):
+        self.query = query
+        self.k = k
+        self.filter = filter
+        self.filter_key = json.dumps(filter, sort_keys=True) if filter else ""
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result: List[Dict[str, Any]] = []
+        self.error: Optional[BaseException] = None
+
+
+class QueryBatcher:
+    """
+    Micro-batching layer in front of the vector store
+
+    Queries arriving within max_wait_ms of the first queued query (or until
+    max_batch_size is reached) are embedded in a single batched forward pass.
+    Queries sharing the same metadata filter are then searched with one
+    vectorized multi-query call. Raising max_wait_ms trades per-query latency
+    for throughput; max_wait_ms=0 still batches whatever queued up while the
+    previous batch was running.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        search_fn: Callable[[List[List[float]], int, Optional[Dict[str, Any]]], List[List[Dict[str, Any]]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.embed_fn = embed_fn
+        self.search_fn = search_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._pending: List[_PendingQuery] = []
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+        # Statistics
+        self._batches = 0
+        self._queries = 0
+        self._total_queue_wait = 0.0
+        self._max_batch_seen = 0
+
+    def search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Queue a query and block until its batch has been searched"""
+        pending = _PendingQuery(query, k, filter)
+        with self._condition:
+            self._ensure_worker()
+            self._pending.append(pending)
+            self._condition.notify_all()
+
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use (caller holds the lock)"""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run, name="query-batcher", daemon=True
+            )
+            self._worker.start()
+
+    def _next_batch(self) -> List[_PendingQuery]:
+        """Wait for a full batch or for the oldest query's wait window to close"""
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+
+            deadline = self._pending[0].enqueued_at + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._process(batch)
+            except BaseException as e:
+                logger.error(f"Query batch of {len(batch)} failed: {str(e)}")
+                for pending in batch:
+                    if not pending.done.is_set():
+                        pending.error = e
+                        pending.done.set()
+
+    def _process(self, batch: List[_PendingQuery]):
+        started = time.monotonic()
+        embeddings = self.embed_fn([pending.query for pending in batch])
+
+        # One vectorized search per distinct filter
+        groups: Dict[str, List[int]] = {}
+        for i, pending in enumerate(batch):
+            groups.setdefault(pending.filter_key, []).append(i)
+
+        for indexes in groups.values():
+            k = max(batch[i].k for i in indexes)
+            results = self.search_fn(
+                [embeddings[i] for i in indexes], k, batch[indexes[0]].filter
+            )
+            for i, result in zip(indexes, results):
+                batch[i].result = result[:batch[i].k]
+                batch[i].done.set()
+
+        with self._condition:
+            self._batches += 1
+            self._queries += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._total_queue_wait += sum(started - pending.enqueued_at for pending in batch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batching efficiency statistics"""
+        with self._condition:
+            return {
+                "batches": self._batches,
+                "queries": self._queries,
+                "avg_batch_size": round(self._queries / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size_seen": self._max_batch_seen,
+                "avg_queue_wait_ms": round(self._total_queue_wait / self._queries * 1000, 3) if self._queries else 0.0,
+                "queue_depth": len(self._pending),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
@@ -1,13 +1,13 @@
 """
 RAG Service - Main RAG Chain Implementation
 """
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 from langchain.chains import ConversationalRetrievalChain
 from langchain.prompts import PromptTemplate
 from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, AIMessage
 from app.services.llm_provider import LLMProvider
-from app.services.vector_store import get_vector_store
+from app.services.vector_store import get_vector_store, tag_filter
+from app.services.prompt_builder import PromptBuilder
 
 
 class RAGService:
@@ -36,6 +36,10 @@ Answer:"""
 
     def __init__(self):
         self.vector_store = get_vector_store()
+        # Per-section prompt token counts of the last chat() call
+        self.last_token_counts: Dict[str, int] = {}
+        # Model that answered the last chat() call
+        self.last_model: Optional[str] = None
 
     def chat(
         self,
@@ -44,6 +48,9 @@ Answer:"""
         llm_provider: Optional[str] = None,
         model: Optional[str] = None,
         document_ids: Optional[List[int]] = None,
+        conversation_summary: Optional[str] = None,
+        tag_ids: Optional[List[int]] = None,
+        tagged_document_ids: Optional[Set[int]] = None,
     ) -> Tuple[str, List[Dict[str, Any]]]:
         """
         Process a chat query using RAG
@@ -54,21 +61,96 @@ Answer:"""
             llm_provider: LLM provider to use
             model: Model name to use
             document_ids: List of document IDs to filter search
+            conversation_summary: Rolling summary of turns older than conversation_history
+            tag_ids: Only search documents carrying any of these tags
+            tagged_document_ids: Documents carrying tag_ids, from tag_resolver
 
         Returns:
-            (answer, source_documents)
+            (answer, source_documents); prompt token counts are left in last_token_counts
         """
-        # Build filter for document IDs
+        relevant_docs = self.retrieve(
+            query,
+            document_ids=document_ids,
+            tag_ids=tag_ids,
+            tagged_document_ids=tagged_document_ids,
+        )
+
+        return self.generate(
+            query=query,
+            relevant_docs=relevant_docs,
+            conversation_history=conversation_history,
+            llm_provider=llm_provider,
+            model=model,
+            conversation_summary=conversation_summary,
+        )
+
+    def retrieve(
+        self,
+        query: str,
+        document_ids: Optional[List[int]] = None,
+        tag_ids: Optional[List[int]] = None,
+        tagged_document_ids: Optional[Set[int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve the chunks most relevant to a query
+
+        Tag scoping uses the per-tag chunk flags as a metadata pre-filter, so
+        the filter stays small however many documents a tag covers.
+
+        Args:
+            query: User's question
+            document_ids: List of document IDs to filter search
+            tag_ids: Only search documents carrying any of these tags
+            tagged_document_ids: Documents carrying tag_ids, from tag_resolver;
+                an empty set skips the search
+
+        Returns:
+            Relevant chunks with metadata and scores
+        """
+        if tag_ids and tagged_document_ids is not None:
+            if not tagged_document_ids:
+                return []
+            if document_ids:
+                # Explicit ids are a short list already; narrow it instead
+                document_ids = [i for i in document_ids if i in tagged_document_ids]
+                if not document_ids:
+                    return []
+                tag_ids = None
+
+        # Build filter for document IDs and tags
         filter_dict = None
-        if document_ids:
+        if document_ids and tag_ids:
+            filter_dict = {"$and": [{"document_id": {"$in": document_ids}}, tag_filter(tag_ids)]}
+        elif document_ids:
             filter_dict = {"document_id": {"$in": document_ids}}
+        elif tag_ids:
+            filter_dict = tag_filter(tag_ids)
 
-        # Get relevant documents
-        relevant_docs = self.vector_store.search(query, k=4, filter=filter_dict)
+        return self.vector_store.search(query, k=4, filter=filter_dict)
 
-        # Build context from documents
-        context = self._build_context(relevant_docs)
+    def generate(
+        self,
+        query: str,
+        relevant_docs: List[Dict[str, Any]],
+        conversation_history: List[Dict[str, str]] = None,
+        llm_provider: Optional[str] = None,
+        model: Optional[str] = None,
+        conversation_summary: Optional[str] = None,
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Answer a query from already retrieved chunks
+
+        Args:
+            query: User's question
+            relevant_docs: Chunks returned by retrieve()
+            conversation_history: Previous messages [{"role": "user/assistant", "content": "..."}]
+            llm_provider: LLM provider to use
+            model: Model name to use
+            conversation_summary: Rolling summary of turns older than conversation_history
 
+        Returns:
+            (answer, source_documents); prompt token counts are left in last_token_counts
+        """
         # Get LLM
         llm = LLMProvider.get_llm(
             provider=llm_provider,
@@ -76,31 +158,25 @@ Answer:"""
             temperature=0.7
         )
 
-        # Build conversation messages
-        messages = []
-
-        # Add conversation history
-        if conversation_history:
-            for msg in conversation_history[-6:]:  # Last 6 messages for context
-                if msg["role"] == "user":
-                    messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    messages.append(AIMessage(content=msg["content"]))
-
-        # Build prompt with context
-        prompt = self.SYSTEM_PROMPT.format(
-            context=context,
-            question=query
+        # Fit system prompt, summary, history and context into the model's budget
+        built = PromptBuilder.build(
+            template=self.SYSTEM_PROMPT,
+            query=query,
+            documents=relevant_docs,
+            conversation_history=conversation_history,
+            conversation_summary=conversation_summary,
+            model=llm.model,
+            format_context=self._build_context,
         )
-
-        messages.append(HumanMessage(content=prompt))
+        self.last_token_counts = built.token_counts
+        self.last_model = llm.model
 
         # Get response
-        response = llm.invoke(messages)
+        response = llm.invoke(built.messages)
         answer = response.content
 
-        # Format sources
-        sources = self._format_sources(relevant_docs)
+        # Format sources (only chunks that were actually sent)
+        sources = self._format_sources(built.documents)
 
         return answer, sources
 
@@ -0,0 +1,328 @@
+"""
+LLM Rate Governor
+Per-provider and per-model concurrency limits with token-bucket rate limiting
+"""
+from typing import Optional, Dict, Any, List, Tuple
+from collections import deque
+from contextlib import contextmanager
+import asyncio
+import itertools
+import threading
+import time
+import logging
+
+from app.core.config import settings
+from app.utils.token_counter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller could not be admitted before its deadline"""
+
+    def __init__(self, lane: str, waited: float, retry_after: float):
+        self.lane = lane
+        self.waited = waited
+        self.retry_after = retry_after
+        super().__init__(
+            f"Rate limit queue timeout for '{lane}' after {waited:.1f}s"
+        )
+
+
+class _Lane:
+    """Concurrency slots and token bucket for one provider or provider:model pair"""
+
+    def __init__(self, name: str, max_concurrency: int, tokens_per_minute: int):
+        self.name = name
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.capacity = float(max(1, int(tokens_per_minute)))
+        self.refill_per_second = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+        self.in_flight = 0
+        self.waiters: deque = deque()
+
+        # Statistics
+        self.total_admitted = 0
+        self.total_timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def refill(self, now: float):
+        """Add tokens accumulated since the last refill"""
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated_at = now
+
+    def clamp(self, tokens: int) -> float:
+        """Requests larger than the bucket would never be admitted, so cap them"""
+        return min(float(tokens), self.capacity)
+
+    def has_capacity(self, tokens: float) -> bool:
+        return self.in_flight < self.max_concurrency and self.tokens >= tokens
+
+    def seconds_until(self, tokens: float) -> float:
+        """Time until the bucket holds enough tokens (0 if it already does)"""
+        missing = tokens - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.refill_per_second
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "lane": self.name,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "tokens_per_minute": int(self.capacity),
+            "tokens_available": int(self.tokens),
+            "total_admitted": self.total_admitted,
+            "total_timeouts": self.total_timeouts,
+            "avg_wait_seconds": round(self.total_wait / self.total_admitted, 4) if self.total_admitted else 0.0,
+            "max_wait_seconds": round(self.max_wait, 4),
+        }
+
+
+class RateGovernor:
+    """
+    Admission control for LLM calls
+
+    Every call acquires a permit on two lanes: the provider:model lane,
+    then the provider lane. Each lane enforces a maximum number of in-flight
+    requests and a tokens-per-minute budget. Each lane admits its waiters
+    strictly in arrival order. Callers give up with RateLimitTimeout once
+    their deadline passes, handing back whatever they had already taken.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        model_max_concurrency: Optional[int] = None,
+        model_tokens_per_minute: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self.tokens_per_minute = tokens_per_minute or settings.LLM_TOKENS_PER_MINUTE
+        self.model_max_concurrency = model_max_concurrency or settings.LLM_MODEL_MAX_CONCURRENCY
+        self.model_tokens_per_minute = model_tokens_per_minute or settings.LLM_MODEL_TOKENS_PER_MINUTE
+        self.queue_timeout = queue_timeout if queue_timeout is not None else settings.LLM_QUEUE_TIMEOUT
+        self.overrides = overrides if overrides is not None else settings.LLM_RATE_LIMITS
+
+        self._lanes: Dict[str, _Lane] = {}
+        self._condition = threading.Condition()
+        self._tickets = itertools.count()
+
+    def _get_lane(self, name: str, is_model: bool) -> _Lane:
+        """Get or create a lane (caller must hold the condition lock)"""
+        lane = self._lanes.get(name)
+        if lane is None:
+            override = self.overrides.get(name, {})
+            if is_model:
+                concurrency = override.get("max_concurrency", self.model_max_concurrency)
+                tpm = override.get("tokens_per_minute", self.model_tokens_per_minute)
+            else:
+                concurrency = override.get("max_concurrency", self.max_concurrency)
+                tpm = override.get("tokens_per_minute", self.tokens_per_minute)
+            lane = _Lane(name, concurrency, tpm)
+            self._lanes[name] = lane
+        return lane
+
+    def _lanes_for(self, provider: str, model: Optional[str]) -> List[_Lane]:
+        lanes = [self._get_lane(provider, is_model=False)]
+        if model:
+            lanes.append(self._get_lane(f"{provider}:{model}", is_model=True))
+        return lanes
+
+    def _take(self, lane: _Lane, amount: float, start: float, deadline: float):
+        """Wait for a slot and tokens on one lane, in arrival order (caller holds the lock)"""
+        ticket = next(self._tickets)
+        lane.waiters.append(ticket)
+        try:
+            while True:
+                now = time.monotonic()
+                lane.refill(now)
+
+                at_head = lane.waiters[0] == ticket
+                if at_head and lane.has_capacity(amount):
+                    break
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    lane.total_timeouts += 1
+                    raise RateLimitTimeout(lane.name, now - start, max(lane.seconds_until(amount), 1.0))
+
+                # Wake up for releases, or when the bucket should have refilled
+                wait_for = remaining
+                if at_head:
+                    refill_wait = lane.seconds_until(amount)
+                    if refill_wait > 0:
+                        wait_for = min(wait_for, refill_wait)
+                self._condition.wait(wait_for)
+        finally:
+            lane.waiters.remove(ticket)
+            # The next waiter may now be at the head of the lane
+            self._condition.notify_all()
+
+        lane.tokens -= amount
+        lane.in_flight += 1
+
+    def acquire(
+        self,
+        provider: str,
+        model: Optional[str] = None,
+        tokens: int = 0,
+        timeout: Optional[float] = None,
+    ) -> Tuple[List[_Lane], List[float]]:
+        """
+        Block until the call is admitted on every lane
+
+        Args:
+            provider: Provider name
+            model: Model name (adds a per-model lane)
+            tokens: Estimated tokens the call will consume
+            timeout: Seconds to wait before giving up (defaults to LLM_QUEUE_TIMEOUT)
+
+        Returns:
+            Permit to hand back to release()
+
+        Raises:
+            RateLimitTimeout: If the deadline passes while queued
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._condition:
+            lanes = self._lanes_for(provider, model)
+            amounts = [lane.clamp(tokens) for lane in lanes]
+            taken: List[Tuple[_Lane, float]] = []
+            try:
+                # Model lane first: a caller queued on a saturated model never
+                # sits in the provider queue ahead of the provider's other models
+                for lane, amount in reversed(list(zip(lanes, amounts))):
+                    self._take(lane, amount, start, deadline)
+                    taken.append((lane, amount))
+            except RateLimitTimeout:
+                for lane, amount in taken:
+                    lane.in_flight -= 1
+                    lane.tokens = min(lane.capacity, lane.tokens + amount)
+                self._condition.notify_all()
+                raise
+
+            waited = time.monotonic() - start
+            for lane in lanes:
+                lane.total_admitted += 1
+                lane.total_wait += waited
+                lane.max_wait = max(lane.max_wait, waited)
+
+        if waited > 1.0:
+            logger.info(f"LLM call on {lanes[-1].name} waited {waited:.2f}s for admission")
+
+        return lanes, amounts
+
+    def release(self, permit: Tuple[List[_Lane], List[float]]):
+        """Return the concurrency slots held by a permit"""
+        lanes, _ = permit
+        with self._condition:
+            for lane in lanes:
+                lane.in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def limit(
+        self,
+        provider: str,
+        model: Optional[str] = None,
+        tokens: int = 0,
+        timeout: Optional[float] = None,
+    ):
+        """Context manager wrapping acquire()/release()"""
+        permit = self.acquire(provider, model, tokens, timeout)
+        try:
+            yield
+        finally:
+            self.release(permit)
+
+    async def acquire_async(
+        self,
+        provider: str,
+        model: Optional[str] = None,
+        tokens: int = 0,
+        timeout: Optional[float] = None,
+    ):
+        """Wait for admission without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self.acquire(provider, model, tokens, timeout)
+        )
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Queue depth, in-flight calls and wait times for every lane"""
+        with self._condition:
+            now = time.monotonic()
+            stats = []
+            for name in sorted(self._lanes):
+                lane = self._lanes[name]
+                lane.refill(now)
+                stats.append(lane.get_stats())
+            return stats
+
+
+class GovernedLLM:
+    """
+    LLM proxy that routes every call through the rate governor
+
+    Exposes the same invoke/stream interface as the wrapped LangChain model;
+    any other attribute is delegated unchanged.
+    """
+
+    def __init__(self, llm, provider: str, model: Optional[str], governor: RateGovernor):
+        self.llm = llm
+        self.provider = provider
+        self.model = model
+        self.governor = governor
+
+    def _cost(self, input: Any) -> int:
+        return estimate_tokens(input) + settings.LLM_COMPLETION_TOKENS_ESTIMATE
+
+    def invoke(self, input: Any, *args, **kwargs):
+        with self.governor.limit(self.provider, self.model, self._cost(input)):
+            return self.llm.invoke(input, *args, **kwargs)
+
+    def stream(self, input: Any, *args, **kwargs):
+        with self.governor.limit(self.provider, self.model, self._cost(input)):
+            yield from self.llm.stream(input, *args, **kwargs)
+
+    async def ainvoke(self, input: Any, *args, **kwargs):
+        permit = await self.governor.acquire_async(self.provider, self.model, self._cost(input))
+        try:
+            return await self.llm.ainvoke(input, *args, **kwargs)
+        finally:
+            self.governor.release(permit)
+
+    async def astream(self, input: Any, *args, **kwargs):
+        permit = await self.governor.acquire_async(self.provider, self.model, self._cost(input))
+        try:
+            async for chunk in self.llm.astream(input, *args, **kwargs):
+                yield chunk
+        finally:
+            self.governor.release(permit)
+
+    def __getattr__(self, name: str):
+        return getattr(self.llm, name)
+
+
+# Singleton instance
+_rate_governor = None
+
+
+def get_rate_governor() -> RateGovernor:
+    """Get or create rate governor singleton"""
+    global _rate_governor
+    if _rate_governor is None:
+        _rate_governor = RateGovernor()
+    return _rate_governor
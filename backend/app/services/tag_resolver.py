@@ -0,0 +1,80 @@
+"""
+Tag Resolver
+Cached tag -> document id sets for tag-scoped retrieval
+"""
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import document_tags
+
+
+class TagResolver:
+    """
+    Document ids per tag, loaded on first use and kept until invalidated
+
+    The tag endpoints invalidate a tag when its documents change, and
+    document deletion clears everything. A load that overlaps an
+    invalidation is returned to its caller but not cached, so a stale set
+    never outlives the change that made it stale.
+    """
+
+    def __init__(self):
+        self._documents: Dict[int, FrozenSet[int]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _cached(self, tag_ids: Iterable[int]):
+        with self._lock:
+            found = {tag_id: self._documents[tag_id] for tag_id in tag_ids if tag_id in self._documents}
+            return found, self._generation
+
+    @staticmethod
+    def _query(tag_ids: List[int]):
+        return select(document_tags.c.tag_id, document_tags.c.document_id).where(
+            document_tags.c.tag_id.in_(tag_ids)
+        )
+
+    def _store(self, missing: List[int], rows, generation: int) -> Dict[int, FrozenSet[int]]:
+        loaded: Dict[int, Set[int]] = {tag_id: set() for tag_id in missing}
+        for tag_id, document_id in rows:
+            loaded[tag_id].add(document_id)
+        frozen = {tag_id: frozenset(ids) for tag_id, ids in loaded.items()}
+        with self._lock:
+            if generation == self._generation:
+                self._documents.update(frozen)
+        return frozen
+
+    def resolve(self, db: Session, tag_ids: Iterable[int]) -> Set[int]:
+        """Ids of the documents carrying any of tag_ids (one query for uncached tags)"""
+        tag_ids = set(tag_ids)
+        found, generation = self._cached(tag_ids)
+        missing = sorted(tag_ids - set(found))
+        if missing:
+            found.update(self._store(missing, db.execute(self._query(missing)).all(), generation))
+        return set().union(*found.values())
+
+    async def resolve_async(self, db: AsyncSession, tag_ids: Iterable[int]) -> Set[int]:
+        """resolve() for an AsyncSession"""
+        tag_ids = set(tag_ids)
+        found, generation = self._cached(tag_ids)
+        missing = sorted(tag_ids - set(found))
+        if missing:
+            result = await db.execute(self._query(missing))
+            found.update(self._store(missing, result.all(), generation))
+        return set().union(*found.values())
+
+    def invalidate(self, tag_id: Optional[int] = None):
+        """Forget one tag, or every tag when tag_id is None"""
+        with self._lock:
+            self._generation += 1
+            if tag_id is None:
+                self._documents.clear()
+            else:
+                self._documents.pop(tag_id, None)
+
+
+tag_resolver = TagResolver()
@@ -8,6 +8,18 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document as LangchainDocument
 from app.core.config import settings
+from app.services.query_batcher import QueryBatcher
+
+
+def tag_metadata_key(tag_id: int) -> str:
+    """Chunk metadata flag (1 or 0) marking the chunks of documents with a tag"""
+    return f"tag_{tag_id}"
+
+
+def tag_filter(tag_ids: List[int]) -> Dict[str, Any]:
+    """Metadata filter matching chunks of documents carrying any of tag_ids"""
+    conditions = [{tag_metadata_key(tag_id): 1} for tag_id in sorted(set(tag_ids))]
+    return conditions[0] if len(conditions) == 1 else {"$or": conditions}
 
 
 class VectorStoreService:
@@ -35,6 +47,14 @@ class VectorStoreService:
             separators=["\n\n", "\n", ". ", " ", ""]
         )
 
+        # Concurrent searches share one embedding pass and one multi-query search
+        self.query_batcher = QueryBatcher(
+            embed_fn=self._embed_queries,
+            search_fn=self._search_by_vectors,
+            max_batch_size=settings.QUERY_BATCH_MAX_SIZE,
+            max_wait_ms=settings.QUERY_BATCH_MAX_WAIT_MS,
+        )
+
     def add_document(
         self,
         content: str,
@@ -89,19 +109,46 @@ class VectorStoreService:
         Returns:
             List of relevant documents with scores
         """
-        results = self.vectorstore.similarity_search_with_score(
-            query=query,
-            k=k,
-            filter=filter
+        if settings.QUERY_BATCH_ENABLED:
+            return self.query_batcher.search(query, k=k, filter=filter)
+
+        embeddings = self._embed_queries([query])
+        return self._search_by_vectors(embeddings, k, filter)[0]
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries in one batched forward pass"""
+        return self.embedding_model.embed_documents(
+            [query.replace("\n", " ") for query in queries]
+        )
+
+    def _search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Run one similarity search for several query embeddings"""
+        results = self.vectorstore._collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            where=filter or None,
+            include=["documents", "metadatas", "distances"]
         )
 
         return [
-            {
-                "content": doc.page_content,
-                "metadata": doc.metadata,
-                "score": float(score)
-            }
-            for doc, score in results
+            [
+                {
+                    "content": content,
+                    "metadata": metadata,
+                    "score": float(distance)
+                }
+                for content, metadata, distance in zip(
+                    results["documents"][i],
+                    results["metadatas"][i],
+                    results["distances"][i]
+                )
+            ]
+            for i in range(len(embeddings))
         ]
 
     def delete_by_document_id(self, document_id: int):
@@ -112,6 +159,34 @@ class VectorStoreService:
         )
         self.vectorstore.persist()
 
+    def set_document_tag(self, document_id: int, tag_id: int, tagged: bool):
+        """Set or clear a tag's flag on every chunk of a document"""
+        collection = self.vectorstore._collection
+        chunks = collection.get(where={"document_id": document_id}, include=["metadatas"])
+        if not chunks["ids"]:
+            return
+
+        key = tag_metadata_key(tag_id)
+        collection.update(
+            ids=chunks["ids"],
+            metadatas=[{**metadata, key: int(tagged)} for metadata in chunks["metadatas"]]
+        )
+        self.vectorstore.persist()
+
+    def clear_tag(self, tag_id: int):
+        """Clear a deleted tag's flag from every chunk carrying it"""
+        collection = self.vectorstore._collection
+        key = tag_metadata_key(tag_id)
+        chunks = collection.get(where={key: 1}, include=["metadatas"])
+        if not chunks["ids"]:
+            return
+
+        collection.update(
+            ids=chunks["ids"],
+            metadatas=[{**metadata, key: 0} for metadata in chunks["metadatas"]]
+        )
+        self.vectorstore.persist()
+
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store"""
         collection = self.vectorstore._collection
@@ -124,6 +199,10 @@ class VectorStoreService:
             "chunk_overlap": settings.CHUNK_OVERLAP
         }
 
+    def get_batching_stats(self) -> Dict[str, Any]:
+        """Get query micro-batching statistics"""
+        return self.query_batcher.get_stats()
+
 
 # Singleton instance
 _vector_store = None
@@ -0,0 +1,301 @@
+"""
+Query Plan Checker
+Runs the hot read paths of the analytics, chat and activity log endpoints,
+EXPLAINs every statement they issue, and fails on sequential scans of
+large tables, statements over their latency budget or endpoints issuing
+more queries than expected
+
+    python -m app.tools.seed_data --conversations 500000
+    python -m app.tools.plan_check --budget-ms 100
+
+Exits with status 1 if any check fails, so it can gate CI runs against a
+seeded PostgreSQL database. SQLite is supported for local runs using
+EXPLAIN QUERY PLAN and wall-clock timings.
+"""
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import argparse
+import json
+import sys
+import time
+
+from fastapi import Response
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine, SessionLocal
+from app.models import Conversation
+from app.services.analytics_service import AnalyticsService
+from app.services.analytics_rollup import AnalyticsRollupService
+from app.services.conversation_search import ConversationSearch
+from app.services.history_cache import history_cache, get_recent_history
+from app.api import activity_logs as activity_logs_api
+from app.api import chat as chat_api
+
+LARGE_TABLES = ("conversations", "messages", "analytics_events", "activity_logs")
+ALL_LARGE = set(LARGE_TABLES)
+
+SCENARIO_FAILED = "-- scenario failed"
+
+# Settings the scenarios run under, restored when the check is done
+CHECK_SETTINGS = {
+    # Measure the queries, not the result cache
+    "ANALYTICS_CACHE_ENABLED": False,
+    # Scenarios read ORM objects off the endpoint return values
+    "FAST_JSON_RESPONSES": False,
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[Session], Any]
+    # Tables this scenario legitimately reads in full (e.g. global counts)
+    allow_seq_scan: Set[str] = field(default_factory=set)
+    budget_ms: Optional[float] = None
+    # Queries one call may issue, to catch lazy loads (N+1)
+    max_statements: Optional[int] = None
+
+
+@dataclass
+class StatementResult:
+    scenario: str
+    statement: str
+    duration_ms: float
+    seq_scans: List[str]
+    problems: List[str]
+
+
+def _scenarios(conversation_id: int, cursor: Optional[str]) -> List[Scenario]:
+    """Read paths to check, mirroring what the endpoints issue"""
+    return [
+        Scenario("analytics.summary", AnalyticsService.get_summary, allow_seq_scan=ALL_LARGE, budget_ms=2000),
+        Scenario("analytics.time_series", lambda db: AnalyticsService.get_time_series(db, days=30)),
+        Scenario("analytics.top_topics", lambda db: AnalyticsService.get_top_topics(db, limit=10)),
+        Scenario("analytics.document_usage", AnalyticsService.get_document_usage),
+        Scenario("analytics.response_times", lambda db: AnalyticsService.get_response_times(db, days=7)),
+        Scenario("analytics.model_performance", lambda db: AnalyticsService.get_model_performance(db, days=30)),
+        Scenario("analytics.user_engagement", lambda db: AnalyticsService.get_user_engagement(db, days=30)),
+        Scenario("analytics.peak_hours", lambda db: AnalyticsService.get_peak_hours(db, days=7)),
+        Scenario("analytics.conversation_metrics", lambda db: AnalyticsService.get_conversation_metrics(db, days=30)),
+        Scenario("chat.recent_history", lambda db: _recent_history(db, conversation_id)),
+        Scenario(
+            "chat.get_conversation",
+            lambda db: chat_api.get_conversation(conversation_id, db=db).messages,
+            max_statements=2
+        ),
+        Scenario("chat.list_messages", lambda db: _list_messages(db, conversation_id), max_statements=1),
+        Scenario(
+            "chat.list_messages_feedback",
+            lambda db: _list_messages(db, conversation_id, include_feedback=True, include_sources=False),
+            max_statements=2
+        ),
+        Scenario("chat.list_conversations", lambda db: chat_api.list_conversations(
+            response=Response(), skip=0, limit=50, cursor=None, db=db
+        )),
+        Scenario("chat.list_conversations_cursor", lambda db: chat_api.list_conversations(
+            response=Response(), skip=0, limit=50, cursor=cursor, db=db
+        )),
+        Scenario("chat.search_conversations", lambda db: ConversationSearch.search(db, "refund warranty", limit=50)),
+        Scenario("activity_logs.list", lambda db: _get_logs(db)),
+        Scenario("activity_logs.list_by_action", lambda db: _get_logs(db, action_type="upload")),
+        Scenario("activity_logs.list_by_status", lambda db: _get_logs(db, status="failed")),
+        Scenario("activity_logs.stats", lambda db: activity_logs_api.get_log_stats(days=7, db=db)),
+    ]
+
+
+def _recent_history(db: Session, conversation_id: int):
+    history_cache.invalidate(conversation_id)
+    return get_recent_history(db, db.get(Conversation, conversation_id))
+
+
+def _list_messages(db: Session, conversation_id: int, **options):
+    params = {"include_sources": True, "include_metadata": True, "include_feedback": False, **options}
+    return chat_api.list_messages(
+        conversation_id, response=Response(), limit=50, cursor=None, newest_first=False, db=db, **params
+    )
+
+
+def _get_logs(db: Session, **filters):
+    params = {"action_type": None, "resource_type": None, "status": None, **filters}
+    return activity_logs_api.get_logs(
+        response=Response(), skip=0, limit=100, cursor=None, days=7, db=db, **params
+    )
+
+
+@contextmanager
+def _capture_statements():
+    """Collect (statement, parameters) of every SELECT sent to the database"""
+    captured: List[Tuple[str, Any]] = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+@contextmanager
+def _check_settings():
+    saved = {name: getattr(settings, name) for name in CHECK_SETTINGS}
+    try:
+        for name, value in CHECK_SETTINGS.items():
+            setattr(settings, name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+
+def _prepare(db: Session) -> Tuple[int, Optional[str]]:
+    """Bring rollups and the search index up to date; pick the scenario inputs"""
+    # Readers only aggregate raw rows past the rollup watermark
+    AnalyticsRollupService.compact(db)
+
+    conversation_id = db.execute(
+        select(Conversation.id).order_by(Conversation.message_count.desc()).limit(1)
+    ).scalar()
+    if conversation_id is None:
+        raise SystemExit("No conversations found; run python -m app.tools.seed_data first")
+    response = Response()
+    chat_api.list_conversations(response=response, skip=0, limit=50, cursor=None, db=db)
+    # Without PostgreSQL, search loads its in-process index on first use
+    ConversationSearch.search(db, "warm up", limit=1)
+    return conversation_id, response.headers.get("X-Next-Cursor")
+
+
+def run_scenario(db: Session, scenario: Scenario) -> List[Tuple[str, Any]]:
+    """Run a scenario and return the SELECTs it issued (SCENARIO_FAILED if it raised)"""
+    # Start with an empty identity map, as a request would
+    db.expire_all()
+    with _capture_statements() as statements:
+        try:
+            scenario.run(db)
+        except Exception as e:
+            db.rollback()
+            print(f"ERROR {scenario.name}: {e}")
+            statements.append((SCENARIO_FAILED, None))
+    return list(statements)
+
+
+def _walk(plan: Dict[str, Any]):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+def _explain_postgres(conn, statement: str, parameters) -> Tuple[float, List[str]]:
+    row = conn.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}", parameters
+    ).scalar()
+    result = (json.loads(row) if isinstance(row, str) else row)[0]
+    seq_scans = [
+        node["Relation Name"]
+        for node in _walk(result["Plan"])
+        if node.get("Node Type") == "Seq Scan"
+    ]
+    return result["Execution Time"], seq_scans
+
+
+def _explain_sqlite(conn, statement: str, parameters) -> Tuple[float, List[str]]:
+    seq_scans = []
+    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+        detail = row[-1]
+        words = detail.split()
+        if words[:1] == ["SCAN"] and len(words) > 1 and "USING" not in words:
+            seq_scans.append(words[1])
+
+    started = time.perf_counter()
+    conn.exec_driver_sql(statement, parameters).fetchall()
+    return (time.perf_counter() - started) * 1000, seq_scans
+
+
+def _table_sizes(conn) -> Dict[str, int]:
+    if conn.dialect.name == "postgresql":
+        rows = conn.execute(text(
+            "SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(:names)"
+        ), {"names": list(LARGE_TABLES)})
+        return {name: size for name, size in rows}
+    return {
+        table: conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        for table in LARGE_TABLES
+    }
+
+
+def check(budget_ms: float, min_rows: int) -> List[StatementResult]:
+    """Run every scenario and EXPLAIN the statements it issued"""
+    db = SessionLocal()
+    try:
+        with _check_settings():
+            conversation_id, cursor = _prepare(db)
+            captured: List[Tuple[Scenario, List[Tuple[str, Any]]]] = [
+                (scenario, run_scenario(db, scenario))
+                for scenario in _scenarios(conversation_id, cursor)
+            ]
+    finally:
+        db.close()
+
+    results = []
+    with engine.connect() as conn:
+        sizes = _table_sizes(conn)
+        explain = _explain_postgres if conn.dialect.name == "postgresql" else _explain_sqlite
+
+        for scenario, statements in captured:
+            if scenario.max_statements is not None and len(statements) > scenario.max_statements:
+                results.append(StatementResult(
+                    scenario.name, f"-- {len(statements)} statements", 0.0, [],
+                    [f"{len(statements)} statements, expected at most {scenario.max_statements}"]
+                ))
+
+            seen = set()
+            for statement, parameters in statements:
+                if statement == SCENARIO_FAILED:
+                    results.append(StatementResult(scenario.name, statement, 0.0, [], ["scenario raised"]))
+                    continue
+                if statement in seen:
+                    continue
+                seen.add(statement)
+
+                duration_ms, seq_scans = explain(conn, statement, parameters)
+                conn.rollback()
+
+                problems = [
+                    f"sequential scan on {table} ({sizes.get(table, 0)} rows)"
+                    for table in seq_scans
+                    if sizes.get(table, 0) >= min_rows and table not in scenario.allow_seq_scan
+                ]
+                limit = scenario.budget_ms or budget_ms
+                if duration_ms > limit:
+                    problems.append(f"{duration_ms:.1f} ms over budget of {limit:.0f} ms")
+                results.append(StatementResult(scenario.name, statement, duration_ms, seq_scans, problems))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check query plans of hot endpoints")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="latency budget per statement")
+    parser.add_argument("--min-rows", type=int, default=10000, help="tables smaller than this may be scanned")
+    args = parser.parse_args()
+
+    results = check(args.budget_ms, args.min_rows)
+    failed = [result for result in results if result.problems]
+
+    for result in results:
+        status = "FAIL" if result.problems else "ok"
+        summary = " ".join(result.statement.split())[:90]
+        print(f"{status:4} {result.scenario:34} {result.duration_ms:8.1f} ms  {summary}")
+        for problem in result.problems:
+            print(f"     - {problem}")
+
+    print(f"\n{len(results) - len(failed)}/{len(results)} statements within plan and latency checks")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Retrieval Batching Benchmark
+Measures throughput and latency of retrieval under concurrent load, with
+and without the query micro-batcher
+
+    python -m app.tools.retrieval_bench --concurrency 32 --queries 1000
+    python -m app.tools.retrieval_bench --synthetic --concurrency 64
+
+By default it runs against the configured embedding model and vector
+store. --synthetic replaces both with a cost model of a single device
+(fixed overhead per call plus a cost per query), so runs are reproducible
+without the model or any indexed documents.
+"""
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import argparse
+import threading
+import time
+
+from app.core.config import settings
+from app.services.query_batcher import QueryBatcher
+
+QUESTIONS = [
+    "What is the return policy for opened electronics?",
+    "How long is the warranty on laptops?",
+    "Do you ship internationally?",
+    "How can I track my order?",
+    "Can I exchange a phone for a different color?",
+    "What payment methods are accepted?",
+    "How do I claim warranty for a broken screen?",
+    "When will my refund arrive?",
+]
+
+
+@dataclass
+class BenchResult:
+    mode: str
+    queries: int
+    seconds: float
+    latencies_ms: List[float]
+    stats: Optional[Dict[str, Any]] = None
+
+    @property
+    def throughput(self) -> float:
+        return self.queries / self.seconds if self.seconds else 0.0
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class SyntheticBackend:
+    """Embedding and search calls that cost overhead + per-query time on one device"""
+
+    def __init__(self, embed_overhead_ms: float, embed_per_query_ms: float,
+                 search_overhead_ms: float, search_per_query_ms: float):
+        self.embed_cost = (embed_overhead_ms / 1000, embed_per_query_ms / 1000)
+        self.search_cost = (search_overhead_ms / 1000, search_per_query_ms / 1000)
+        self._device = threading.Lock()
+
+    def _spend(self, cost, n: int):
+        overhead, per_query = cost
+        with self._device:
+            time.sleep(overhead + per_query * n)
+
+    def embed(self, queries: List[str]) -> List[List[float]]:
+        self._spend(self.embed_cost, len(queries))
+        return [[float(len(query))] for query in queries]
+
+    def search(self, embeddings: List[List[float]], k: int, filter=None) -> List[List[Dict[str, Any]]]:
+        self._spend(self.search_cost, len(embeddings))
+        return [[{"content": "", "metadata": {}, "score": 0.0}] * k for _ in embeddings]
+
+
+def _run(mode: str, search: Callable[[str], Any], queries: int, concurrency: int) -> BenchResult:
+    """Closed-loop load: concurrency workers issue queries back to back"""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    counter = iter(range(queries))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            search(QUESTIONS[i % len(QUESTIONS)])
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return BenchResult(mode, queries, time.perf_counter() - started, latencies)
+
+
+def benchmark(
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    search_fn: Callable[..., List[List[Dict[str, Any]]]],
+    queries: int,
+    concurrency: int,
+    max_batch_size: int,
+    max_wait_ms: float,
+    k: int = 4,
+) -> List[BenchResult]:
+    """Run the same load unbatched and through a QueryBatcher"""
+    def unbatched(query: str):
+        return search_fn(embed_fn([query]), k, None)[0]
+
+    batcher = QueryBatcher(embed_fn, search_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    # Warm up model and index caches before timing
+    unbatched(QUESTIONS[0])
+
+    results = [_run("unbatched", unbatched, queries, concurrency)]
+    batched = _run("batched", lambda query: batcher.search(query, k=k), queries, concurrency)
+    batched.stats = batcher.get_stats()
+    results.append(batched)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched vs unbatched retrieval")
+    parser.add_argument("--queries", type=int, default=1000, help="queries per mode")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent callers")
+    parser.add_argument("--max-batch-size", type=int, default=settings.QUERY_BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.QUERY_BATCH_MAX_WAIT_MS)
+    parser.add_argument("--synthetic", action="store_true", help="use the synthetic cost model")
+    parser.add_argument("--embed-overhead-ms", type=float, default=20.0)
+    parser.add_argument("--embed-per-query-ms", type=float, default=1.0)
+    parser.add_argument("--search-overhead-ms", type=float, default=5.0)
+    parser.add_argument("--search-per-query-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        backend = SyntheticBackend(
+            args.embed_overhead_ms, args.embed_per_query_ms,
+            args.search_overhead_ms, args.search_per_query_ms,
+        )
+        embed_fn, search_fn = backend.embed, backend.search
+    else:
+        from app.services.vector_store import get_vector_store
+        vector_store = get_vector_store()
+        embed_fn, search_fn = vector_store._embed_queries, vector_store._search_by_vectors
+
+    results = benchmark(
+        embed_fn, search_fn, args.queries, args.concurrency, args.max_batch_size, args.max_wait_ms
+    )
+
+    print(f"{'mode':10} {'queries/s':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for result in results:
+        print(
+            f"{result.mode:10} {result.throughput:10.1f} {result.percentile(0.5):9.1f} "
+            f"{result.percentile(0.9):9.1f} {result.percentile(0.99):9.1f}"
+        )
+    stats = results[-1].stats
+    print(f"\navg batch size {stats['avg_batch_size']}, avg queue wait {stats['avg_queue_wait_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
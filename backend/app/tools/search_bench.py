@@ -0,0 +1,80 @@
+"""
+Conversation Search Benchmark
+Times ranked full-text search against the ILIKE scan it replaced, on a
+seeded database
+
+    python -m app.tools.seed_data --conversations 300000   # ~3M messages
+    python -m app.tools.search_bench --repeat 20
+
+On PostgreSQL the ranked search uses the GIN-indexed search_vector
+columns; elsewhere it uses the in-process index, whose one-off load is
+reported separately. The ILIKE baseline is the query the endpoint used
+to issue (no ranking, newest first).
+"""
+from typing import Callable, List
+import argparse
+import time
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models import Conversation, Message
+from app.services.conversation_search import ConversationSearch, _fallback_index
+
+QUERIES = ["refund", "warranty laptop", "broken screen replacement", "tracking delivery", "invoice"]
+
+
+def _ilike(db: Session, q: str, limit: int) -> list:
+    message_match = select(Message.conversation_id).where(Message.content.ilike(f"%{q}%"))
+    return db.query(Conversation).filter(
+        or_(Conversation.title.ilike(f"%{q}%"), Conversation.id.in_(message_match))
+    ).order_by(
+        Conversation.updated_at.desc(), Conversation.id.desc()
+    ).limit(limit).all()
+
+
+def _ranked(db: Session, q: str, limit: int) -> list:
+    return ConversationSearch.search(db, q, limit=limit)[0]
+
+
+def _time(db: Session, search: Callable[[Session, str, int], list], q: str, limit: int, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        search(db, q, limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark conversation search")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per query and method")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--query", action="append", help="query to time (repeatable)")
+    parser.add_argument("--skip-ilike", action="store_true", help="only time the ranked search")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        messages = db.execute(select(func.count()).select_from(Message)).scalar()
+        print(f"{db.bind.dialect.name}, {messages} messages")
+
+        if db.bind.dialect.name != "postgresql":
+            _fallback_index.clear()
+            started = time.perf_counter()
+            ConversationSearch.search(db, "warm up", limit=1)
+            print(f"in-process index load: {time.perf_counter() - started:.1f}s")
+
+        methods = [("ranked", _ranked)] + ([] if args.skip_ilike else [("ilike", _ilike)])
+        print(f"\n{'query':28} {'method':7} {'p50 ms':>9} {'max ms':>9}")
+        for q in args.query or QUERIES:
+            for name, search in methods:
+                timings = _time(db, search, q, args.limit, args.repeat)
+                print(f"{q:28} {name:7} {timings[len(timings) // 2]:9.1f} {timings[-1]:9.1f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Synthetic Data Seeder
+Fills the database with a large synthetic dataset for query-plan checks
+
+    python -m app.tools.seed_data --conversations 500000 --days 365
+
+Rows are written with bulk Core inserts, so the ORM counter listeners do
+not run; conversation and activity log counters are computed here
+instead, and the seeded user's conversations version is bumped once at
+the end.
+Do not point this at a production database.
+"""
+from typing import Any, Dict, List, Tuple
+from datetime import datetime, timedelta
+import argparse
+import random
+import time
+
+from sqlalchemy import func, insert, select, text
+
+from app.core.database import engine, Base
+from app.core.migrations import run_migrations
+from app.models import ActivityLog, AnalyticsEvent, Conversation, Message
+from app.models.conversation import PREVIEW_LENGTH
+from app.models.resource_version import bump_versions, conversation_resource
+from app.services.activity_log_stats import ActivityLogStats
+from app.utils.categorizer import MessageCategorizer
+
+PROVIDERS = {
+    "openai": ["gpt-4o-mini", "gpt-4o"],
+    "anthropic": ["claude-3-5-sonnet-20241022", "claude-3-haiku-20240307"],
+    "google": ["gemini-1.5-flash", "gemini-1.5-pro"],
+}
+
+OTHER_ACTIONS = [
+    ("upload", "document"),
+    ("delete", "document"),
+    ("tag_create", "tag"),
+    ("tag_assign", "document"),
+]
+
+WORDS = (
+    "order shipping refund return warranty laptop phone charger battery screen "
+    "delivery tracking payment card invoice account password broken replacement "
+    "discount price stock available model warranty repair cancel exchange"
+).split()
+
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+
+def _conversation_batch(
+    rng: random.Random,
+    first_id: int,
+    count: int,
+    now: datetime,
+    days: int,
+    messages_per_conversation: int
+) -> Tuple[List[Dict[str, Any]], ...]:
+    """Rows for `count` conversations with their messages, events and logs"""
+    categories = list(MessageCategorizer.CATEGORIES) + ["General"]
+    conversations, messages, events, logs = [], [], [], []
+
+    for conversation_id in range(first_id, first_id + count):
+        created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+        turns = max(1, int(rng.expovariate(2 / messages_per_conversation)))
+        timestamp = created_at
+        title = _sentence(rng, 3, 8)[:50]
+
+        for _ in range(turns):
+            provider = rng.choice(list(PROVIDERS))
+            question = _sentence(rng, 6, 20)
+            answer = _sentence(rng, 20, 80)
+            category = rng.choice(categories)
+            response_time = rng.lognormvariate(0.3, 0.6)
+
+            messages.append({
+                "conversation_id": conversation_id,
+                "role": "user",
+                "content": question,
+                "sources": [],
+                "metadata": {"category": {"category": category, "confidence": 0.8, "keywords": []}},
+                "timestamp": timestamp,
+            })
+            timestamp += timedelta(seconds=response_time)
+            messages.append({
+                "conversation_id": conversation_id,
+                "role": "assistant",
+                "content": answer,
+                "sources": [],
+                "metadata": {},
+                "timestamp": timestamp,
+            })
+            events.append({
+                "event_type": "chat_message",
+                "metadata": {
+                    "conversation_id": conversation_id,
+                    "message_length": len(question),
+                    "sources_count": rng.randint(0, 4),
+                    "llm_provider": provider,
+                    "model": rng.choice(PROVIDERS[provider]),
+                },
+                "value": response_time,
+                "timestamp": timestamp,
+            })
+            logs.append({
+                "user_id": "anonymous",
+                "action_type": "chat",
+                "resource_type": "conversation",
+                "resource_id": conversation_id,
+                "description": f"Chat message sent in conversation '{title}'",
+                "metadata": {"message_length": len(question), "response_time": response_time},
+                "status": "success",
+                "created_at": timestamp,
+            })
+            if rng.random() < 0.1:
+                action_type, resource_type = rng.choice(OTHER_ACTIONS)
+                logs.append({
+                    "user_id": "anonymous",
+                    "action_type": action_type,
+                    "resource_type": resource_type,
+                    "resource_id": rng.randint(1, 1000),
+                    "description": f"Synthetic {action_type}",
+                    "metadata": {},
+                    "status": "failed" if rng.random() < 0.05 else "success",
+                    "created_at": timestamp,
+                })
+            timestamp += timedelta(seconds=rng.randint(10, 600))
+
+        conversations.append({
+            "id": conversation_id,
+            "title": title,
+            "user_id": "anonymous",
+            "created_at": created_at,
+            "updated_at": messages[-1]["timestamp"],
+            "message_count": turns * 2,
+            "last_message_at": messages[-1]["timestamp"],
+            "last_message_preview": messages[-1]["content"][:PREVIEW_LENGTH],
+        })
+
+    return conversations, messages, events, logs
+
+
+def seed(conversations: int, days: int, messages_per_conversation: int, batch_size: int, seed: int):
+    """Insert synthetic conversations in batches of batch_size"""
+    run_migrations(engine, Base.metadata)
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with engine.connect() as conn:
+        next_id = (conn.execute(select(func.max(Conversation.id))).scalar() or 0) + 1
+
+    started = time.perf_counter()
+    written = 0
+    while written < conversations:
+        count = min(batch_size, conversations - written)
+        batch = _conversation_batch(rng, next_id, count, now, days, messages_per_conversation)
+        with engine.begin() as conn:
+            for model, rows in zip((Conversation, Message, AnalyticsEvent, ActivityLog), batch):
+                conn.execute(insert(model.__table__), rows)
+        next_id += count
+        written += count
+        print(
+            f"{written}/{conversations} conversations "
+            f"({len(batch[1])} messages in last batch, {time.perf_counter() - started:.0f}s)"
+        )
+
+    with engine.begin() as conn:
+        ActivityLogStats.rebuild(conn)
+        bump_versions(conn, [conversation_resource("anonymous")])
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(
+                "SELECT setval(pg_get_serial_sequence('conversations', 'id'), "
+                "(SELECT MAX(id) FROM conversations))"
+            ))
+            for table in ("conversations", "messages", "analytics_events", "activity_logs"):
+                conn.execute(text(f"ANALYZE {table}"))
+        else:
+            conn.execute(text("ANALYZE"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic chat data")
+    parser.add_argument("--conversations", type=int, default=200000)
+    parser.add_argument("--days", type=int, default=365, help="spread of conversation start times")
+    parser.add_argument("--messages-per-conversation", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    seed(
+        conversations=args.conversations,
+        days=args.days,
+        messages_per_conversation=args.messages_per_conversation,
+        batch_size=args.batch_size,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Response Serialization Benchmark
+Times the chat read endpoints with FAST_JSON_RESPONSES off and on
+
+    python -m app.tools.serialization_bench --messages 2000 --requests 50
+
+Runs against a private in-memory SQLite database seeded with one
+conversation, so results are reproducible and the configured database is
+not touched. Both paths must return the same JSON; the run stops if they
+differ.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+import argparse
+import random
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import chat
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.models import Conversation, Message
+
+WORDS = "order shipping refund return warranty laptop phone charger battery screen delivery".split()
+
+
+def _seed(engine, messages: int, seed: int) -> int:
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conversation_id = conn.execute(
+            insert(Conversation).values(title="Benchmark", message_count=messages)
+        ).inserted_primary_key[0]
+        conn.execute(insert(Message), [
+            {
+                "conversation_id": conversation_id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 80))),
+                "sources": [] if i % 2 == 0 else [
+                    {"document": f"doc-{rng.randint(1, 50)}.pdf", "page": rng.randint(1, 30), "score": rng.random()}
+                    for _ in range(3)
+                ],
+                "metadata": {"category": rng.choice(WORDS)} if i % 2 == 0 else {},
+                "timestamp": started + timedelta(seconds=30 * i),
+            }
+            for i in range(messages)
+        ])
+    return conversation_id
+
+
+def _time(client: TestClient, path: str, requests: int) -> List[float]:
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+    return sorted(timings)
+
+
+def benchmark(messages: int, requests: int, seed: int = 42) -> Dict[str, Dict[bool, List[float]]]:
+    """Per-request milliseconds of each endpoint, keyed by path then FAST_JSON_RESPONSES"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    conversation_id = _seed(engine, messages, seed)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def bench_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_db] = bench_db
+    client = TestClient(app)
+
+    paths = {
+        "get_conversation": f"/api/chat/conversations/{conversation_id}",
+        "list_messages": f"/api/chat/conversations/{conversation_id}/messages?limit=200",
+    }
+    saved = settings.FAST_JSON_RESPONSES
+    results: Dict[str, Dict[bool, List[float]]] = {}
+    try:
+        for name, path in paths.items():
+            bodies = {}
+            results[name] = {}
+            for fast in (False, True):
+                settings.FAST_JSON_RESPONSES = fast
+                bodies[fast] = client.get(path).json()
+                results[name][fast] = _time(client, path, requests)
+            if bodies[False] != bodies[True]:
+                raise SystemExit(f"{name}: fast path returned different JSON")
+    finally:
+        settings.FAST_JSON_RESPONSES = saved
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark orjson vs response_model serialization")
+    parser.add_argument("--messages", type=int, default=2000, help="messages in the conversation")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per endpoint and mode")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = benchmark(args.messages, args.requests, args.seed)
+
+    print(f"{'endpoint':18} {'mode':15} {'p50 ms':>9} {'p90 ms':>9}")
+    for name, modes in results.items():
+        for fast, timings in modes.items():
+            mode = "fast_json" if fast else "response_model"
+            print(f"{name:18} {mode:15} {timings[len(timings) // 2]:9.1f} {timings[int(len(timings) * 0.9)]:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Tag Flag Sync
+Writes the tag_<id> chunk metadata flags used by tag-scoped retrieval for
+every document tag assignment. The tag endpoints keep the flags current;
+run this once for tags assigned before they did, or after restoring the
+vector store.
+
+    python -m app.tools.sync_tag_flags
+"""
+from sqlalchemy import select
+
+from app.core.database import SessionLocal
+from app.models import document_tags
+from app.services.vector_store import get_vector_store
+
+
+def sync():
+    db = SessionLocal()
+    try:
+        assignments = db.execute(
+            select(document_tags.c.document_id, document_tags.c.tag_id)
+            .order_by(document_tags.c.document_id)
+        ).all()
+    finally:
+        db.close()
+
+    vector_store = get_vector_store()
+    for document_id, tag_id in assignments:
+        vector_store.set_document_tag(document_id, tag_id, True)
+    print(f"Flagged chunks for {len(assignments)} document tag assignments")
+
+
+if __name__ == "__main__":
+    sync()
@@ -1,9 +1,16 @@
 """
 Activity Logger Utility
 """
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
 from app.models import ActivityLog
-from typing import Optional, Dict, Any
+from app.models.activity_log import increment_log_counters, log_day
+from app.services.batch_writer import BatchWriter
+from typing import Optional, Dict, Any, List
 
 
 def log_activity(
@@ -14,11 +21,16 @@ def log_activity(
     resource_id: Optional[int] = None,
     user_id: str = "anonymous",
     status: str = "success",
-    metadata: Optional[Dict[str, Any]] = None
-):
+    metadata: Optional[Dict[str, Any]] = None,
+    commit: bool = True
+) -> Optional[ActivityLog]:
     """
     Log an activity to the database
 
+    With ACTIVITY_LOG_BUFFER_ENABLED the log is queued for a bulk insert
+    by the background writer, `db` and `commit` are not used and None is
+    returned.
+
     Args:
         db: Database session
         action_type: Type of action (upload, delete, chat, etc.)
@@ -28,7 +40,22 @@ def log_activity(
         user_id: User ID
         status: Status of the action (success, failed, pending)
         metadata: Additional metadata
+        commit: Commit immediately; pass False to write as part of the
+            caller's transaction
     """
+    if settings.ACTIVITY_LOG_BUFFER_ENABLED:
+        get_activity_log_writer().submit({
+            "user_id": user_id,
+            "action_type": action_type,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "description": description,
+            "metadata": metadata or {},
+            "status": status,
+            "created_at": datetime.now(timezone.utc),
+        })
+        return None
+
     log = ActivityLog(
         user_id=user_id,
         action_type=action_type,
@@ -36,11 +63,44 @@ def log_activity(
         resource_id=resource_id,
         description=description,
         status=status,
-        metadata=metadata or {}
+        metadata_=metadata or {}
     )
 
     db.add(log)
-    db.commit()
-    db.refresh(log)
+    if commit:
+        db.commit()
+        db.refresh(log)
 
     return log
+
+
+def _write_logs(rows: List[Dict[str, Any]]):
+    """Insert a batch of logs and count them in one transaction"""
+    db = SessionLocal()
+    try:
+        db.execute(insert(ActivityLog.__table__), rows)
+        # Core inserts skip the ORM listener that maintains the counters
+        increment_log_counters(db.connection(), Counter(
+            (log_day(row["created_at"]), row["action_type"], row["status"]) for row in rows
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+_activity_log_writer = None
+
+
+def get_activity_log_writer() -> BatchWriter:
+    """Get or create the buffered activity log writer"""
+    global _activity_log_writer
+    if _activity_log_writer is None:
+        _activity_log_writer = BatchWriter(
+            name="activity-log",
+            write_fn=_write_logs,
+            max_queue_size=settings.ACTIVITY_LOG_BUFFER_MAX_SIZE,
+            batch_size=settings.ACTIVITY_LOG_BUFFER_BATCH_SIZE,
+            flush_interval=settings.ACTIVITY_LOG_BUFFER_FLUSH_INTERVAL,
+            put_timeout=settings.ACTIVITY_LOG_BUFFER_PUT_TIMEOUT,
+        )
+    return _activity_log_writer
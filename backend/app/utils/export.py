@@ -0,0 +1,110 @@
+"""
+Streaming Export Utility
+"""
+from typing import Any, Dict, Iterable, Iterator, List
+from datetime import date, datetime
+import csv
+import io
+import json
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.core.database import SessionLocal
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_SIZE = 1000
+
+# Bytes collected before a chunk is sent to the client
+EXPORT_CHUNK_SIZE = 65536
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def stream_rows(statement: Select) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the rows of a Core select as dicts, EXPORT_FETCH_SIZE at a time
+
+    Runs on its own session: the request session is closed before a
+    streaming response body is sent.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_FETCH_SIZE))
+        for row in result.mappings():
+            yield dict(row)
+    finally:
+        db.close()
+
+
+def _ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, default=_json_default) + "\n"
+
+
+def _csv_lines(rows: Iterable[Dict[str, Any]], fieldnames: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({
+            key: json.dumps(value, default=_json_default) if isinstance(value, (dict, list)) else value
+            for key, value in row.items()
+        })
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    """Join small lines into chunks of about EXPORT_CHUNK_SIZE bytes"""
+    chunk: List[str] = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield "".join(chunk).encode()
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+def export_response(
+    rows: Iterable[Dict[str, Any]],
+    format: str,
+    fieldnames: List[str],
+    filename: str
+) -> StreamingResponse:
+    """
+    Stream rows as NDJSON (one object per line) or CSV
+
+    Args:
+        rows: Row dicts, usually from stream_rows
+        format: "ndjson" or "csv"
+        fieldnames: CSV columns, in order
+        filename: Download name without extension
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}",
+        )
+
+    lines = _ndjson_lines(rows) if format == "ndjson" else _csv_lines(rows, fieldnames)
+    return StreamingResponse(
+        _chunked(lines),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
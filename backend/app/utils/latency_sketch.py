@@ -0,0 +1,98 @@
+"""
+Latency Sketch Utility
+Mergeable quantile sketch for response-time percentiles
+"""
+from typing import Any, Dict, Optional
+import math
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 2048
+
+# Values at or below this (seconds) are counted as zero
+MIN_VALUE = 1e-6
+
+
+class LatencySketch:
+    """
+    Log-bucketed histogram with bounded relative error
+
+    A positive value v is counted in bin ceil(log_gamma(v)) with
+    gamma = (1 + a) / (1 - a), so every quantile estimate is within a
+    relative error `a` of a real sample. Two sketches merge by adding bin
+    counts, so percentiles over any window can be read from per-bucket
+    sketches without the raw values. If more than max_bins bins are in use,
+    the lowest ones are folded together, which only affects the accuracy
+    of the smallest values.
+    """
+
+    def __init__(
+        self,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        max_bins: int = DEFAULT_MAX_BINS
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, weight: int = 1):
+        """Record a sample"""
+        self.count += weight
+        if value <= MIN_VALUE:
+            self.zero_count += weight
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + weight
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other: "LatencySketch"):
+        """Add another sketch's samples (both must use the same accuracy)"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for index, weight in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + weight
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        indexes = sorted(self.bins)
+        excess = indexes[:len(indexes) - self.max_bins + 1]
+        target = indexes[len(excess)]
+        self.bins[target] += sum(self.bins.pop(index) for index in excess)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0 <= q <= 1), or None if empty"""
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form (see from_dict)"""
+        return {
+            "a": self.relative_accuracy,
+            "z": self.zero_count,
+            "b": {str(index): weight for index, weight in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencySketch":
+        sketch = cls(relative_accuracy=data.get("a", DEFAULT_RELATIVE_ACCURACY))
+        sketch.zero_count = data.get("z", 0)
+        sketch.bins = {int(index): weight for index, weight in data.get("b", {}).items()}
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
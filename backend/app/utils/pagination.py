@@ -0,0 +1,82 @@
+"""
+Cursor Pagination Utility
+"""
+from typing import Any, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort key of the last returned row as an opaque cursor"""
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+    return values
+
+
+def paginate_keyset(
+    query: Query,
+    sort_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    ascending: bool = False
+) -> Tuple[list, Optional[str]]:
+    """
+    Newest-first (or with ascending=True, oldest-first) keyset pagination
+    on (sort_column, id_column)
+
+    With a cursor, rows are located by a composite index seek instead of
+    walking and discarding `skip` rows, so every page costs the same.
+    Without one, plain offset pagination is used for older clients.
+
+    Returns:
+        (rows, cursor for the next page or None)
+    """
+    if cursor:
+        sort_value, id_value = decode_cursor(cursor, 2)
+        try:
+            sort_value = datetime.fromisoformat(sort_value)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor",
+            )
+        key, last = tuple_(sort_column, id_column), tuple_(sort_value, id_value)
+        query = query.filter(key > last if ascending else key < last)
+
+    if ascending:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    else:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    rows = query.limit(limit).all()
+
+    next_cursor = None
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        last_sort = getattr(last, sort_column.key)
+        if last_sort is not None:
+            next_cursor = encode_cursor([last_sort.isoformat(), getattr(last, id_column.key)])
+    return rows, next_cursor
@@ -0,0 +1,62 @@
+"""
+Token Counting Utility
+Counts tokens locally with tiktoken, falling back to a character estimate
+"""
+from typing import Any
+from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the BPE encoding once (None if unavailable, e.g. offline)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, using character estimate: {str(e)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in a piece of text
+
+    cl100k_base is exact for OpenAI models and within a few percent for
+    Anthropic and Gemini tokenizers, which is enough for budgeting.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def estimate_tokens(value: Any) -> int:
+    """Token count for a prompt (string, LangChain message or list of messages)"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return count_tokens(value)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_tokens(item) for item in value)
+    content = getattr(value, "content", None)
+    if content is not None:
+        return estimate_tokens(content)
+    return count_tokens(str(value))
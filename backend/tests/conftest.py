@@ -0,0 +1,110 @@
+"""
+Shared test fixtures
+
+Tests run against an in-memory SQLite database with buffered writes and
+result caching turned off, so every write is visible when the request
+returns.
+"""
+import os
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DEBUG"] = "False"
+os.environ["ANALYTICS_BUFFER_ENABLED"] = "False"
+os.environ["ACTIVITY_LOG_BUFFER_ENABLED"] = "False"
+os.environ["ANALYTICS_CACHE_ENABLED"] = "False"
+
+from typing import List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.database import Base, engine, SessionLocal
+from app.services import llm_provider, rag_service
+from app.services.analytics_cache import analytics_cache
+from app.services.conversation_search import _fallback_index
+from app.services.history_cache import history_cache
+from app.services.rate_governor import RateGovernor
+from app.services.tag_resolver import tag_resolver
+import app.models  # noqa: F401  (registers every table)
+
+PLENTY = 10 ** 6
+
+
+def make_governor(**limits) -> RateGovernor:
+    options = {
+        "max_concurrency": 8,
+        "tokens_per_minute": PLENTY,
+        "model_max_concurrency": 8,
+        "model_tokens_per_minute": PLENTY,
+        "queue_timeout": 5.0,
+        "overrides": {},
+    }
+    options.update(limits)
+    return RateGovernor(**options)
+
+
+class EmptyVectorStore:
+    def search(self, query, k=4, filter=None):
+        return []
+
+
+@pytest.fixture(autouse=True)
+def database():
+    """Fresh schema and empty process-wide caches for every test"""
+    Base.metadata.create_all(bind=engine)
+    yield
+    history_cache.clear()
+    analytics_cache.clear()
+    tag_resolver.invalidate()
+    _fallback_index.clear()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def statements() -> List[str]:
+    """SQL statements sent to the database while the test runs"""
+    captured: List[str] = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    yield captured
+    event.remove(engine, "before_cursor_execute", listener)
+
+
+@pytest.fixture
+def make_client():
+    """TestClient for an app serving only the given routers"""
+    def make(*routers) -> TestClient:
+        app = FastAPI()
+        for router in routers:
+            app.include_router(router)
+        return TestClient(app)
+
+    return make
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    """Route the "fake" provider through a governor the test controls"""
+    monkeypatch.setattr(settings, "FAKE_LLM_ENABLED", True)
+    monkeypatch.setattr(settings, "FAKE_LLM_TIME_TO_FIRST_TOKEN", 0.0)
+    monkeypatch.setattr(settings, "FAKE_LLM_TOKENS_PER_SECOND", 10000.0)
+    monkeypatch.setattr(rag_service, "get_vector_store", lambda: EmptyVectorStore())
+
+    governor = make_governor(max_concurrency=1, queue_timeout=0.05)
+    monkeypatch.setattr(llm_provider, "get_rate_governor", lambda: governor)
+    return governor
@@ -0,0 +1,35 @@
+"""
+Batch writer: rows from many producer threads are written in bulk and
+every row is accounted for in the stats
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from app.models import AnalyticsEvent
+from app.services.batch_writer import BatchWriter, insert_rows
+
+
+def test_concurrent_producers_are_all_counted(db):
+    writer = BatchWriter(
+        "test-events", insert_rows(AnalyticsEvent.__table__),
+        max_queue_size=100, batch_size=50, flush_interval=0.01, put_timeout=0.001
+    )
+
+    def produce(i):
+        return writer.submit({
+            "event_type": "chat_message",
+            "metadata": {"i": i},
+            "value": float(i),
+            "timestamp": datetime.now(timezone.utc),
+        })
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        accepted = sum(pool.map(produce, range(2000)))
+    writer.close()
+
+    stats = writer.get_stats()
+    assert stats["queued"] == 0 and stats["failed"] == 0
+    assert stats["written"] == accepted
+    assert stats["written"] + stats["dropped"] == 2000
+    assert db.query(AnalyticsEvent).count() == accepted
+    assert stats["batches"] < accepted
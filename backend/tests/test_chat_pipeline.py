@@ -0,0 +1,60 @@
+"""
+Chat stage graph: inline stages run on the calling thread, the rest on the
+pool, and a chat turn never touches the DB session from a pool thread
+"""
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from app.api import chat
+from app.core.database import engine
+from app.services.chat_pipeline import StageGraph
+
+
+def test_inline_stages_run_on_the_calling_thread():
+    threads = {}
+
+    def record(name, value=None):
+        def stage(*args):
+            threads[name] = threading.current_thread().name
+            return value
+        return stage
+
+    pipeline = StageGraph()
+    pipeline.add("load", record("load", 1), inline=True)
+    pipeline.add("retrieve", record("retrieve", 2))
+    pipeline.add("generate", lambda loaded, docs: loaded + docs, depends_on=["load", "retrieve"])
+    results = pipeline.run()
+
+    assert results["generate"] == 3
+    assert threads["load"] == threading.current_thread().name
+    assert threads["retrieve"].startswith("chat-stage")
+
+
+def test_inline_stage_cannot_have_dependencies():
+    pipeline = StageGraph().add("retrieve", lambda: None)
+    with pytest.raises(ValueError):
+        pipeline.add("load", lambda docs: None, depends_on=["retrieve"], inline=True)
+
+
+def test_send_message_keeps_db_access_off_the_stage_pool(fake_provider, make_client):
+    threads = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        threads.append(threading.current_thread().name)
+
+    client = make_client(chat.router)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        first = client.post("/api/chat/", json={"message": "hi", "llm_provider": "fake"})
+        second = client.post("/api/chat/", json={
+            "message": "again", "llm_provider": "fake",
+            "conversation_id": first.json()["conversation_id"], "tag_ids": [1],
+        })
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert first.status_code == second.status_code == 200
+    assert threads
+    assert not [name for name in threads if name.startswith("chat-stage")]
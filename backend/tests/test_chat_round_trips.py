@@ -0,0 +1,125 @@
+"""
+Statements and commits issued by the chat endpoints
+"""
+from datetime import datetime
+
+import pytest
+
+from app.api import chat
+from app.core.config import settings
+from app.models import Conversation, Message, MessageFeedback
+
+
+@pytest.fixture(params=[False, True], ids=["response_model", "fast_json"])
+def conversation_id(request, db, monkeypatch):
+    """A three-message conversation with feedback on the answer"""
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", request.param)
+    conversation = Conversation(title="t")
+    db.add(conversation)
+    db.flush()
+    messages = [
+        Message(conversation_id=conversation.id, role=role, content=role)
+        for role in ("user", "assistant", "user")
+    ]
+    db.add_all(messages)
+    db.flush()
+    db.add(MessageFeedback(message_id=messages[1].id, rating=5))
+    db.commit()
+    return conversation.id
+
+
+def test_send_message_writes_the_turn_in_one_commit(fake_provider, make_client, monkeypatch):
+    logged = []
+    monkeypatch.setattr(chat, "_log_chat_turn", lambda **turn: logged.append(turn))
+    client = make_client(chat.router)
+
+    first = client.post("/api/chat/", json={"message": "hi", "llm_provider": "fake"})
+    second = client.post("/api/chat/", json={
+        "message": "again", "llm_provider": "fake", "conversation_id": first.json()["conversation_id"],
+    })
+
+    assert first.status_code == second.status_code == 200
+    assert second.json()["role"] == "assistant" and second.json()["timestamp"]
+    # New conversation: insert it and both messages, two counter updates
+    # and the version bump
+    assert logged[0]["db_round_trips"] == {"statements": 6, "commits": 1}
+    # Follow-up: load the conversation (history is cached), update its
+    # updated_at, then the same writes; nothing is read back after commit
+    assert logged[1]["db_round_trips"] == {"statements": 7, "commits": 1}
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("", 1),
+    ("?include_feedback=true", 2),
+    ("?include_sources=false&include_metadata=false", 1),
+])
+def test_list_messages_statements(conversation_id, make_client, statements, query, expected):
+    client = make_client(chat.router)
+    statements.clear()
+
+    response = client.get(f"/api/chat/conversations/{conversation_id}/messages{query}")
+
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page) == 3
+    if "include_feedback" in query:
+        assert [message["feedback"] and message["feedback"]["rating"] for message in page] == [None, 5, None]
+    assert len(statements) == expected
+
+
+def test_get_conversation_statements(conversation_id, make_client, statements):
+    client = make_client(chat.router)
+    statements.clear()
+
+    response = client.get(f"/api/chat/conversations/{conversation_id}")
+
+    assert response.status_code == 200
+    assert len(response.json()["messages"]) == 3
+    # The conversation, then its messages in one selectin query
+    assert len(statements) == 2
+
+
+def test_delete_conversation_statements(db, make_client, statements):
+    conversation = Conversation(title="t")
+    db.add(conversation)
+    db.flush()
+    conversation_id = conversation.id
+    db.add_all([
+        Message(conversation_id=conversation_id, role="user", content=str(i)) for i in range(50)
+    ])
+    db.commit()
+    client = make_client(chat.router)
+    statements.clear()
+
+    assert client.delete(f"/api/chat/conversations/{conversation_id}").status_code == 204
+
+    # Load the conversation, its messages and their feedback, delete the
+    # messages (one executemany) and the conversation, bump its version.
+    # No counter update for the conversation being deleted.
+    assert len(statements) == 6
+    assert not [statement for statement in statements if statement.startswith("UPDATE")]
+    assert db.query(Message).count() == 0
+
+
+def test_deleting_messages_recomputes_counters_once(db, statements):
+    conversation = Conversation(title="t")
+    db.add(conversation)
+    db.flush()
+    messages = [
+        Message(conversation_id=conversation.id, role="user", content=f"m{i}",
+                timestamp=datetime(2024, 1, 1, 12, i))
+        for i in range(5)
+    ]
+    db.add_all(messages)
+    db.commit()
+    statements.clear()
+
+    for message in messages[2:]:
+        db.delete(message)
+    db.commit()
+
+    assert len([statement for statement in statements if statement.startswith("UPDATE conversations")]) == 1
+    db.refresh(conversation)
+    assert conversation.message_count == 2
+    assert conversation.last_message_preview == "m1"
+    assert conversation.last_message_at.replace(tzinfo=None) == datetime(2024, 1, 1, 12, 1)
@@ -0,0 +1,38 @@
+"""
+Conversation counters follow message inserts and deletes in the same
+transaction
+"""
+from datetime import datetime
+
+from app.models import Conversation, Message
+
+
+def test_counters_use_the_message_timestamp(db):
+    conversation = Conversation(title="t")
+    db.add(conversation)
+    db.flush()
+
+    backfilled = datetime(2023, 5, 1, 8, 30)
+    db.add(Message(conversation_id=conversation.id, role="user", content="old", timestamp=backfilled))
+    db.commit()
+    db.refresh(conversation)
+
+    assert conversation.message_count == 1
+    assert conversation.last_message_at.replace(tzinfo=None) == backfilled
+    assert conversation.last_message_preview == "old"
+
+
+def test_counters_fall_back_to_the_server_default(db):
+    conversation = Conversation(title="t")
+    db.add(conversation)
+    db.flush()
+
+    message = Message(conversation_id=conversation.id, role="user", content="now")
+    db.add(message)
+    db.commit()
+    db.refresh(conversation)
+    db.refresh(message)
+
+    assert conversation.message_count == 1
+    assert conversation.last_message_at is not None
+    assert abs((conversation.last_message_at - message.timestamp).total_seconds()) < 5
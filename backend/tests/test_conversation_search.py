@@ -0,0 +1,39 @@
+"""
+Fallback search index: changes become visible when their transaction
+commits and are dropped when it rolls back
+"""
+from app.models import Conversation, Message
+from app.services.conversation_search import ConversationSearch
+
+
+def _found(db, q):
+    return [conversation.title for conversation in ConversationSearch.search(db, q)[0]]
+
+
+def test_index_follows_commits_not_flushes(db):
+    # Load the (empty) index first, so later changes go through the listeners
+    assert _found(db, "warranty") == []
+
+    conversation = Conversation(title="Laptop")
+    db.add(conversation)
+    db.flush()
+    db.add(Message(conversation_id=conversation.id, role="user", content="warranty claim"))
+    db.flush()
+    assert _found(db, "warranty") == []
+
+    db.rollback()
+    assert _found(db, "warranty") == []
+    assert _found(db, "laptop") == []
+
+    conversation = Conversation(title="Phone")
+    db.add(conversation)
+    db.flush()
+    db.add(Message(conversation_id=conversation.id, role="user", content="warranty claim"))
+    db.commit()
+    assert _found(db, "warranty") == ["Phone"]
+
+    db.delete(db.query(Message).one())
+    db.flush()
+    assert _found(db, "warranty") == ["Phone"]
+    db.commit()
+    assert _found(db, "warranty") == []
@@ -0,0 +1,40 @@
+"""
+Unsummarized history is everything after the folded message in
+(timestamp, id) order, whether read from the database or the cache
+"""
+from datetime import datetime, timedelta
+
+from app.models import Conversation, Message
+from app.services.conversation_summarizer import ConversationSummarizer
+from app.services.history_cache import get_recent_history, history_cache
+
+
+def test_unsummarized_messages_follow_timestamp_order(db):
+    start = datetime(2024, 1, 1, 12, 0)
+    conversation = Conversation(title="t")
+    db.add(conversation)
+    db.flush()
+
+    # Ids are out of timestamp order, as with imported or backfilled messages
+    minutes = [0, 1, 4, 2, 3]
+    messages = [
+        Message(conversation_id=conversation.id, role="user", content=f"m{minute}",
+                timestamp=start + timedelta(minutes=minute))
+        for minute in minutes
+    ]
+    db.add_all(messages)
+    db.flush()
+
+    # Fold everything up to the message at minute 2 (inserted fourth)
+    conversation.summary = "summary"
+    conversation.summary_message_id = messages[3].id
+    db.commit()
+
+    expected = ["m3", "m4"]
+    unsummarized = ConversationSummarizer._unsummarized_messages(db, conversation)
+    assert [msg.content for msg in unsummarized] == expected
+
+    history_cache.invalidate(conversation.id)
+    assert [msg["content"] for msg in get_recent_history(db, conversation)] == expected
+    # Served from the cache the second time
+    assert [msg["content"] for msg in get_recent_history(db, conversation)] == expected
@@ -0,0 +1,42 @@
+"""
+The orjson fast path renders the same JSON as the response_model path
+"""
+from datetime import datetime, timedelta, timezone
+import json
+
+import pytest
+
+from app.schemas import MessageResponse
+from app.tools.serialization_bench import benchmark
+from app.utils.fast_json import FastJSONResponse, dump_orm
+
+
+class Row:
+    """Stand-in ORM row"""
+
+    def __init__(self, **columns):
+        self.__dict__.update(columns)
+
+
+@pytest.mark.parametrize("timestamp", [
+    datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+    datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=3))),
+    datetime(2024, 1, 2, 3, 4, 5),
+], ids=["utc", "utc_microseconds", "offset", "naive"])
+def test_datetimes_match_pydantic(timestamp):
+    row = Row(id=1, conversation_id=2, role="user", content="hi", sources=[],
+              metadata_={"category": "order"}, timestamp=timestamp)
+
+    expected = MessageResponse.model_validate(row).model_dump_json(by_alias=False)
+    rendered = FastJSONResponse(dump_orm(row, MessageResponse)).body
+
+    assert json.loads(rendered) == json.loads(expected)
+
+
+def test_benchmark_paths_return_the_same_json():
+    # benchmark() stops if the two paths disagree
+    results = benchmark(messages=20, requests=2)
+
+    assert set(results) == {"get_conversation", "list_messages"}
+    assert all(len(timings) == 2 for modes in results.values() for timings in modes.values())
@@ -0,0 +1,19 @@
+"""
+Startup migrations are recorded once and skipped on later runs
+"""
+from sqlalchemy import text
+
+from app.core.database import Base, engine
+from app.core.migrations import MIGRATIONS, run_migrations
+
+
+def test_migrations_apply_once():
+    run_migrations(engine, Base.metadata)
+    # A second worker starting later finds everything applied
+    run_migrations(engine, Base.metadata)
+
+    with engine.connect() as conn:
+        names = [row[0] for row in conn.execute(text("SELECT name FROM schema_migrations ORDER BY name"))]
+        conn.execute(text("DROP TABLE schema_migrations"))
+        conn.commit()
+    assert names == sorted(name for name, _ in MIGRATIONS)
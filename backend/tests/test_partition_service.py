@@ -0,0 +1,42 @@
+"""
+Archive reads: a month archived more than once is read back in suffix
+order, its rows merged oldest first
+"""
+from datetime import datetime
+import gzip
+import json
+
+from app.core.config import settings
+from app.services.partition_service import PartitionService
+
+
+def _write(directory, name, rows):
+    with gzip.open(directory / name, "wt", encoding="utf-8") as archive:
+        for row in rows:
+            archive.write(json.dumps(row) + "\n")
+
+
+def test_rearchived_month_is_read_oldest_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ARCHIVE_DIRECTORY", str(tmp_path))
+    directory = tmp_path / "activity_logs"
+    directory.mkdir()
+    # Each run writes its own rows in timestamp order; runs overlap in time
+    for name, days in [
+        ("2024-01.jsonl.gz", [1, 5, 9]),
+        ("2024-01.1.jsonl.gz", [2, 6]),
+        ("2024-01.2.jsonl.gz", [3, 7]),
+        ("2024-01.10.jsonl.gz", [4, 8]),
+    ]:
+        _write(directory, name, [
+            {"id": day, "created_at": datetime(2024, 1, day).isoformat(), "action": "login"}
+            for day in days
+        ])
+
+    files = [archive["file"] for archive in PartitionService.list_archives("activity_logs")]
+    assert files == ["2024-01.jsonl.gz", "2024-01.1.jsonl.gz", "2024-01.2.jsonl.gz", "2024-01.10.jsonl.gz"]
+
+    rows = list(PartitionService.query_archive("activity_logs", datetime(2024, 1, 1), datetime(2024, 2, 1)))
+    assert [row["id"] for row in rows] == list(range(1, 10))
+
+    rows = list(PartitionService.query_archive("activity_logs", datetime(2024, 1, 1), datetime(2024, 2, 1), limit=4))
+    assert [row["id"] for row in rows] == [1, 2, 3, 4]
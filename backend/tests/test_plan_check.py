@@ -0,0 +1,42 @@
+"""
+Every plan_check scenario runs against a small seeded database within its
+statement budget
+"""
+import pytest
+
+from app.core.config import settings
+from app.tools import plan_check
+from app.tools.seed_data import seed
+
+SCENARIOS = [scenario.name for scenario in plan_check._scenarios(0, None)]
+
+
+@pytest.fixture
+def seeded(db, monkeypatch):
+    for name, value in plan_check.CHECK_SETTINGS.items():
+        monkeypatch.setattr(settings, name, value)
+    seed(conversations=60, days=3, messages_per_conversation=6, batch_size=60, seed=7)
+    return plan_check._prepare(db)
+
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_scenario(name, seeded, db):
+    conversation_id, cursor = seeded
+    scenario = next(s for s in plan_check._scenarios(conversation_id, cursor) if s.name == name)
+
+    statements = plan_check.run_scenario(db, scenario)
+
+    assert (plan_check.SCENARIO_FAILED, None) not in statements
+    if scenario.max_statements is not None:
+        assert len(statements) <= scenario.max_statements
+
+
+def test_check_restores_settings(seeded, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYTICS_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+
+    results = plan_check.check(budget_ms=10000, min_rows=10 ** 6)
+
+    assert results and not [result for result in results if result.problems]
+    assert settings.ANALYTICS_CACHE_ENABLED is True
+    assert settings.FAST_JSON_RESPONSES is True
@@ -0,0 +1,41 @@
+"""
+Query micro-batcher: concurrent queries share embedding and search calls
+and each caller gets its own results
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.query_batcher import QueryBatcher
+from app.tools.retrieval_bench import SyntheticBackend, benchmark
+
+
+def test_concurrent_queries_share_batches():
+    backend = SyntheticBackend(20.0, 0.0, 1.0, 0.0)
+    calls = []
+
+    def embed(queries):
+        calls.append(len(queries))
+        return backend.embed(queries)
+
+    def search(embeddings, k, filter=None):
+        return [[{"content": str(embedding[0]), "metadata": {}, "score": 0.0}] for embedding in embeddings]
+
+    batcher = QueryBatcher(embed, search, max_batch_size=16, max_wait_ms=5)
+    queries = ["a" * n for n in range(1, 33)]
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(lambda query: batcher.search(query, k=1), queries))
+
+    # Every caller got the result for its own query
+    assert [result[0]["content"] for result in results] == [str(float(len(q))) for q in queries]
+    assert sum(calls) == 32
+    assert len(calls) < 32
+    assert batcher.get_stats()["max_batch_size_seen"] <= 16
+
+
+def test_benchmark_reports_both_modes():
+    backend = SyntheticBackend(2.0, 0.1, 1.0, 0.0)
+    results = benchmark(backend.embed, backend.search, queries=64, concurrency=8,
+                        max_batch_size=8, max_wait_ms=2)
+
+    assert [result.mode for result in results] == ["unbatched", "batched"]
+    assert all(len(result.latencies_ms) == 64 for result in results)
+    assert results[1].stats["queries"] == 64
@@ -0,0 +1,154 @@
+"""
+Rate governor: lane admission, token-bucket refill, queue timeouts and
+their mapping to 429 responses
+"""
+import threading
+import time
+
+import pytest
+
+from app.api import chat
+from app.models import Message
+from app.services import rag_service
+from app.services.fake_llm import FakeChatModel
+from app.services.rag_service import RAGService
+from app.services.rate_governor import GovernedLLM, RateLimitTimeout
+
+from tests.conftest import EmptyVectorStore, make_governor
+
+
+def test_model_lane_admits_one_call_at_a_time():
+    governor = make_governor(model_max_concurrency=1)
+    llm = GovernedLLM(
+        FakeChatModel(time_to_first_token=0.2, tokens_per_second=10000.0),
+        "fake", "fake-echo", governor
+    )
+    answers = []
+
+    def ask():
+        answers.append(llm.invoke("Question: where is my order? Answer:").content)
+
+    threads = [threading.Thread(target=ask) for _ in range(2)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - started >= 0.4
+    assert len(answers) == 2 and answers[0] == answers[1]
+    lane = next(s for s in governor.get_stats() if s["lane"] == "fake:fake-echo")
+    assert lane["total_admitted"] == 2
+    assert lane["in_flight"] == 0
+    assert lane["max_wait_seconds"] >= 0.15
+
+
+def test_token_bucket_refills_over_time():
+    # 600 tokens per minute refill at 10 per second
+    governor = make_governor(tokens_per_minute=600)
+    governor.release(governor.acquire("fake", tokens=600))
+
+    started = time.monotonic()
+    governor.release(governor.acquire("fake", tokens=5))
+    waited = time.monotonic() - started
+
+    assert 0.3 <= waited < 2.0
+
+
+def test_queue_timeout_raises_with_retry_after():
+    governor = make_governor(max_concurrency=1)
+    permit = governor.acquire("fake")
+    try:
+        with pytest.raises(RateLimitTimeout) as raised:
+            governor.acquire("fake", timeout=0.1)
+    finally:
+        governor.release(permit)
+
+    assert raised.value.lane == "fake"
+    assert raised.value.retry_after >= 1.0
+    stats = governor.get_stats()[0]
+    assert stats["total_timeouts"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_saturated_model_does_not_block_other_models_of_the_provider():
+    governor = make_governor(model_max_concurrency=1)
+    busy = governor.acquire("openai", "gpt-4o")
+    queued = threading.Thread(target=lambda: governor.release(governor.acquire("openai", "gpt-4o", timeout=2.0)))
+    queued.start()
+    try:
+        # Let the second gpt-4o call queue up first
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            lanes = {stats["lane"]: stats for stats in governor.get_stats()}
+            if lanes["openai:gpt-4o"]["queue_depth"]:
+                break
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        governor.release(governor.acquire("openai", "gpt-4o-mini", timeout=0.2))
+        assert time.monotonic() - started < 0.1
+    finally:
+        governor.release(busy)
+        queued.join()
+
+    lanes = {stats["lane"]: stats for stats in governor.get_stats()}
+    assert lanes["openai"]["total_admitted"] == 3
+    assert lanes["openai"]["total_timeouts"] == 0
+
+
+def test_timeout_hands_back_lanes_already_taken():
+    governor = make_governor(max_concurrency=1, tokens_per_minute=600)
+    permit = governor.acquire("fake")
+    try:
+        with pytest.raises(RateLimitTimeout) as raised:
+            governor.acquire("fake", "fake-echo", tokens=100, timeout=0.05)
+    finally:
+        governor.release(permit)
+
+    assert raised.value.lane == "fake"
+    model_lane = next(s for s in governor.get_stats() if s["lane"] == "fake:fake-echo")
+    assert model_lane["in_flight"] == 0
+    assert model_lane["queue_depth"] == 0
+    assert model_lane["tokens_available"] == model_lane["tokens_per_minute"]
+
+
+def test_send_message_answers_429_when_queue_times_out(fake_provider, make_client, db):
+    client = make_client(chat.router)
+    assert client.post("/api/chat/", json={"message": "hi", "llm_provider": "fake"}).status_code == 200
+
+    permit = fake_provider.acquire("fake")
+    try:
+        response = client.post("/api/chat/", json={"message": "again", "llm_provider": "fake"})
+    finally:
+        fake_provider.release(permit)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    # The timed out turn wrote nothing
+    assert db.query(Message).count() == 2
+
+
+def test_compare_answers_429_only_when_every_provider_is_limited(monkeypatch, make_client):
+    monkeypatch.setattr(rag_service, "get_vector_store", lambda: EmptyVectorStore())
+    limited = {"openai", "anthropic", "google"}
+
+    def chat_or_timeout(self, query, llm_provider=None, **kwargs):
+        if llm_provider in limited:
+            raise RateLimitTimeout(llm_provider, 1.0, 3.0)
+        return "answer", []
+
+    monkeypatch.setattr(RAGService, "chat", chat_or_timeout)
+    client = make_client(chat.router)
+
+    response = client.post("/api/chat/compare", json={"message": "hi"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+
+    limited.discard("google")
+    response = client.post("/api/chat/compare", json={"message": "hi"})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results["openai"]["retry_after"] == 3
+    assert results["google"]["success"] is True
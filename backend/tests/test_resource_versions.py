@@ -0,0 +1,47 @@
+"""
+Conversation writes bump the owning user's version row, and the
+conversation list ETag changes with any of them
+"""
+from app.api import chat
+from app.models import Conversation, Message
+from app.models.resource_version import CONVERSATIONS, get_versions
+
+
+def _versions(db):
+    db.expire_all()
+    return get_versions(db, ["conversations:alice", "conversations:bob", CONVERSATIONS])
+
+
+def test_message_writes_bump_only_their_user(db):
+    alice = Conversation(title="a", user_id="alice")
+    bob = Conversation(title="b", user_id="bob")
+    db.add_all([alice, bob])
+    db.commit()
+    assert _versions(db) == {"conversations:alice": 1, "conversations:bob": 1, CONVERSATIONS: 2}
+
+    db.add(Message(conversation_id=alice.id, role="user", content="hi"))
+    db.commit()
+    assert _versions(db) == {"conversations:alice": 2, "conversations:bob": 1, CONVERSATIONS: 3}
+
+    db.delete(bob)
+    db.commit()
+    assert _versions(db) == {"conversations:alice": 2, "conversations:bob": 2, CONVERSATIONS: 4}
+
+
+def test_conversation_list_etag_follows_every_user(db, make_client):
+    alice = Conversation(title="a", user_id="alice")
+    bob = Conversation(title="b", user_id="bob")
+    db.add_all([alice, bob])
+    db.commit()
+    client = make_client(chat.router)
+
+    first = client.get("/api/chat/conversations")
+    etag = first.headers["ETag"]
+    assert client.get("/api/chat/conversations", headers={"If-None-Match": etag}).status_code == 304
+
+    db.add(Message(conversation_id=bob.id, role="user", content="hi"))
+    db.commit()
+
+    changed = client.get("/api/chat/conversations", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag